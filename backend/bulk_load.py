@@ -0,0 +1,120 @@
+# backend/bulk_load.py
+#
+# Загрузка DataFrame в PostgreSQL: столбцы приводятся к SQL-типам целиком
+# (без поячеечного prepare_cell) и передаются через COPY FROM STDIN.
+# Небольшие пакеты вставляются через execute_values. Для async-эндпоинтов
+# есть бинарный COPY через asyncpg (copy_records_async).
+
+import io
+import time
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+from psycopg2.extras import execute_values
+
+# Меньше этого числа строк COPY не даёт выигрыша — используется execute_values
+COPY_MIN_ROWS = 500
+# Размер порции CSV, передаваемой в один COPY (ограничивает память)
+COPY_CHUNK_ROWS = 50_000
+BATCH_SIZE = 200
+
+NULL_MARKER = '\\N'
+
+
+def convert_column(series: pd.Series, sql_type: str) -> pd.Series:
+    """Приводит столбец к SQL-типу; непреобразуемые значения становятся NULL"""
+    if sql_type in ('INTEGER', 'SMALLINT', 'BIGINT'):
+        if pd.api.types.is_bool_dtype(series):
+            return series.astype('Int64')
+        numeric = pd.to_numeric(series, errors='coerce').replace([np.inf, -np.inf], np.nan)
+        return np.trunc(numeric).astype('Int64')
+    if sql_type in ('FLOAT', 'REAL'):
+        return pd.to_numeric(series, errors='coerce').replace([np.inf, -np.inf], np.nan).astype('float64')
+    if sql_type == 'DATE':
+        if pd.api.types.is_datetime64_any_dtype(series):
+            return series.dt.date
+        return pd.to_datetime(series, errors='coerce', format='mixed').dt.date
+    if sql_type == 'BOOLEAN':
+        if pd.api.types.is_bool_dtype(series):
+            return series.astype('boolean')
+        # Флаги 0/1; прочие значения — NULL
+        numeric = pd.to_numeric(series, errors='coerce')
+        return numeric.map({0: False, 1: True}).astype('boolean')
+    if sql_type == 'ENUM':
+        # Метки ENUM хранятся без крайних пробелов (backend/column_types.py)
+        return series.map(lambda value: str(value).strip(), na_action='ignore')
+    # TEXT — всё остальное в строку
+    return series.map(str, na_action='ignore')
+
+
+def convert_frame(df: pd.DataFrame, columns: List[str], sql_types: List[str]) -> pd.DataFrame:
+    return pd.DataFrame({col: convert_column(df[col], sql_types[i]) for i, col in enumerate(columns)})
+
+
+def frame_records(frame: pd.DataFrame) -> List[tuple]:
+    """Строки преобразованного DataFrame как кортежи Python-значений (NULL -> None)"""
+    columns = [[None if pd.isna(value) else value for value in frame[col].tolist()] for col in frame.columns]
+    return list(zip(*columns))
+
+
+def prepare_records(df: pd.DataFrame, columns: List[str], sql_types: List[str]) -> List[tuple]:
+    """Приведение типов и кортежи для COPY — CPU-часть загрузки"""
+    return frame_records(convert_frame(df, columns, sql_types))
+
+
+def _copy(cur, table: str, frame: pd.DataFrame):
+    columns_list_sql = ','.join([f'"{c}"' for c in frame.columns])
+    copy_sql = f"COPY {table} ({columns_list_sql}) FROM STDIN WITH (FORMAT csv, NULL '{NULL_MARKER}')"
+    for start in range(0, len(frame), COPY_CHUNK_ROWS):
+        buffer = io.StringIO()
+        frame.iloc[start:start + COPY_CHUNK_ROWS].to_csv(buffer, index=False, header=False, na_rep=NULL_MARKER)
+        buffer.seek(0)
+        cur.copy_expert(copy_sql, buffer)
+
+
+def _insert(cur, table: str, frame: pd.DataFrame):
+    columns_list_sql = ','.join([f'"{c}"' for c in frame.columns])
+    insert_sql = f'INSERT INTO {table} ({columns_list_sql}) VALUES %s'
+    execute_values(cur, insert_sql, frame_records(frame), page_size=BATCH_SIZE)
+
+
+def load_frame(cur, table: str, df: pd.DataFrame, columns: List[str], sql_types: List[str],
+               method: Optional[str] = None) -> dict:
+    """Загружает df[columns] в table. method: 'copy', 'insert' или None (по размеру).
+
+    Возвращает статистику: число строк, способ, время и строк в секунду."""
+    started = time.perf_counter()
+    frame = convert_frame(df, columns, sql_types)
+    if method is None:
+        method = 'copy' if len(frame) >= COPY_MIN_ROWS else 'insert'
+
+    if len(frame):
+        if method == 'copy':
+            _copy(cur, table, frame)
+        else:
+            _insert(cur, table, frame)
+
+    elapsed = time.perf_counter() - started
+    return {
+        'rows': len(frame),
+        'method': method,
+        'seconds': round(elapsed, 3),
+        'rows_per_second': round(len(frame) / elapsed, 1) if elapsed > 0 else 0.0
+    }
+
+
+async def copy_records_async(connection, table: str, columns: List[str], records: List[tuple]) -> dict:
+    """Бинарный COPY подготовленных строк через соединение asyncpg.
+
+    Транзакцией управляет вызывающий код. Возвращает ту же статистику, что load_frame."""
+    started = time.perf_counter()
+    if records:
+        await connection.copy_records_to_table(table, records=records, columns=columns)
+    elapsed = time.perf_counter() - started
+    return {
+        'rows': len(records),
+        'method': 'copy_async',
+        'seconds': round(elapsed, 3),
+        'rows_per_second': round(len(records) / elapsed, 1) if elapsed > 0 else 0.0
+    }
@@ -0,0 +1,221 @@
+# backend/column_types.py
+#
+# Выбор SQL-типов столбцов по данным при создании базы: целые значения
+# (в т.ч. float с NaN из Excel и флаги True/False) -> INTEGER/BIGINT,
+# дробные -> DOUBLE PRECISION, категориальные ответы -> ENUM (PostgreSQL
+# возвращает метку строкой, поэтому читающий код не меняется; новые метки
+# добавляются при загрузке). Числовые типы не сужаются по наблюдённым
+# значениям (BOOLEAN для 0/1, SMALLINT по диапазону, REAL по точности):
+# иначе допустимые клинические значения новых загрузок (2 в шкале, где пока
+# были только 0 и 1, или 8.7) перестали бы помещаться в столбец. Столбцы,
+# суженные прежними версиями, расширяет миграция (schema.widen_narrow_columns).
+# Оценка размера строки сравнивает выбор с прежней схемой INTEGER/FLOAT/TEXT.
+# Значения новых загрузок проверяются по этим типам (invalid_values).
+
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from backend.schema import BASE_TABLE, get_sql_type, schema_cache
+
+# Текстовый столбец становится ENUM, если меток не больше стольких
+# и каждая метка в среднем встречается хотя бы ENUM_MIN_REPEATS раз
+ENUM_MAX_LABELS = 64
+ENUM_MIN_REPEATS = 2
+ENUM_LABEL_MAX_BYTES = 63
+
+INT32_MAX = 2 ** 31 - 1
+
+# Байты значения в строке (без выравнивания); TEXT и ENUM считаются отдельно
+FIXED_WIDTH = {
+    'BOOLEAN': 1,
+    'SMALLINT': 2,
+    'INTEGER': 4,
+    'BIGINT': 8,
+    'REAL': 4,
+    'FLOAT': 8,
+    'DATE': 4,
+    'ENUM': 4
+}
+
+
+def enum_type_name(column: str, table: str = BASE_TABLE) -> str:
+    return f'{table}_{column}_enum'
+
+
+def enum_labels(series: pd.Series) -> List[str]:
+    """Метки ENUM в порядке первого появления в данных"""
+    return list(dict.fromkeys(series.dropna().map(str).str.strip()))
+
+
+def _integer_type(values: np.ndarray) -> str:
+    if -INT32_MAX <= values.min() and values.max() <= INT32_MAX:
+        return 'INTEGER'
+    return 'BIGINT'
+
+
+def infer_column_type(series: pd.Series, column: Optional[str] = None) -> str:
+    """SQL-тип столбца: INTEGER, BIGINT, FLOAT, DATE, ENUM или TEXT"""
+    values = series.dropna()
+    if values.empty or pd.api.types.is_datetime64_any_dtype(series):
+        return get_sql_type(series)
+    if pd.api.types.is_bool_dtype(values):
+        # Флаги отдаются наружу как 0/1 (plain_value) — храним их целыми
+        return 'INTEGER'
+
+    if pd.api.types.is_numeric_dtype(values):
+        numbers = values.to_numpy(dtype='float64')
+        if not np.isfinite(numbers).all():
+            return 'FLOAT'
+        if (numbers == np.floor(numbers)).all():
+            return _integer_type(numbers)
+        return 'FLOAT'
+
+    labels = enum_labels(values)
+    # Метка ENUM в PostgreSQL — от 1 до 63 байт
+    if not all(0 < len(label.encode('utf-8')) <= ENUM_LABEL_MAX_BYTES for label in labels):
+        return 'TEXT'
+    if len(labels) <= ENUM_MAX_LABELS and len(values) >= ENUM_MIN_REPEATS * len(labels):
+        return 'ENUM'
+    return 'TEXT'
+
+
+def ddl_type(sql_type: str, column: str, table: str = BASE_TABLE) -> str:
+    """Тип для CREATE TABLE (для ENUM — имя созданного типа)"""
+    if sql_type == 'ENUM':
+        return enum_type_name(column, table)
+    if sql_type == 'FLOAT':
+        return 'DOUBLE PRECISION'
+    return sql_type
+
+
+def create_enum_sql(column: str, labels: List[str], table: str = BASE_TABLE) -> str:
+    quoted = ", ".join("'" + label.replace("'", "''") + "'" for label in labels)
+    return f'CREATE TYPE {enum_type_name(column, table)} AS ENUM ({quoted})'
+
+
+def _value_bytes(series: pd.Series, sql_type: str) -> float:
+    """Средний размер значения в строке; NULL хранится только битом в заголовке"""
+    values = series.dropna()
+    if values.empty:
+        return 0.0
+    share = len(values) / len(series)
+    if sql_type in FIXED_WIDTH:
+        return FIXED_WIDTH[sql_type] * share
+    # TEXT: короткий varlena-заголовок (1 байт) + UTF-8
+    lengths = values.map(lambda value: len(str(value).encode('utf-8')))
+    return float((lengths + 1).mean()) * share
+
+
+def size_report(df: pd.DataFrame, compact_types: Dict[str, str]) -> dict:
+    """Оценка байт на строку и на таблицу: прежняя схема против компактной"""
+    before = sum(_value_bytes(df[col], get_sql_type(df[col])) for col in df.columns)
+    after = sum(_value_bytes(df[col], compact_types[col]) for col in df.columns)
+    counts = {}
+    for sql_type in compact_types.values():
+        counts[sql_type] = counts.get(sql_type, 0) + 1
+    return {
+        'rows': len(df),
+        'row_bytes_before': round(before, 1),
+        'row_bytes_after': round(after, 1),
+        'table_mb_before': round(before * len(df) / 2 ** 20, 2),
+        'table_mb_after': round(after * len(df) / 2 ** 20, 2),
+        'saved_percent': round((1 - after / before) * 100, 1) if before else 0.0,
+        'types': counts
+    }
+
+
+def load_enum_columns(cur, table: str = BASE_TABLE) -> Dict[str, dict]:
+    """Столбец-ENUM -> имя типа и множество его меток"""
+    cur.execute("""
+        SELECT a.attname, t.typname, array_agg(e.enumlabel ORDER BY e.enumsortorder)
+        FROM pg_attribute a
+        JOIN pg_type t ON t.oid = a.atttypid
+        JOIN pg_enum e ON e.enumtypid = t.oid
+        WHERE a.attrelid = to_regclass(%s) AND a.attnum > 0 AND NOT a.attisdropped
+        GROUP BY a.attname, t.typname
+    """, (table,))
+    return {row[0]: {'type': row[1], 'labels': set(row[2])} for row in cur.fetchall()}
+
+
+def enum_columns(cur, table: str = BASE_TABLE) -> Dict[str, dict]:
+    """Столбцы-ENUM таблицы (через кэш схемы)"""
+    return schema_cache.get(cur, f'enums:{table}', lambda c: load_enum_columns(c, table))
+
+
+def missing_enum_labels(cur, values: Dict[str, pd.Series], table: str = BASE_TABLE) -> Dict[str, List[str]]:
+    """Метки загрузки, которых ещё нет в типах ENUM столбцов (только чтение)"""
+    enums = enum_columns(cur, table)
+    missing = {}
+    for col, series in values.items():
+        if col not in enums:
+            continue
+        labels = [label for label in enum_labels(series) if label not in enums[col]['labels']]
+        if labels:
+            missing[col] = labels
+    return missing
+
+
+def add_enum_labels(cur, labels: Dict[str, List[str]], table: str = BASE_TABLE) -> Dict[str, List[str]]:
+    """Добавляет в типы ENUM новые метки (новые ответы в загрузке).
+
+    ALTER TYPE ... ADD VALUE нужно зафиксировать до COPY: новая метка
+    не видна в транзакции, которая её добавила. Поэтому метки добавляются
+    отдельно и только для загрузки, прошедшей все проверки."""
+    enums = enum_columns(cur, table)
+    added = {}
+    for col, missing in labels.items():
+        if col not in enums:
+            continue
+        for label in missing:
+            cur.execute(f"ALTER TYPE {enums[col]['type']} ADD VALUE IF NOT EXISTS %s", (label,))
+        added[col] = missing
+    if added:
+        schema_cache.invalidate(f'enums:{table}')
+    return added
+
+
+# Допустимые диапазоны целых типов PostgreSQL (data_type из information_schema)
+INTEGER_RANGES = {
+    'smallint': (-2 ** 15, 2 ** 15 - 1),
+    'integer': (-2 ** 31, 2 ** 31 - 1),
+    'bigint': (-2 ** 63, 2 ** 63 - 1)
+}
+# Столько неподходящих значений показывается в ошибке загрузки
+INVALID_VALUES_SHOWN = 5
+
+
+def invalid_values(series: pd.Series, data_type: str) -> list:
+    """Значения загрузки, которые не помещаются в тип столбца без потерь.
+
+    После миграции числовые столбцы данных — INTEGER, BIGINT или DOUBLE
+    PRECISION, и проверка ловит только выход за диапазон целого; ветки
+    BOOLEAN, SMALLINT и REAL защищают базу, которую ещё не мигрировали.
+    Нечисловые значения в числовых столбцах здесь не проверяются — они,
+    как и раньше, записываются как NULL."""
+    values = series.dropna()
+    if values.empty:
+        return []
+    if data_type == 'boolean':
+        if pd.api.types.is_bool_dtype(values):
+            return []
+        numeric = pd.to_numeric(values.map(lambda value: int(value) if isinstance(value, bool) else value),
+                                errors='coerce')
+        bad = ~numeric.isin([0, 1])
+    elif data_type in INTEGER_RANGES:
+        numeric = np.trunc(pd.to_numeric(values, errors='coerce').replace([np.inf, -np.inf], np.nan))
+        low, high = INTEGER_RANGES[data_type]
+        bad = (numeric < low) | (numeric > high)
+    elif data_type == 'real':
+        numeric = pd.to_numeric(values, errors='coerce').replace([np.inf, -np.inf], np.nan).astype('float64')
+        with np.errstate(over='ignore'):
+            bad = numeric.notna() & (numeric.astype(np.float32).astype(np.float64) != numeric)
+    else:
+        return []
+    return values[bad].head(INVALID_VALUES_SHOWN).tolist()
+
+
+def plain_value(value):
+    """BOOLEAN-флаги (базы до миграции) наружу отдаются как 0/1"""
+    return int(value) if isinstance(value, bool) else value
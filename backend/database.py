@@ -0,0 +1,184 @@
+# backend/database.py
+
+import os
+import threading
+import time
+from contextlib import asynccontextmanager
+
+from dotenv import load_dotenv
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from fastapi import HTTPException
+
+# Загружаем переменные окружения из файла .env
+load_dotenv()
+
+# --- Конфигурация пула соединений ---
+DATABASE_URL = os.getenv("DATABASE_URL")
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+# 0 — без ограничения времени выполнения запроса
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "30000"))
+
+
+class PoolMetrics:
+    """Счётчики ожидания соединений из пула"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def record(self, wait: float, timed_out: bool = False):
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+                return
+            self.checkouts += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            avg_wait = self.total_wait / self.checkouts if self.checkouts else 0.0
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "avg_wait_ms": round(avg_wait * 1000, 3),
+                "max_wait_ms": round(self.max_wait * 1000, 3)
+            }
+
+
+pool_metrics = PoolMetrics()
+async_pool_metrics = PoolMetrics()
+
+
+class _InstrumentedPoolMixin:
+    """Измеряет время ожидания свободного соединения из пула"""
+
+    metrics: PoolMetrics
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except Exception:
+            self.metrics.record(time.perf_counter() - started, timed_out=True)
+            raise
+        self.metrics.record(time.perf_counter() - started)
+        return connection
+
+
+class InstrumentedQueuePool(_InstrumentedPoolMixin, QueuePool):
+    metrics = pool_metrics
+
+
+class InstrumentedAsyncQueuePool(_InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    metrics = async_pool_metrics
+
+
+def _connect_args() -> dict:
+    if DB_STATEMENT_TIMEOUT_MS > 0:
+        return {"options": f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}"}
+    return {}
+
+
+def _async_connect_args() -> dict:
+    if DB_STATEMENT_TIMEOUT_MS > 0:
+        return {"server_settings": {"statement_timeout": str(DB_STATEMENT_TIMEOUT_MS)}}
+    return {}
+
+
+def _async_database_url(url: str) -> str:
+    """postgresql://... -> postgresql+asyncpg://..."""
+    scheme, sep, rest = url.partition("://")
+    return f"postgresql+asyncpg{sep}{rest}" if scheme.startswith("postgres") else url
+
+
+# --- Общий движок для всех роутеров ---
+engine = create_engine(
+    DATABASE_URL,
+    poolclass=InstrumentedQueuePool,
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_timeout=DB_POOL_TIMEOUT,
+    pool_recycle=DB_POOL_RECYCLE,
+    pool_pre_ping=DB_POOL_PRE_PING,
+    connect_args=_connect_args()
+)
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+Base = declarative_base()
+
+# --- Асинхронный движок (asyncpg) для async-эндпоинтов ---
+async_engine = create_async_engine(
+    _async_database_url(DATABASE_URL),
+    poolclass=InstrumentedAsyncQueuePool,
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_timeout=DB_POOL_TIMEOUT,
+    pool_recycle=DB_POOL_RECYCLE,
+    pool_pre_ping=DB_POOL_PRE_PING,
+    connect_args=_async_connect_args()
+)
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, expire_on_commit=False)
+
+
+# --- Зависимость для БД ---
+def get_db():
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+def get_db_connection():
+    """DBAPI-соединение (psycopg2) из общего пула; close() возвращает его в пул"""
+    try:
+        return engine.raw_connection()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Ошибка подключения к БД: {str(e)}")
+
+
+@asynccontextmanager
+async def asyncpg_connection():
+    """Соединение asyncpg из асинхронного пула — для возможностей драйвера (COPY)"""
+    async with async_engine.connect() as connection:
+        raw = await connection.get_raw_connection()
+        yield raw.driver_connection
+
+
+def _pool_snapshot(pool, metrics: PoolMetrics) -> dict:
+    capacity = pool.size() + DB_MAX_OVERFLOW
+    return {
+        "pool_size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        # До заполнения пула QueuePool возвращает отрицательный overflow
+        "overflow": max(pool.overflow(), 0),
+        "max_overflow": DB_MAX_OVERFLOW,
+        "occupancy": round(pool.checkedout() / capacity, 3) if capacity else 0.0,
+        "timeout_s": DB_POOL_TIMEOUT,
+        **metrics.snapshot()
+    }
+
+
+def pool_status() -> dict:
+    """Заполненность пулов и статистика ожидания соединений"""
+    return {
+        "sync": _pool_snapshot(engine.pool, pool_metrics),
+        "async": _pool_snapshot(async_engine.sync_engine.pool, async_pool_metrics)
+    }
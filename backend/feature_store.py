@@ -0,0 +1,98 @@
+# backend/feature_store.py
+#
+# Готовый вектор признаков модели в строке пациента. Вектор считается один
+# раз при записи пациента (create_db.py, загрузка новых пациентов) и хранится
+# в fa_rgnkc_data.features (REAL[] в порядке FEATURE_COLUMNS, NULL в
+# невалидных ячейках) вместе с флагом features_valid. Оценка ФА читает
+# готовые векторы узким запросом вместо разбора сырых столбцов.
+# Строки из прежних версий (features_valid IS NULL) досчитываются при первом
+# чтении или заранее из корня проекта:
+#   python -m backend.feature_store
+
+import os
+from typing import Dict, List, Optional
+
+import pandas as pd
+from dotenv import load_dotenv
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from backend.features import FEATURE_COLUMNS, feature_vectors, prepare_feature_matrix
+from backend.schema import BASE_TABLE
+
+load_dotenv()
+
+# Размер порции досчёта векторов
+FEATURE_BACKFILL_CHUNK = int(os.getenv('FEATURE_BACKFILL_CHUNK', '1000'))
+
+RAW_FEATURES_SQL = ", ".join(f'"{col}"' for col in FEATURE_COLUMNS)
+
+
+def compute_feature_values(df: pd.DataFrame) -> List[tuple]:
+    """(features, features_valid) для каждой строки DataFrame с сырыми столбцами признаков"""
+    batch = prepare_feature_matrix(df)
+    return list(zip(feature_vectors(batch), batch.valid.tolist()))
+
+
+def write_feature_values(db: Session, rows: List[tuple]) -> int:
+    """Сохраняет векторы: rows — кортежи (code, features, features_valid)"""
+    updated = 0
+    for start in range(0, len(rows), FEATURE_BACKFILL_CHUNK):
+        chunk = rows[start:start + FEATURE_BACKFILL_CHUNK]
+        params = {}
+        rows_sql = []
+        for i, (code, vector, valid) in enumerate(chunk):
+            params[f"code_{i}"] = code
+            params[f"features_{i}"] = vector
+            params[f"valid_{i}"] = bool(valid)
+            rows_sql.append(f"(:code_{i}, CAST(:features_{i} AS REAL[]), CAST(:valid_{i} AS BOOLEAN))")
+        result = db.execute(text(f'''
+            UPDATE {BASE_TABLE} AS d SET features = v.features, features_valid = v.valid
+            FROM (VALUES {", ".join(rows_sql)}) AS v(code, features, valid)
+            WHERE d.col_1 = v.code
+        '''), params)
+        updated += result.rowcount
+    return updated
+
+
+def fill_missing_features(db: Session, codes: List) -> Dict[object, tuple]:
+    """Считает и сохраняет векторы пациентов, у которых их ещё нет.
+
+    Возвращает code -> (features, features_valid)."""
+    if not codes:
+        return {}
+    result = db.execute(
+        text(f'SELECT col_1, {RAW_FEATURES_SQL} FROM {BASE_TABLE} WHERE col_1 = ANY(:codes)'),
+        {'codes': list(codes)}
+    )
+    df = pd.DataFrame(result.fetchall(), columns=list(result.keys()))
+    if df.empty:
+        return {}
+    values = compute_feature_values(df)
+    write_feature_values(db, [(code, vector, valid) for code, (vector, valid) in zip(df['col_1'].tolist(), values)])
+    return dict(zip(df['col_1'].tolist(), values))
+
+
+def backfill_features(db: Session) -> int:
+    """Досчитывает векторы всех строк без features_valid порциями по col_1"""
+    total = 0
+    after = None
+    while True:
+        where_sql = "AND col_1 > :after" if after is not None else ""
+        codes = db.execute(text(f'''
+            SELECT col_1 FROM {BASE_TABLE}
+            WHERE features_valid IS NULL AND col_1 IS NOT NULL {where_sql}
+            ORDER BY col_1 LIMIT :limit
+        '''), {'after': after, 'limit': FEATURE_BACKFILL_CHUNK}).scalars().all()
+        if not codes:
+            return total
+        total += len(fill_missing_features(db, codes))
+        db.commit()
+        after = codes[-1]
+
+
+if __name__ == '__main__':
+    from backend.database import SessionLocal
+
+    with SessionLocal() as session:
+        print(f"✅ Векторы признаков посчитаны: {backfill_features(session)} строк")
@@ -0,0 +1,167 @@
+# backend/features.py
+
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+# Признаки модели в порядке, который ожидает /predict_ensemble
+FEATURE_COLUMNS = ['col_14', 'col_58', 'col_59', 'col_85', 'col_232', 'col_249', 'col_252', 'col_245']
+
+COL_58_MAPPING = {
+    '<1 раза в месяц': 0.0,
+    '<1 раза в неделю': 1.0,
+    '1 раз в неделю': 2.0,
+    '2-3 раза в неделю': 3.0,
+    'Ежедневно': 4.0
+}
+
+COL_59_MAPPING = {
+    '<30 мин': 0.0,
+    '30-60 мин': 1.0,
+    '1-4 часа': 2.0,
+    '>4 часов': 3.0
+}
+
+COL_245_MAPPING = {
+    '0 - не может выполнить': 0.0,
+    '1 - ≥8,71': 1.0,
+    '≥8,71': 1.0,
+    '2 - 6,21–8,70': 2.0,
+    '6,21–8,70': 2.0,
+    '3 - 4,82–6,20': 3.0,
+    '4,82–6,20': 3.0,
+    '4 - ≤4,81': 4.0,
+    '≤4,81': 4.0
+}
+
+
+@dataclass
+class FeatureBatch:
+    """Результат подготовки признаков для набора пациентов.
+
+    matrix  — float32-матрица (n, 8) в порядке FEATURE_COLUMNS, NaN в невалидных ячейках;
+    valid   — маска строк, пригодных для предсказания;
+    failures — для каждого признака маска строк, в которых он невалиден."""
+    matrix: np.ndarray
+    valid: np.ndarray
+    failures: Dict[str, np.ndarray]
+
+    def __len__(self) -> int:
+        return len(self.valid)
+
+    def failed_columns(self) -> List[List[str]]:
+        """Список невалидных признаков для каждой строки"""
+        failed = [[] for _ in range(len(self))]
+        for col in FEATURE_COLUMNS:
+            for i in np.flatnonzero(self.failures[col]):
+                failed[i].append(col)
+        return failed
+
+    def failure_counts(self) -> Dict[str, int]:
+        """Количество невалидных значений по каждому признаку"""
+        return {col: int(mask.sum()) for col, mask in self.failures.items() if mask.any()}
+
+
+def _text_mask(series: pd.Series) -> pd.Series:
+    return series.map(type).eq(str)
+
+
+def _extract_numeric(series: pd.Series) -> pd.Series:
+    """Векторный аналог doctor.extract_numeric_value"""
+    is_text = _text_mask(series)
+    result = pd.to_numeric(series.where(~is_text), errors='coerce').astype('float64')
+    if is_text.any():
+        text = series[is_text].astype(str).str.strip()
+        # Сначала числа с плавающей точкой, затем целые
+        float_part = text.str.extract(r'([-+]?\d+[,.]\d+)', expand=False).str.replace(',', '.', regex=False)
+        int_part = text.str.extract(r'([-+]?\d+)', expand=False)
+        result[is_text] = pd.to_numeric(float_part.fillna(int_part), errors='coerce')
+    return result
+
+
+def _to_float(series: pd.Series) -> pd.Series:
+    """Векторный аналог float(value) с None вместо ошибки"""
+    is_text = _text_mask(series)
+    result = pd.to_numeric(series.where(~is_text), errors='coerce').astype('float64')
+    if is_text.any():
+        result[is_text] = pd.to_numeric(series[is_text].astype(str).str.strip(), errors='coerce')
+    return result
+
+
+def _map_categories(series: pd.Series, mapping: Dict[str, float]) -> pd.Series:
+    return series.astype(str).str.strip().map(mapping).astype('float64')
+
+
+def _prepare_col_245(series: pd.Series) -> pd.Series:
+    is_text = _text_mask(series)
+    numeric = pd.to_numeric(series.where(~is_text), errors='coerce').astype('float64')
+    # Числа в диапазоне 0-4 усекаются до целого, как int(value)
+    result = np.trunc(numeric.where((numeric >= 0) & (numeric <= 4)))
+    if is_text.any():
+        result[is_text] = _map_categories(series[is_text], COL_245_MAPPING)
+    return result
+
+
+def prepare_feature_matrix(df: pd.DataFrame) -> FeatureBatch:
+    """Подготавливает признаки модели для всех строк DataFrame за один проход.
+
+    Правила преобразования и допустимые диапазоны совпадают с
+    doctor.validate_and_prepare_features."""
+    df = df.reindex(columns=FEATURE_COLUMNS)
+
+    col_14 = _extract_numeric(df['col_14'])
+    col_14 = col_14.where((col_14 >= 0.0) & (col_14 <= 7.0))
+
+    col_232 = _to_float(df['col_232'])
+    col_232 = np.round(col_232.where((col_232 >= 0.0) & (col_232 <= 100.0)) / 5.0) * 5.0
+
+    col_249 = _to_float(df['col_249'])
+    col_249 = col_249.where((col_249 >= 0.0) & (col_249 <= 12.0) & (col_249 == np.floor(col_249)))
+
+    columns = {
+        'col_14': col_14,
+        'col_58': _map_categories(df['col_58'], COL_58_MAPPING),
+        'col_59': _map_categories(df['col_59'], COL_59_MAPPING),
+        'col_85': _extract_numeric(df['col_85']),
+        'col_232': col_232,
+        'col_249': col_249,
+        'col_252': _extract_numeric(df['col_252']),
+        'col_245': _prepare_col_245(df['col_245'])
+    }
+
+    matrix = np.column_stack([columns[col].to_numpy(dtype='float64') for col in FEATURE_COLUMNS]).astype(np.float32)
+    failures = {col: np.isnan(matrix[:, i]) for i, col in enumerate(FEATURE_COLUMNS)}
+    valid = ~np.isnan(matrix).any(axis=1)
+
+    return FeatureBatch(matrix=matrix, valid=valid, failures=failures)
+
+
+def feature_hashes(matrix: np.ndarray) -> List[str]:
+    """Хэш подготовленного вектора признаков каждой строки (16 hex-символов).
+
+    Сравнивается с fa_features_hash, чтобы пересчитывать fa только у пациентов
+    с изменившимися признаками."""
+    hashes = pd.util.hash_pandas_object(pd.DataFrame(np.asarray(matrix, dtype=np.float32)), index=False)
+    return [f'{value:016x}' for value in hashes.to_numpy(dtype=np.uint64).tolist()]
+
+
+def feature_vectors(batch: FeatureBatch) -> List[List[Optional[float]]]:
+    """Строки матрицы признаков для столбца features (None вместо NaN)"""
+    return [[None if np.isnan(value) else value for value in row] for row in batch.matrix.tolist()]
+
+
+def stored_feature_batch(vectors: Sequence[Sequence[Optional[float]]]) -> FeatureBatch:
+    """FeatureBatch из сохранённых векторов features — без повторного разбора сырых столбцов"""
+    matrix = np.array(
+        [[np.nan if value is None else value for value in vector] for vector in vectors], dtype=np.float32
+    ).reshape(-1, len(FEATURE_COLUMNS))
+    failures = {col: np.isnan(matrix[:, i]) for i, col in enumerate(FEATURE_COLUMNS)}
+    valid = ~np.isnan(matrix).any(axis=1)
+    return FeatureBatch(matrix=matrix, valid=valid, failures=failures)
+
+
+def feature_array_literal(vector: Sequence[Optional[float]]) -> str:
+    """Литерал массива PostgreSQL для загрузки features через COPY (CSV)"""
+    return '{' + ','.join('NULL' if value is None else repr(float(value)) for value in vector) + '}'
@@ -0,0 +1,313 @@
+# backend/jobs.py
+#
+# Фоновые задачи (пакетная оценка ФА) вне HTTP-запроса. Состояние хранится
+# в fa_rgnkc_jobs, поэтому прогресс виден с любого воркера. Обработчик задачи
+# идёт по пациентам порциями и в той же транзакции, что и запись результатов
+# порции, сохраняет контрольную точку; перезапуск упавшей задачи продолжает
+# с последней контрольной точки.
+# Каждый запуск задачи получает номер попытки (attempts) — аренду. Записи
+# прогресса и итоговый статус принимаются только от текущей попытки: если
+# задачу перезапустили как зависшую, прежний исполнитель получает LeaseLost
+# и останавливается, не перезаписывая чужой прогресс. Пока обработчик
+# работает, фоновый поток раз в JOB_HEARTBEAT_SECONDS отмечает, что задача
+# жива, — даже если одна порция (медленная модель, повторы) идёт дольше
+# JOB_STALE_SECONDS. Активная задача каждого
+# вида одна — это гарантирует частичный уникальный индекс (schema.ensure_jobs_table).
+
+import json
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+from dotenv import load_dotenv
+from fastapi import HTTPException
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
+
+from backend.database import SessionLocal
+from backend.schema import JOBS_TABLE
+
+load_dotenv()
+
+# Число одновременно выполняемых задач на воркер
+JOB_WORKERS = int(os.getenv('JOB_WORKERS', '1'))
+# Задача в статусе running без обновлений дольше этого считается прерванной
+JOB_STALE_SECONDS = int(os.getenv('JOB_STALE_SECONDS', '300'))
+# Период фоновой отметки «задача жива»; должен быть заметно меньше JOB_STALE_SECONDS
+JOB_HEARTBEAT_SECONDS = float(os.getenv('JOB_HEARTBEAT_SECONDS', str(max(JOB_STALE_SECONDS / 5, 1))))
+# Не больше стольких записей о неудачных предсказаниях в задаче
+JOB_MAX_FAILURES = int(os.getenv('JOB_MAX_FAILURES', '1000'))
+
+ACTIVE_STATUSES = ('queued', 'running')
+FINAL_STATUSES = ('succeeded', 'failed')
+
+_executor = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix='job')
+_handlers: Dict[str, Callable] = {}
+
+
+class LeaseLost(Exception):
+    """Задачу перезапустили или завершили в обход этого исполнителя"""
+
+
+def register(kind: str):
+    """Регистрирует обработчик задач вида kind: handler(job: JobContext)"""
+    def decorator(handler: Callable):
+        _handlers[kind] = handler
+        return handler
+    return decorator
+
+
+class JobContext:
+    """Выполняемая задача: параметры, контрольная точка и запись прогресса"""
+
+    def __init__(self, row: dict):
+        self.id = row['id']
+        self.kind = row['kind']
+        self.params = row['params'] or {}
+        self.total = row['total']
+        self.checkpoint = row['checkpoint']
+        self.attempt = row['attempts']
+        self._elapsed_before = row['elapsed_seconds']
+        self._run_started = time.perf_counter()
+        self._lease_lost: Optional[str] = None
+
+    def _elapsed(self) -> float:
+        return self._elapsed_before + (time.perf_counter() - self._run_started)
+
+    def _check_lease(self, result):
+        if result.rowcount == 0:
+            raise LeaseLost(f"Задача {self.id} (попытка {self.attempt}) больше не принадлежит этому исполнителю")
+
+    def heartbeat(self):
+        """Отмечает, что задача жива, отдельной короткой транзакцией.
+
+        Вызывается фоновым потоком _keep_alive; при потере аренды поднимает LeaseLost."""
+        with SessionLocal() as db:
+            result = db.execute(text(f'''
+                UPDATE {JOBS_TABLE} SET heartbeat_at = now(), elapsed_seconds = :elapsed
+                WHERE id = :id AND attempts = :attempt AND status = 'running'
+            '''), {'elapsed': self._elapsed(), 'id': self.id, 'attempt': self.attempt})
+            db.commit()
+        self._check_lease(result)
+
+    def check_lease(self):
+        """Поднимает LeaseLost, если фоновая отметка обнаружила потерю аренды (без запроса к БД).
+
+        Обработчик вызывает её между пакетами модели, чтобы не доделывать чужую порцию."""
+        if self._lease_lost is not None:
+            raise LeaseLost(self._lease_lost)
+
+    def _keep_alive(self, stop: threading.Event):
+        while not stop.wait(JOB_HEARTBEAT_SECONDS):
+            try:
+                self.heartbeat()
+            except LeaseLost as e:
+                self._lease_lost = str(e)
+                return
+            except Exception as e:
+                # Сбой БД не останавливает задачу: следующая отметка или запись прогресса повторит попытку
+                print(f"⚠️  Задача {self.id}: отметка активности не записана: {e}")
+
+    def set_total(self, db, total: int):
+        self.total = total
+        self._check_lease(db.execute(text(f'''
+            UPDATE {JOBS_TABLE} SET total = :total, heartbeat_at = now()
+            WHERE id = :id AND attempts = :attempt AND status = 'running'
+        '''), {'total': total, 'id': self.id, 'attempt': self.attempt}))
+
+    def save_progress(self, db, checkpoint, processed: int, updated: int = 0, skipped: int = 0,
+                      failures: Optional[List[dict]] = None):
+        """Прибавляет счётчики порции и сдвигает контрольную точку.
+
+        Выполняется в сессии обработчика — фиксируется вместе с результатами порции.
+        При потере аренды поднимает LeaseLost до фиксации, и обработчик откатывает порцию."""
+        failures = failures or []
+        result = db.execute(text(f'''
+            UPDATE {JOBS_TABLE} SET
+                checkpoint = :checkpoint,
+                processed = processed + :processed,
+                updated = updated + :updated,
+                skipped = skipped + :skipped,
+                failed = failed + :failed,
+                failures = CASE WHEN jsonb_array_length(failures) < :max_failures
+                                THEN failures || CAST(:failures AS JSONB) ELSE failures END,
+                elapsed_seconds = :elapsed,
+                heartbeat_at = now()
+            WHERE id = :id AND attempts = :attempt AND status = 'running'
+        '''), {
+            'checkpoint': str(checkpoint),
+            'processed': processed,
+            'updated': updated,
+            'skipped': skipped,
+            'failed': len(failures),
+            'failures': json.dumps(failures, ensure_ascii=False, default=str),
+            'max_failures': JOB_MAX_FAILURES,
+            'elapsed': self._elapsed(),
+            'id': self.id,
+            'attempt': self.attempt
+        })
+        self._check_lease(result)
+        self.checkpoint = str(checkpoint)
+
+
+def _job_view(row) -> dict:
+    job = dict(row)
+    for key in ('created_at', 'started_at', 'heartbeat_at', 'finished_at'):
+        if job.get(key) is not None:
+            job[key] = job[key].isoformat()
+    elapsed = job['elapsed_seconds']
+    job['rows_per_second'] = round(job['processed'] / elapsed, 1) if elapsed > 0 else 0.0
+    job['progress'] = round(job['processed'] / job['total'], 4) if job['total'] else None
+    job['elapsed_seconds'] = round(elapsed, 3)
+    return job
+
+
+def get_job(job_id: str) -> Optional[dict]:
+    with SessionLocal() as db:
+        row = db.execute(text(f'SELECT * FROM {JOBS_TABLE} WHERE id = :id'), {'id': job_id}).mappings().first()
+    return _job_view(row) if row else None
+
+
+def list_jobs(limit: int = 20) -> List[dict]:
+    with SessionLocal() as db:
+        rows = db.execute(text(f'''
+            SELECT * FROM {JOBS_TABLE} ORDER BY created_at DESC LIMIT :limit
+        '''), {'limit': limit}).mappings().all()
+    # Списки неудач отдаются только в карточке задачи
+    return [{**_job_view(row), 'failures': []} for row in rows]
+
+
+def _expire_stale(db, kind: str, exclude_id: Optional[str] = None):
+    """Помечает упавшими зависшие активные задачи вида kind.
+
+    Зависшая задача не должна навсегда занимать место активной; её можно
+    продолжить через resume_job, а прежний исполнитель, если он ещё жив,
+    потеряет аренду на следующей записи прогресса."""
+    db.execute(text(f'''
+        UPDATE {JOBS_TABLE} SET status = 'failed', finished_at = now(),
+            error = 'Задача прервана: нет обновлений дольше ' || :stale || ' с'
+        WHERE kind = :kind AND status IN ('queued', 'running') AND id IS DISTINCT FROM :exclude_id
+          AND COALESCE(heartbeat_at, created_at) < now() - make_interval(secs => :stale)
+    '''), {'kind': kind, 'stale': JOB_STALE_SECONDS, 'exclude_id': exclude_id})
+
+
+def create_job(kind: str, params: dict) -> dict:
+    """Ставит задачу в очередь воркера и сразу возвращает её состояние.
+
+    Если задача этого вида уже выполняется, возвращается она — повторное
+    нажатие или повтор запроса прокси не запускает второй прогон. Вставка
+    идёт через ON CONFLICT по частичному уникальному индексу, поэтому два
+    одновременных запроса не создадут две задачи."""
+    if kind not in _handlers:
+        raise ValueError(f"Неизвестный вид задачи: {kind}")
+    params_json = json.dumps(params, sort_keys=True)
+    job_id = uuid.uuid4().hex
+    with SessionLocal() as db:
+        _expire_stale(db, kind)
+        inserted = db.execute(text(f'''
+            INSERT INTO {JOBS_TABLE} (id, kind, status, params)
+            VALUES (:id, :kind, 'queued', CAST(:params AS JSONB))
+            ON CONFLICT (kind) WHERE status IN ('queued', 'running') DO NOTHING
+            RETURNING id
+        '''), {'id': job_id, 'kind': kind, 'params': params_json}).scalar()
+        existing = None
+        if inserted is None:
+            existing = db.execute(text(f'''
+                SELECT id FROM {JOBS_TABLE} WHERE kind = :kind AND status IN ('queued', 'running')
+            '''), {'kind': kind}).scalar()
+        db.commit()
+
+    if inserted is None:
+        if existing is None:
+            # Активная задача успела завершиться между вставкой и чтением
+            return create_job(kind, params)
+        return {**get_job(existing), 'existing': True}
+
+    _executor.submit(_run, job_id)
+    return {**get_job(job_id), 'existing': False}
+
+
+def resume_job(job_id: str) -> dict:
+    """Перезапускает упавшую или прерванную задачу с последней контрольной точки.
+
+    Новый запуск получает следующий номер попытки, так что исполнитель
+    зависшей задачи, если он ещё жив, больше не может писать прогресс."""
+    with SessionLocal() as db:
+        kind = db.execute(text(f'SELECT kind FROM {JOBS_TABLE} WHERE id = :id'), {'id': job_id}).scalar()
+        if kind is None:
+            raise HTTPException(status_code=404, detail="Задача не найдена")
+        _expire_stale(db, kind, exclude_id=job_id)
+        try:
+            resumed = db.execute(text(f'''
+                UPDATE {JOBS_TABLE} SET status = 'queued', error = NULL, finished_at = NULL
+                WHERE id = :id AND (
+                    status = 'failed'
+                    OR (status IN ('queued', 'running')
+                        AND COALESCE(heartbeat_at, created_at) < now() - make_interval(secs => :stale))
+                )
+                RETURNING id
+            '''), {'id': job_id, 'stale': JOB_STALE_SECONDS}).scalar()
+            db.commit()
+        except IntegrityError:
+            # Частичный уникальный индекс: другая задача этого вида уже активна
+            db.rollback()
+            raise HTTPException(status_code=409, detail="Уже выполняется другая задача этого вида")
+
+    if resumed is None:
+        job = get_job(job_id)
+        raise HTTPException(status_code=409, detail=f"Задачу в статусе {job['status']} нельзя перезапустить")
+
+    _executor.submit(_run, job_id)
+    return get_job(job_id)
+
+
+def _finish(job: JobContext, status: str, error: Optional[str] = None):
+    """Итоговый статус записывается, только если аренда ещё у этого исполнителя"""
+    with SessionLocal() as db:
+        result = db.execute(text(f'''
+            UPDATE {JOBS_TABLE} SET status = :status, error = :error, finished_at = now(), heartbeat_at = now()
+            WHERE id = :id AND attempts = :attempt AND status = 'running'
+        '''), {'status': status, 'error': error, 'id': job.id, 'attempt': job.attempt})
+        db.commit()
+    if result.rowcount == 0:
+        print(f"⚠️  Задача {job.id}: попытка {job.attempt} потеряла аренду, статус {status} не записан")
+
+
+def _run(job_id: str):
+    with SessionLocal() as db:
+        row = db.execute(text(f'''
+            UPDATE {JOBS_TABLE} SET
+                status = 'running',
+                started_at = COALESCE(started_at, now()),
+                heartbeat_at = now(),
+                attempts = attempts + 1
+            WHERE id = :id AND status = 'queued'
+            RETURNING *
+        '''), {'id': job_id}).mappings().first()
+        db.commit()
+    if row is None:
+        return
+    job = JobContext(row)
+    stop = threading.Event()
+    keeper = threading.Thread(target=job._keep_alive, args=(stop,), name=f'job-heartbeat-{job.id[:8]}', daemon=True)
+    keeper.start()
+    try:
+        print(f"▶️  Задача {job.kind} {job.id} запущена (попытка {job.attempt}, контрольная точка: {job.checkpoint})")
+        _handlers[job.kind](job)
+    except LeaseLost as e:
+        # Задачу ведёт другой исполнитель — ничего не записываем
+        print(f"⏹️  {e}")
+        return
+    except Exception as e:
+        error = str(e)
+        print(f"❌ Задача {job_id} завершилась с ошибкой: {error}")
+        _finish(job, 'failed', error)
+        return
+    finally:
+        stop.set()
+        keeper.join(timeout=JOB_HEARTBEAT_SECONDS)
+    _finish(job, 'succeeded')
+    print(f"✅ Задача {job_id} выполнена")
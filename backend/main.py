@@ -1,16 +1,53 @@
 # /home/user/HpProject/backend/main.py
 
+import importlib
+import time
+from contextlib import asynccontextmanager
+
+_started = time.perf_counter()
+
 from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from backend.routers import (
-    doctor,
-    level_fa,
-    upload_patients,
-    patient_card,
-    patient_program  
-)
 
-app = FastAPI()
+from backend import synthetic
+from backend.schema import verify_runtime_schema
+
+# Порядок подключения роутеров; время импорта каждого попадает в отчёт о старте
+ROUTER_MODULES = [
+    "doctor",
+    "upload_patients",
+    "level_fa",
+    "patient_card",
+    "patient_program",
+    "metrics",
+    "jobs",
+]
+
+import_seconds = {}
+routers = {}
+for name in ROUTER_MODULES:
+    import_started = time.perf_counter()
+    routers[name] = importlib.import_module(f"backend.routers.{name}")
+    import_seconds[name] = round(time.perf_counter() - import_started, 3)
+
+startup_report = routers["metrics"].startup_report
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    startup_report["router_import_seconds"] = import_seconds
+    startup_report["ready_seconds"] = round(time.perf_counter() - _started, 3)
+    print(f"🚀 Приложение готово за {startup_report['ready_seconds']} с, импорт роутеров: {import_seconds}")
+    # Модель CTGAN догружается в фоне и не задерживает готовность воркера
+    synthetic.start_warmup()
+    # Схема только проверяется: миграция — отдельный шаг python -m backend.schema.
+    # Если схема устарела, воркер не стартует, а не работает с ошибками в запросах
+    await run_in_threadpool(verify_runtime_schema)
+    yield
+
+
+app = FastAPI(lifespan=lifespan)
 
 # Настройка CORS для взаимодействия с фронтендом
 app.add_middleware(
@@ -22,11 +59,13 @@ app.add_middleware(
 )
 
 # Подключение маршрутов
-app.include_router(doctor.router)
-app.include_router(upload_patients.router, prefix="/api")
-app.include_router(level_fa.router, prefix="/level-fa", tags=["level-fa"])
-app.include_router(patient_card.router)
-app.include_router(patient_program.router)
+app.include_router(routers["doctor"].router)
+app.include_router(routers["upload_patients"].router, prefix="/api")
+app.include_router(routers["level_fa"].router, prefix="/level-fa", tags=["level-fa"])
+app.include_router(routers["patient_card"].router)
+app.include_router(routers["patient_program"].router)
+app.include_router(routers["metrics"].router)
+app.include_router(routers["jobs"].router)
 
 @app.get("/")
 async def root():
@@ -34,4 +73,4 @@ async def root():
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
+    uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
@@ -0,0 +1,58 @@
+# backend/offload.py
+#
+# Ограниченный пул потоков для тяжёлой работы (pandas, openpyxl, CTGAN,
+# блокирующие вызовы psycopg2) из async-эндпоинтов. Event loop воркера
+# остаётся свободным, а число одновременных тяжёлых задач ограничено.
+
+import asyncio
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+OFFLOAD_POOL_SIZE = int(os.getenv('OFFLOAD_POOL_SIZE', str(min(4, os.cpu_count() or 1))))
+
+_executor = ThreadPoolExecutor(max_workers=OFFLOAD_POOL_SIZE, thread_name_prefix='offload')
+_lock = threading.Lock()
+_active = 0
+_queued = 0
+_completed = 0
+
+
+def _tracked(func):
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        global _active, _queued, _completed
+        with _lock:
+            _queued -= 1
+            _active += 1
+        try:
+            return func(*args, **kwargs)
+        finally:
+            with _lock:
+                _active -= 1
+                _completed += 1
+    return wrapper
+
+
+async def run_offloaded(func, *args, **kwargs):
+    """Выполняет func(*args, **kwargs) в пуле и ожидает результат, не блокируя event loop"""
+    global _queued
+    with _lock:
+        _queued += 1
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, functools.partial(_tracked(func), *args, **kwargs))
+
+
+def offload_status() -> dict:
+    with _lock:
+        return {
+            'pool_size': OFFLOAD_POOL_SIZE,
+            'active': _active,
+            'queued': _queued,
+            'completed': _completed
+        }
@@ -0,0 +1,238 @@
+# backend/prediction_cache.py
+#
+# Кэш предсказаний ансамбля по подготовленному вектору признаков и версии
+# модели. Признаки — в основном небольшие порядковые шкалы, поэтому одни и те
+# же векторы повторяются (повторные прогоны predict-activity, одиночные и
+# ручные оценки, /test-model). Первый уровень — LRU в памяти воркера, второй
+# (необязательный) — Redis по PREDICTION_CACHE_REDIS_URL, общий для воркеров.
+# При смене версии модели локальный кэш сбрасывается, а ключи Redis содержат
+# версию и поэтому больше не совпадают. Если версия модели неизвестна
+# (HTTP-сервис без MODEL_VERSION), кэш не используется. Ключи Redis содержат
+# ещё и поколение кэша: invalidate() увеличивает его, и все воркеры перестают
+# видеть прежние записи (они истекают по TTL).
+
+import os
+import threading
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Размер LRU на воркер (0 — кэш выключен)
+PREDICTION_CACHE_SIZE = int(os.getenv('PREDICTION_CACHE_SIZE', '10000'))
+PREDICTION_CACHE_REDIS_URL = os.getenv('PREDICTION_CACHE_REDIS_URL')
+PREDICTION_CACHE_TTL = int(os.getenv('PREDICTION_CACHE_TTL', '86400'))
+# Признаки округляются, чтобы шум float (8.7 vs 8.700000001) не давал промахов
+FEATURE_DECIMALS = 6
+# Счётчик поколений общего кэша в Redis
+GENERATION_KEY = 'prediction:generation'
+
+FeatureKey = Tuple[float, ...]
+
+
+def feature_key(row) -> FeatureKey:
+    return tuple(round(float(value), FEATURE_DECIMALS) for value in row)
+
+
+class PredictionCache:
+    """LRU предсказаний для текущей версии модели с необязательным уровнем Redis"""
+
+    def __init__(self, max_size: int = PREDICTION_CACHE_SIZE, redis_url: Optional[str] = PREDICTION_CACHE_REDIS_URL):
+        self.max_size = max_size
+        self.redis_url = redis_url
+        self._lock = threading.Lock()
+        self._entries: 'OrderedDict[FeatureKey, int]' = OrderedDict()
+        self._version = None
+        self._generation = 0
+        self._redis = None
+        self._redis_error = None
+        self.hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.bypassed = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0
+
+    def _client(self):
+        """Клиент Redis создаётся при первом обращении; redis — необязательная зависимость"""
+        if not self.redis_url or self._redis_error:
+            return None
+        if self._redis is None:
+            try:
+                import redis
+
+                self._redis = redis.Redis.from_url(self.redis_url, socket_timeout=0.5)
+            except Exception as e:
+                self._redis_error = str(e)
+                print(f"⚠️  Redis для кэша предсказаний недоступен: {e}")
+                return None
+        return self._redis
+
+    @staticmethod
+    def _redis_key(version: str, generation: int, key: FeatureKey) -> str:
+        return f"prediction:{version}:g{generation}:{','.join(repr(value) for value in key)}"
+
+    def generation(self) -> Optional[int]:
+        """Текущее поколение общего кэша; None, если Redis не настроен или не ответил.
+
+        Читается один раз на вызов predict_cached и передаётся в get_many и put_many,
+        чтобы предсказания, посчитанные до invalidate(), не попали в новое поколение."""
+        client = self._client()
+        if client is None:
+            return None
+        try:
+            value = client.get(GENERATION_KEY)
+        except Exception as e:
+            print(f"Ошибка чтения поколения кэша предсказаний из Redis: {e}")
+            return None
+        return int(value) if value is not None else 0
+
+    def _sync_version(self, version: str, generation: Optional[int]):
+        """Вызывается под self._lock. Локальный уровень сбрасывается при смене
+        версии модели или поколения (invalidate() в другом воркере)"""
+        if generation is None:
+            generation = self._generation
+        if version != self._version or generation != self._generation:
+            if self._version is not None:
+                self.invalidations += 1
+            self._entries.clear()
+            self._version = version
+            self._generation = generation
+
+    def get_many(self, version: str, keys: List[FeatureKey], generation: Optional[int] = None) -> List[Optional[int]]:
+        results: List[Optional[int]] = [None] * len(keys)
+        missing = []
+        with self._lock:
+            self._sync_version(version, generation)
+            for i, key in enumerate(keys):
+                value = self._entries.get(key)
+                if value is None:
+                    missing.append(i)
+                else:
+                    self._entries.move_to_end(key)
+                    results[i] = value
+            self.hits += len(keys) - len(missing)
+
+        if missing and generation is not None:
+            try:
+                values = self._client().mget([self._redis_key(version, generation, keys[i]) for i in missing])
+            except Exception as e:
+                print(f"Ошибка чтения кэша предсказаний из Redis: {e}")
+                values = [None] * len(missing)
+            found = {}
+            for i, value in zip(missing, values):
+                if value is not None:
+                    results[i] = found[keys[i]] = int(value)
+            missing = [i for i in missing if results[i] is None]
+            with self._lock:
+                self.redis_hits += len(found)
+                self._put_local(version, generation, found)
+
+        with self._lock:
+            self.misses += len(missing)
+        return results
+
+    def _put_local(self, version: str, generation: Optional[int], values: dict):
+        """Вызывается под self._lock"""
+        if version != self._version or (generation is not None and generation != self._generation):
+            return
+        for key, value in values.items():
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def put_many(self, version: str, values: dict, generation: Optional[int] = None):
+        if not values:
+            return
+        with self._lock:
+            self._sync_version(version, generation)
+            self._put_local(version, generation, values)
+
+        if generation is not None:
+            try:
+                pipeline = self._client().pipeline(transaction=False)
+                for key, value in values.items():
+                    pipeline.set(self._redis_key(version, generation, key), value, ex=PREDICTION_CACHE_TTL)
+                pipeline.execute()
+            except Exception as e:
+                print(f"Ошибка записи кэша предсказаний в Redis: {e}")
+
+    def invalidate(self):
+        """Сбрасывает локальный уровень и начинает новое поколение общего уровня в Redis"""
+        client = self._client()
+        generation = None
+        if client is not None:
+            try:
+                generation = int(client.incr(GENERATION_KEY))
+            except Exception as e:
+                print(f"Ошибка сброса кэша предсказаний в Redis: {e}")
+        with self._lock:
+            self._entries.clear()
+            if generation is not None:
+                self._generation = generation
+            self.invalidations += 1
+
+    def record_bypass(self):
+        with self._lock:
+            self.bypassed += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.redis_hits + self.misses
+            return {
+                'enabled': self.enabled,
+                'model_version': self._version,
+                'generation': self._generation,
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'redis_hits': self.redis_hits,
+                'misses': self.misses,
+                'hit_rate': round((self.hits + self.redis_hits) / lookups, 4) if lookups else 0.0,
+                'invalidations': self.invalidations,
+                'bypassed_unknown_version': self.bypassed,
+                'redis': bool(self.redis_url) and not self._redis_error,
+                'redis_error': self._redis_error
+            }
+
+
+prediction_cache = PredictionCache()
+
+
+def predict_cached(predictor, features) -> List[Optional[int]]:
+    """predictor.predict только для векторов, которых нет в кэше.
+
+    Неудачные предсказания (None) не кэшируются. Без версии модели кэш
+    не используется: иначе после выкладки новой модели отдавались бы старые классы."""
+    rows = np.atleast_2d(np.asarray(features, dtype=float))
+    version = predictor.model_version
+    if not prediction_cache.enabled or rows.size == 0:
+        return predictor.predict(features)
+    if version is None:
+        prediction_cache.record_bypass()
+        return predictor.predict(features)
+
+    generation = prediction_cache.generation()
+    keys = [feature_key(row) for row in rows]
+    results = prediction_cache.get_many(version, keys, generation)
+
+    # Одинаковые векторы внутри пакета отправляются в модель один раз
+    pending = {}
+    for key, value in zip(keys, results):
+        if value is None and key not in pending:
+            pending[key] = None
+    if pending:
+        pending_keys = list(pending)
+        predictions = predictor.predict(np.asarray(pending_keys, dtype=float))
+        computed = {key: int(value) for key, value in zip(pending_keys, predictions) if value is not None}
+        prediction_cache.put_many(version, computed, generation)
+        results = [computed.get(key) if value is None else value for key, value in zip(keys, results)]
+
+    return results
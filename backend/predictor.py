@@ -0,0 +1,401 @@
+# backend/predictor.py
+
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Sequence, Union
+
+import httpx
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# --- Конфигурация ---
+# http  — удалённый сервис ML_MODEL_URL/predict_ensemble
+# local — ансамбль из models/, загружаемый в процесс воркера
+PREDICTOR_BACKEND = os.getenv('PREDICTOR_BACKEND', 'http').lower()
+
+# Гибкий URL для модели
+ML_MODEL_URL = os.getenv('ML_MODEL_URL', 'http://127.0.0.1:8080')
+MODEL_ENDPOINT = f"{ML_MODEL_URL}/predict_ensemble"
+
+# Пакетные предсказания: размер пакета для /predict_ensemble и число
+# параллельных одиночных запросов, если сервис не принимает пакеты
+PREDICTION_BATCH_SIZE = int(os.getenv('PREDICTION_BATCH_SIZE', '256'))
+PREDICTION_MAX_WORKERS = int(os.getenv('PREDICTION_MAX_WORKERS', '8'))
+
+# HTTP-клиент сервиса модели: бюджет времени на вызов (с повторами), повторы
+# с экспоненциальной задержкой, порог и время восстановления размыкателя цепи
+ML_TIMEOUT_SECONDS = float(os.getenv('ML_TIMEOUT_SECONDS', '10'))
+ML_CONNECT_TIMEOUT = float(os.getenv('ML_CONNECT_TIMEOUT', '2'))
+ML_MAX_RETRIES = int(os.getenv('ML_MAX_RETRIES', '2'))
+ML_RETRY_BACKOFF = float(os.getenv('ML_RETRY_BACKOFF', '0.2'))
+ML_BREAKER_THRESHOLD = int(os.getenv('ML_BREAKER_THRESHOLD', '5'))
+ML_BREAKER_RESET_SECONDS = float(os.getenv('ML_BREAKER_RESET_SECONDS', '30'))
+ML_POOL_CONNECTIONS = int(os.getenv('ML_POOL_CONNECTIONS', str(PREDICTION_MAX_WORKERS)))
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Ансамбль в формате ONNX (.onnx) или сериализованный scikit-learn (.pkl/.joblib).
+# Файл в репозиторий не входит: его нужно положить по этому пути (или задать путь)
+# из артефактов обученной модели сервиса ML_MODEL_URL
+LOCAL_MODEL_PATH = os.getenv('LOCAL_MODEL_PATH', os.path.join(project_root, 'models', 'ensemble', 'ensemble.onnx'))
+
+# Версия модели для кэша предсказаний и инкрементального пересчёта. Для HTTP-сервиса
+# задаётся явно: адрес сервиса не меняется при выкладке новой модели, поэтому без
+# MODEL_VERSION версия неизвестна (None) и кэш предсказаний не используется.
+# Для локальной модели по умолчанию — имя и время изменения файла.
+MODEL_VERSION = os.getenv('MODEL_VERSION')
+
+FeatureRows = Union[np.ndarray, Sequence[Sequence[float]]]
+
+
+def _parse_prediction(result) -> Optional[int]:
+    """Извлекает класс из ответа модели"""
+    # Проверяем 'predicted_class', 'prediction' или 'class'
+    if isinstance(result, dict):
+        return result.get('predicted_class', result.get('prediction', result.get('class', None)))
+    elif isinstance(result, (int, float)):
+        return int(result)
+    return None
+
+
+class ModelUnavailable(Exception):
+    """Сервис модели недоступен: цепь разомкнута или исчерпаны повторы"""
+
+
+class CircuitBreaker:
+    """Размыкается после failure_threshold подряд неудачных вызовов.
+
+    Пока цепь разомкнута, вызовы сразу отклоняются; через reset_seconds
+    пропускается один пробный вызов (half-open), успех замыкает цепь."""
+
+    def __init__(self, failure_threshold: int, reset_seconds: float):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._probe_in_flight = False
+        self.opened_count = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state()
+
+    def _state(self) -> str:
+        if self._opened_at is None:
+            return 'closed'
+        if time.monotonic() - self._opened_at >= self.reset_seconds:
+            return 'half_open'
+        return 'open'
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self._state()
+            if state == 'closed':
+                return True
+            if state == 'half_open' and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._probe_in_flight or self._failures >= self.failure_threshold:
+                if self._opened_at is None or self._probe_in_flight:
+                    self.opened_count += 1
+                self._opened_at = time.monotonic()
+                self._probe_in_flight = False
+
+
+class ClientMetrics:
+    """Счётчики и задержки вызовов сервиса модели"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.attempts = 0
+        self.retries = 0
+        self.failures = 0
+        self.rejected = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+
+    def record_attempt(self, latency: float, retry: bool):
+        with self._lock:
+            self.attempts += 1
+            self.retries += int(retry)
+            self.total_latency += latency
+            self.max_latency = max(self.max_latency, latency)
+
+    def incr(self, name: str):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                'calls': self.calls,
+                'attempts': self.attempts,
+                'retries': self.retries,
+                'failures': self.failures,
+                'rejected_by_breaker': self.rejected,
+                'avg_latency_ms': round(self.total_latency / self.attempts * 1000, 2) if self.attempts else 0.0,
+                'max_latency_ms': round(self.max_latency * 1000, 2)
+            }
+
+
+class HttpPredictor:
+    """Предсказания через HTTP-сервис ансамбля.
+
+    Один httpx.Client на воркер держит keep-alive соединения к сервису.
+    На вызов отводится ML_TIMEOUT_SECONDS с учётом повторов; сетевые ошибки
+    и ответы 5xx повторяются до ML_MAX_RETRIES раз с экспоненциальной
+    задержкой со случайным разбросом, а размыкатель цепи отклоняет вызовы,
+    пока сервис недоступен."""
+
+    name = 'http'
+
+    def __init__(self, endpoint: str = MODEL_ENDPOINT):
+        self.endpoint = endpoint
+        self.model_version = MODEL_VERSION
+        self._client = httpx.Client(
+            timeout=httpx.Timeout(ML_TIMEOUT_SECONDS, connect=ML_CONNECT_TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=ML_POOL_CONNECTIONS,
+                max_keepalive_connections=ML_POOL_CONNECTIONS
+            )
+        )
+        self.breaker = CircuitBreaker(ML_BREAKER_THRESHOLD, ML_BREAKER_RESET_SECONDS)
+        self.metrics = ClientMetrics()
+
+    def _post(self, payload: dict) -> httpx.Response:
+        """POST в сервис модели с повторами в пределах бюджета времени.
+
+        Ответы 4xx возвращаются без повторов (это ошибка запроса, а не сервиса)."""
+        self.metrics.incr('calls')
+        deadline = time.monotonic() + ML_TIMEOUT_SECONDS
+        last_error = None
+
+        for attempt in range(ML_MAX_RETRIES + 1):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            if not self.breaker.allow():
+                self.metrics.incr('rejected')
+                raise ModelUnavailable(f"Сервис модели недоступен (цепь разомкнута): {last_error or self.endpoint}")
+
+            started = time.perf_counter()
+            try:
+                response = self._client.post(self.endpoint, json=payload, timeout=httpx.Timeout(remaining, connect=min(ML_CONNECT_TIMEOUT, remaining)))
+                error = None if response.status_code < 500 else f"HTTP {response.status_code}"
+            except httpx.HTTPError as e:
+                response, error = None, f"{type(e).__name__}: {e}"
+            self.metrics.record_attempt(time.perf_counter() - started, retry=attempt > 0)
+
+            if error is None:
+                self.breaker.record_success()
+                return response
+
+            last_error = error
+            self.breaker.record_failure()
+            # Полный разброс задержки, чтобы воркеры не повторяли запросы синхронно
+            if attempt == ML_MAX_RETRIES:
+                break
+            delay = random.uniform(0, ML_RETRY_BACKOFF * (2 ** attempt))
+            # Повтор без задержки только добавил бы нагрузки упавшему сервису
+            if delay >= deadline - time.monotonic():
+                break
+            time.sleep(delay)
+
+        self.metrics.incr('failures')
+        raise ModelUnavailable(f"Сервис модели не ответил: {last_error or 'исчерпан бюджет времени'}")
+
+    def predict_one(self, features: List[float]) -> Optional[int]:
+        """Класс для одного вектора; None, если модель отклонила запрос или ответ не разобран.
+
+        ModelUnavailable пробрасывается: одиночные эндпоинты отвечают на него 503."""
+        try:
+            response = self._post({"values": features})
+
+            if response.status_code == 200:
+                return _parse_prediction(response.json())
+            else:
+                print(f"Ошибка модели: {response.status_code}, {response.text}")
+                return None
+
+        except ModelUnavailable:
+            raise
+        except Exception as e:
+            print(f"Ошибка при разборе ответа модели: {e}")
+            return None
+
+    def _predict_chunk(self, chunk: List[List[float]]) -> Optional[List[Optional[int]]]:
+        """Отправляет пакет векторов признаков в /predict_ensemble.
+
+        Возвращает None, если сервис не поддерживает пакетный формат;
+        при недоступности сервиса пробрасывает ModelUnavailable."""
+        response = self._post({"values": chunk})
+        if response.status_code != 200:
+            print(f"Пакетный запрос к модели отклонён: {response.status_code}, {response.text}")
+            return None
+
+        try:
+            result = response.json()
+        except ValueError:
+            print("Модель вернула ответ не в формате JSON")
+            return None
+        if isinstance(result, dict):
+            result = result.get('predicted_classes', result.get('predictions', result.get('classes')))
+        if not isinstance(result, list) or len(result) != len(chunk):
+            print("Модель вернула ответ не в пакетном формате")
+            return None
+
+        predictions = []
+        for item in result:
+            predicted_class = _parse_prediction(item)
+            predictions.append(int(predicted_class) if predicted_class is not None else None)
+        return predictions
+
+    def predict(self, features: FeatureRows) -> List[Optional[int]]:
+        """Векторы отправляются пакетами по PREDICTION_BATCH_SIZE. Если сервис не
+        принимает пакет, векторы этого пакета отправляются одиночными запросами
+        не более чем в PREDICTION_MAX_WORKERS потоков.
+
+        Если цепь разомкнута ещё до первого вызова, поднимается ModelUnavailable;
+        если сервис отказал посреди прогона, оставшиеся векторы получают None."""
+        rows = features.tolist() if isinstance(features, np.ndarray) else [list(row) for row in features]
+        if not rows:
+            return []
+        if self.breaker.state == 'open':
+            self.metrics.incr('rejected')
+            raise ModelUnavailable("Сервис модели недоступен (цепь разомкнута)")
+        if len(rows) == 1:
+            return [self.predict_one(rows[0])]
+
+        predictions: List[Optional[int]] = []
+        batch_supported = True
+
+        with ThreadPoolExecutor(max_workers=PREDICTION_MAX_WORKERS) as executor:
+            for start in range(0, len(rows), PREDICTION_BATCH_SIZE):
+                chunk = rows[start:start + PREDICTION_BATCH_SIZE]
+
+                try:
+                    chunk_predictions = self._predict_chunk(chunk) if batch_supported else None
+                    if chunk_predictions is None:
+                        # Не пытаемся повторно отправлять пакеты сервису, который их не принимает
+                        batch_supported = False
+                        chunk_predictions = list(executor.map(self.predict_one, chunk))
+                except ModelUnavailable as e:
+                    print(f"Ошибка при пакетном вызове модели: {e}")
+                    predictions.extend([None] * (len(rows) - start))
+                    break
+
+                predictions.extend(chunk_predictions)
+
+        return predictions
+
+    def stats(self) -> dict:
+        pool = getattr(getattr(self._client, '_transport', None), '_pool', None)
+        connections = getattr(pool, 'connections', None)
+        return {
+            'backend': self.name,
+            'endpoint': self.endpoint,
+            'model_version': self.model_version,
+            'breaker': {
+                'state': self.breaker.state,
+                'opened_count': self.breaker.opened_count,
+                'failure_threshold': self.breaker.failure_threshold,
+                'reset_seconds': self.breaker.reset_seconds
+            },
+            'open_connections': len(connections) if connections is not None else None,
+            'max_connections': ML_POOL_CONNECTIONS,
+            **self.metrics.snapshot()
+        }
+
+
+class LocalPredictor:
+    """Предсказания ансамблем, загруженным в процесс (ONNX Runtime или scikit-learn)"""
+
+    name = 'local'
+
+    def __init__(self, model_path: str = LOCAL_MODEL_PATH):
+        self.model_path = model_path
+        if not os.path.isfile(model_path):
+            # Недоступная модель — как упавший сервис: эндпоинты отвечают 503, задача падает с возможностью продолжить
+            raise ModelUnavailable(
+                f"Файл локальной модели не найден: {model_path}. Задайте LOCAL_MODEL_PATH (.onnx, .pkl или .joblib) "
+                f"или используйте PREDICTOR_BACKEND=http"
+            )
+        # Время изменения файла отличает переобученную модель с тем же именем
+        self.model_version = MODEL_VERSION or f'local:{os.path.basename(model_path)}:{int(os.path.getmtime(model_path))}'
+        if model_path.endswith('.onnx'):
+            import onnxruntime as ort
+
+            self._session = ort.InferenceSession(model_path, providers=['CPUExecutionProvider'])
+            self._input_name = self._session.get_inputs()[0].name
+            self._model = None
+        else:
+            import joblib
+
+            self._session = None
+            self._model = joblib.load(model_path)
+        print(f"✅ Локальная модель загружена: {model_path}")
+
+    def predict(self, features: FeatureRows) -> List[Optional[int]]:
+        matrix = np.asarray(features, dtype=np.float32).reshape(-1, 8)
+        if len(matrix) == 0:
+            return []
+
+        try:
+            if self._session is not None:
+                # Первый выход ONNX-классификатора — метки классов
+                labels = self._session.run(None, {self._input_name: matrix})[0]
+            else:
+                labels = self._model.predict(matrix)
+        except Exception as e:
+            print(f"Ошибка локальной модели: {e}")
+            return [None] * len(matrix)
+
+        return [int(label) for label in np.asarray(labels).ravel()]
+
+    def stats(self) -> dict:
+        return {
+            'backend': self.name,
+            'model_path': self.model_path,
+            'model_version': self.model_version,
+            'runtime': 'onnxruntime' if self._session is not None else 'sklearn'
+        }
+
+
+_predictor = None
+_predictor_lock = threading.Lock()
+
+
+def create_predictor(backend: str = PREDICTOR_BACKEND):
+    if backend == 'local':
+        return LocalPredictor()
+    if backend == 'http':
+        return HttpPredictor()
+    raise ValueError(f"Неизвестный PREDICTOR_BACKEND: {backend}")
+
+
+def get_predictor():
+    """Возвращает предиктор воркера; модель загружается один раз на процесс"""
+    global _predictor
+    if _predictor is None:
+        with _predictor_lock:
+            if _predictor is None:
+                _predictor = create_predictor()
+    return _predictor
@@ -0,0 +1,126 @@
+# backend/roster.py
+#
+# Постраничные списки пациентов: keyset-пагинация по col_1 (WHERE col_1 > after)
+# и фильтры по полу, уровням fa/lfk и возрасту. Условия собираются один раз
+# и используются и для страницы, и для подсчёта общего числа пациентов.
+# Результаты оценки присоединяются из узкой таблицы: d — пациенты, r — результаты.
+
+import os
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
+
+from fastapi import HTTPException
+
+from backend.column_types import enum_columns, load_enum_columns
+from backend.database import get_db_connection
+from backend.schema import BASE_TABLE, RESULTS_TABLE
+
+ROSTER_PAGE_DEFAULT = int(os.getenv("ROSTER_PAGE_DEFAULT", "50"))
+ROSTER_PAGE_MAX = int(os.getenv("ROSTER_PAGE_MAX", "500"))
+
+# Столбцы фильтров
+GENDER_COLUMN = 'd.col_2'
+AGE_COLUMN = 'd.col_3'
+
+ROSTER_FROM = f'{BASE_TABLE} d LEFT JOIN {RESULTS_TABLE} r ON r.code = d.col_1'
+
+
+@dataclass
+class RosterFilter:
+    gender: Optional[str] = None
+    fa: List[int] = field(default_factory=list)
+    lfk: List[int] = field(default_factory=list)
+    age_min: Optional[int] = None
+    age_max: Optional[int] = None
+    # Тип и метки ENUM столбца пола (gender_enum()); None — столбец не ENUM
+    gender_enum: Optional[dict] = None
+
+    def where(self) -> Tuple[List[str], dict]:
+        """SQL-условия и параметры фильтра (без условия keyset)"""
+        conditions, params = [], {}
+        if self.gender:
+            # Столбец сравнивается без приведения, чтобы работал индекс (col_2, col_1);
+            # к типу ENUM приводится параметр. Неизвестная метка ENUM — пустой список, а не ошибка
+            if self.gender_enum is None:
+                conditions.append(f'{GENDER_COLUMN} = :gender')
+                params['gender'] = self.gender
+            elif self.gender in self.gender_enum['labels']:
+                conditions.append(f"{GENDER_COLUMN} = CAST(:gender AS {self.gender_enum['type']})")
+                params['gender'] = self.gender
+            else:
+                conditions.append('FALSE')
+        if self.fa:
+            conditions.append('r.fa = ANY(:fa)')
+            params['fa'] = list(self.fa)
+        if self.lfk:
+            conditions.append('r.lfk = ANY(:lfk)')
+            params['lfk'] = list(self.lfk)
+        if self.age_min is not None:
+            conditions.append(f'{AGE_COLUMN} >= :age_min')
+            params['age_min'] = self.age_min
+        if self.age_max is not None:
+            conditions.append(f'{AGE_COLUMN} <= :age_max')
+            params['age_max'] = self.age_max
+        return conditions, params
+
+    def cache_key(self) -> str:
+        """Ключ кэша общего числа пациентов для этого фильтра"""
+        return (f'gender={self.gender}|fa={sorted(self.fa)}|lfk={sorted(self.lfk)}'
+                f'|age={self.age_min}-{self.age_max}')
+
+
+def gender_enum(gender: Optional[str]) -> Optional[dict]:
+    """Тип и метки ENUM столбца пола для фильтра (через кэш схемы); None, если фильтра нет
+    или столбец не ENUM. Метка, которой нет в кэше, перепроверяется по каталогу:
+    её мог добавить загрузкой другой воркер."""
+    if not gender:
+        return None
+    column = GENDER_COLUMN.split('.')[-1]
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cur:
+            enum = enum_columns(cur).get(column)
+            if enum is not None and gender not in enum['labels']:
+                enum = load_enum_columns(cur).get(column)
+    finally:
+        conn.close()
+    return enum
+
+
+def page_limit(limit: Optional[int]) -> int:
+    if limit is None:
+        return ROSTER_PAGE_DEFAULT
+    if limit < 1 or limit > ROSTER_PAGE_MAX:
+        raise HTTPException(status_code=400, detail=f"limit должен быть от 1 до {ROSTER_PAGE_MAX}")
+    return limit
+
+
+def page_query(columns: str, roster_filter: RosterFilter, after: Optional[int], limit: int) -> Tuple[str, dict]:
+    """Запрос страницы; выбирается limit + 1 строк, чтобы узнать, есть ли следующая"""
+    conditions, params = roster_filter.where()
+    if after is not None:
+        conditions.append('d.col_1 > :after')
+        params['after'] = after
+    where_sql = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+    params['limit'] = limit + 1
+    return f'SELECT {columns} FROM {ROSTER_FROM} {where_sql} ORDER BY d.col_1 ASC LIMIT :limit', params
+
+
+def count_query(roster_filter: RosterFilter) -> Tuple[str, dict]:
+    conditions, params = roster_filter.where()
+    where_sql = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+    # Без фильтров по результатам соединение не нужно
+    from_sql = ROSTER_FROM if roster_filter.fa or roster_filter.lfk else f'{BASE_TABLE} d'
+    return f'SELECT COUNT(*) FROM {from_sql} {where_sql}', params
+
+
+def page_response(items: List[dict], limit: int, total: int) -> dict:
+    """Ответ страницы; next_after — код, с которого запрашивать следующую"""
+    has_more = len(items) > limit
+    items = items[:limit]
+    return {
+        'items': items,
+        'total': total,
+        'limit': limit,
+        'next_after': items[-1]['code'] if has_more else None
+    }
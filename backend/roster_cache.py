@@ -0,0 +1,97 @@
+# backend/roster_cache.py
+#
+# Кэш списков пациентов (дашборд врача, уровень ФА) в памяти процесса.
+# Запись действительна, пока не изменилась версия данных в fa_rgnkc_version:
+# её увеличивают save-fa-result, save-lfk-result, predict-activity и загрузки.
+# Ответы отдаются с сильным ETag; при совпадении If-None-Match — 304 без тела.
+# Там же хранится общее число пациентов по фильтрам постраничных списков.
+
+import hashlib
+import json
+import threading
+from typing import Any, Optional
+
+from fastapi import Request, Response
+
+# Не больше стольких комбинаций фильтров в кэше счётчиков
+COUNT_CACHE_MAX_ENTRIES = 256
+
+
+class RosterCache:
+    """Сериализованные списки пациентов по имени списка и версии данных"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._counts = {}
+        self._counts_version = None
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+
+    def lookup(self, name: str, version: Optional[int]) -> Optional[dict]:
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry and version is not None and entry['version'] == version:
+                self.hits += 1
+                return entry
+            self.misses += 1
+            return None
+
+    def store(self, name: str, version: Optional[int], value: Any) -> dict:
+        """Сериализует value один раз; ETag — хэш тела, поэтому он совпадает у всех воркеров"""
+        body = json.dumps(value, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        entry = {
+            'version': version,
+            'body': body,
+            'etag': f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+        }
+        if version is not None:
+            with self._lock:
+                self._entries[name] = entry
+        return entry
+
+    def lookup_count(self, key: str, version: Optional[int]) -> Optional[int]:
+        with self._lock:
+            if version is None or version != self._counts_version:
+                return None
+            return self._counts.get(key)
+
+    def store_count(self, key: str, version: Optional[int], total: int):
+        if version is None:
+            return
+        with self._lock:
+            if version != self._counts_version or len(self._counts) >= COUNT_CACHE_MAX_ENTRIES:
+                self._counts = {}
+                self._counts_version = version
+            self._counts[key] = total
+
+    def respond(self, request: Request, entry: dict) -> Response:
+        headers = {'ETag': entry['etag'], 'Cache-Control': 'no-cache'}
+        if etag_matches(request.headers.get('if-none-match'), entry['etag']):
+            with self._lock:
+                self.not_modified += 1
+            return Response(status_code=304, headers=headers)
+        return Response(content=entry['body'], media_type='application/json', headers=headers)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'not_modified': self.not_modified,
+                'entries': {name: {'version': entry['version'], 'bytes': len(entry['body'])}
+                            for name, entry in self._entries.items()},
+                'counts': len(self._counts)
+            }
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(',')]
+    # Слабое сравнение для If-None-Match (RFC 9110, 13.1.2)
+    return '*' in candidates or etag in [tag[2:] if tag.startswith('W/') else tag for tag in candidates]
+
+
+roster_cache = RosterCache()
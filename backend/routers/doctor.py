@@ -2,34 +2,43 @@
 
 import os
 import re
-import requests
-from datetime import datetime
-from typing import Optional, Union, List
-from fastapi import HTTPException, Depends, APIRouter
-from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy import create_engine, Column, Integer, String, Float, MetaData, Table, text
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, Session
-from pydantic import BaseModel, validator
+from typing import Callable, Optional, List
+from fastapi import HTTPException, Depends, APIRouter, Query, Request
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from pydantic import BaseModel
 import pandas as pd
 import numpy as np
 from dotenv import load_dotenv
 
+from backend import jobs
+from backend.database import SessionLocal, get_db
+from backend.feature_store import fill_missing_features
+from backend.features import FEATURE_COLUMNS, feature_hashes, prepare_feature_matrix, stored_feature_batch
+from backend.prediction_cache import predict_cached, prediction_cache
+from backend.predictor import PREDICTION_BATCH_SIZE, ModelUnavailable, get_predictor
+from backend.roster import RosterFilter, count_query, gender_enum, page_limit, page_query, page_response
+from backend.roster_cache import roster_cache
+from backend.schema import BUMP_VERSION_SQL, RESULTS_TABLE, SELECT_VERSION_SQL
+
 # Загружаем переменные окружения из файла .env
 load_dotenv()
 
 # --- Конфигурация ---
-DATABASE_URL = os.getenv("DATABASE_URL")
 BASE_TABLE = "fa_rgnkc_data"
 
-# Гибкий URL для модели
-ML_MODEL_URL = os.getenv('ML_MODEL_URL', 'http://127.0.0.1:8080')
-MODEL_ENDPOINT = f"{ML_MODEL_URL}/predict_ensemble"
+# Количество строк в одном UPDATE ... FROM (VALUES ...)
+UPDATE_BATCH_SIZE = 1000
+
+# Пакетная оценка ФА выполняется фоновой задачей порциями по столько пациентов
+PREDICT_JOB_KIND = "predict_activity"
+PREDICT_JOB_CHUNK_SIZE = int(os.getenv("PREDICT_JOB_CHUNK_SIZE", "1000"))
 
-# --- Настройка БД ---
-engine = create_engine(DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-Base = declarative_base()
+# Столбцы, которые читает пакетная оценка: признаки пациента и сохранённые
+# вместе с fa хэш признаков и версия модели
+# Оценка читает готовый вектор признаков (backend/feature_store.py), а не сырые столбцы
+PREDICT_COLUMNS = ['col_1', 'features', 'features_valid']
+PREDICT_RESULT_COLUMNS = ['fa_features_hash', 'fa_model_version']
 
 # --- Pydantic модели ---
 class PatientInfo(BaseModel):
@@ -39,10 +48,12 @@ class PatientInfo(BaseModel):
     class Config:
         from_attributes = True
 
-class PredictionResponse(BaseModel):
-    message: str
-    updated_count: int
-    failed_predictions: List[dict] = []
+class PredictionJobResponse(BaseModel):
+    job_id: str
+    status: str
+    existing: bool = False
+    status_url: str
+    events_url: str
 
 class ModelPredictionRequest(BaseModel):
     values: List[float]
@@ -169,58 +180,14 @@ def transform_col_245(value) -> Optional[int]:
     return None
 
 def validate_and_prepare_features(row) -> Optional[List[float]]:
+    """Подготавливает признаки одного пациента (пакетный путь с n=1)"""
     try:
-        # 1. col_14 (float, 0.0-7.0)
-        val1 = extract_numeric_value(row.get('col_14'))
-        if val1 is None or not (0.0 <= val1 <= 7.0):
-            print(f"Ошибка в col_14 для patient_id {row.get('col_1')}: val={row.get('col_14')}")
-            return None
-        
-        # 2. col_58 (преобразование строк, 0.0-4.0)
-        val2 = transform_col_58(row.get('col_58'))
-        if val2 is None or not (0.0 <= val2 <= 4.0):
-            print(f"Ошибка в col_58 для patient_id {row.get('col_1')}: val={row.get('col_58')}")
-            return None
-        
-        # 3. col_59 (преобразование строк, 0.0-3.0)
-        val3 = transform_col_59(row.get('col_59'))
-        if val3 is None or not (0.0 <= val3 <= 3.0):
-            print(f"Ошибка в col_59 для patient_id {row.get('col_1')}: val={row.get('col_59')}")
-            return None
-        
-        # 4. col_85 (numeric)
-        val4 = extract_numeric_value(row.get('col_85'))
-        if val4 is None:
-            print(f"Ошибка в col_85 для patient_id {row.get('col_1')}: val={row.get('col_85')}")
-            return None
-        
-        # 5. col_232 (специальное преобразование)
-        val5 = transform_col_232(row.get('col_232'))
-        if val5 is None:
-            print(f"Ошибка в col_232 для patient_id {row.get('col_1')}: val={row.get('col_232')}")
+        batch = prepare_feature_matrix(pd.DataFrame([row]))
+        if not batch.valid[0]:
+            failed = ", ".join(batch.failed_columns()[0])
+            print(f"Ошибка в {failed} для patient_id {row.get('col_1')}")
             return None
-        
-        # 6. col_249 (специальное преобразование, 0-12)
-        val6 = transform_col_249(row.get('col_249'))
-        if val6 is None or not (0 <= val6 <= 12):
-            print(f"Ошибка в col_249 для patient_id {row.get('col_1')}: val={row.get('col_249')}")
-            return None
-        
-        # 7. col_252 (float64)
-        val7 = extract_numeric_value(row.get('col_252'))
-        if val7 is None:
-            print(f"Ошибка в col_252 для patient_id {row.get('col_1')}: val={row.get('col_252')}")
-            return None
-        
-        # 8. col_245 (специальное преобразование, 0-4)
-        val8 = transform_col_245(row.get('col_245'))
-        if val8 is None or not (0 <= val8 <= 4):
-            print(f"Ошибка в col_245 для patient_id {row.get('col_1')}: val={row.get('col_245')}")
-            return None
-        
-        print(f"Успешно подготовлены признаки для patient_id {row.get('col_1')}: {val1, val2, val3, val4, val5, val6, val7, val8}")
-        return [float(val1), float(val2), float(val3), float(val4), 
-                float(val5), float(val6), float(val7), float(val8)]
+        return batch.matrix[0].tolist()
     
     except Exception as e:
         print(f"Ошибка при подготовке признаков для patient_id {row.get('col_1')}: {e}")
@@ -228,153 +195,342 @@ def validate_and_prepare_features(row) -> Optional[List[float]]:
 
 def call_prediction_model(features: List[float]) -> Optional[int]:
     """Вызывает модель предсказания"""
+    return call_prediction_model_batch([features])[0]
+
+def predict_classes(features_list) -> List[Optional[int]]:
+    """Предсказывает классы для набора векторов признаков.
+
+    Бэкенд (HTTP-сервис или локальная модель) выбирается PREDICTOR_BACKEND.
+    Уже предсказанные векторы берутся из кэша предсказаний. ModelUnavailable
+    пробрасывается: HTTP-эндпоинты отвечают на него 503, фоновая задача падает
+    с возможностью продолжить с контрольной точки."""
     try:
-        payload = {"values": features}
-        response = requests.post(MODEL_ENDPOINT, json=payload, timeout=30)
-        
-        if response.status_code == 200:
-            result = response.json()
-            # Проверяем 'predicted_class', 'prediction' или 'class'
-            if isinstance(result, dict):
-                return result.get('predicted_class', result.get('prediction', result.get('class', None)))
-            elif isinstance(result, (int, float)):
-                return int(result)
-        else:
-            print(f"Ошибка модели: {response.status_code}, {response.text}")
-            return None
-    
+        return predict_cached(get_predictor(), features_list)
+    except ModelUnavailable:
+        raise
     except Exception as e:
         print(f"Ошибка при вызове модели: {e}")
-        return None
-
-# --- Инициализация FastAPI Router ---
-router = APIRouter()
+        return [None] * len(features_list)
 
-# --- Зависимость для БД ---
-def get_db():
-    db = SessionLocal()
+def call_prediction_model_batch(features_list) -> List[Optional[int]]:
+    """predict_classes для HTTP-эндпоинтов: недоступность модели — 503"""
     try:
-        yield db
-    finally:
-        db.close()
+        return predict_classes(features_list)
+    except ModelUnavailable as e:
+        # Сервис модели недоступен — отвечаем сразу, не дожидаясь таймаутов
+        raise HTTPException(status_code=503, detail=str(e))
 
-# --- Роутеры ---
-@router.get("/patients", response_model=List[PatientInfo])
-def get_patients_info(db: Session = Depends(get_db)):
-    """Получить список пациентов с основной информацией."""
+def current_model_version() -> Optional[str]:
+    """Версия модели текущего предиктора; None, если модель недоступна"""
     try:
-        # Получаем данные пациентов из правильных столбцов
-        stmt = text(f'''
-            SELECT 
-                col_1 as patient_code,
-                col_2 as patient_gender, 
-                fa
-            FROM {BASE_TABLE} 
-            ORDER BY col_1 ASC
+        return get_predictor().model_version
+    except Exception as e:
+        print(f"Версия модели не определена: {e}")
+        return None
+
+def update_fa_values(db: Session, fa_values: List[tuple]) -> int:
+    """Записывает предсказанные классы в таблицу результатов одним INSERT ... ON CONFLICT на пакет.
+
+    fa_values — кортежи (patient_id, fa_class, features_hash, model_version);
+    хэш признаков и версия модели нужны инкрементальному пересчёту."""
+    updated_count = 0
+    for start in range(0, len(fa_values), UPDATE_BATCH_SIZE):
+        chunk = fa_values[start:start + UPDATE_BATCH_SIZE]
+        params = {}
+        rows_sql = []
+        for i, (patient_id, fa_class, features_hash, model_version) in enumerate(chunk):
+            params[f"id_{i}"] = patient_id
+            params[f"fa_{i}"] = int(fa_class)
+            params[f"hash_{i}"] = features_hash
+            params[f"version_{i}"] = model_version
+            rows_sql.append(f"(:id_{i}, :fa_{i}, CAST(:hash_{i} AS TEXT), CAST(:version_{i} AS TEXT))")
+
+        update_stmt = text(f'''
+            INSERT INTO {RESULTS_TABLE} AS r (code, fa, fa_features_hash, fa_model_version, fa_scored_at, updated_at)
+            SELECT v.patient_id, v.fa_class, v.features_hash, v.model_version, now(), now()
+            FROM (VALUES {", ".join(rows_sql)}) AS v(patient_id, fa_class, features_hash, model_version)
+            ON CONFLICT (code) DO UPDATE SET
+                fa = EXCLUDED.fa,
+                fa_features_hash = EXCLUDED.fa_features_hash,
+                fa_model_version = EXCLUDED.fa_model_version,
+                fa_scored_at = EXCLUDED.fa_scored_at,
+                updated_at = EXCLUDED.updated_at
         ''')
-        patients_raw = db.execute(stmt).mappings().all()
+        result = db.execute(update_stmt, params)
+        updated_count += result.rowcount
+    return updated_count
 
-        if not patients_raw:
-            raise HTTPException(status_code=404, detail="Пациенты не найдены")
+# --- Инициализация FastAPI Router ---
+router = APIRouter()
 
-        results = []
-        for p in patients_raw:
-            # Формируем информационную строку в формате: "Пол, Физ.активность"
-            gender = p['patient_gender'] if p['patient_gender'] is not None else 'Н/Д'
-            
-            # Обрабатываем fa - если None или пустое, то "Не определён"
-            fa_value = p['fa']
-            if fa_value is None:
-                activity = 'Не определён'
-            else:
-                # Преобразуем числовое значение в текстовое описание уровня
-                activity = level_map.get(int(fa_value), f'Класс {fa_value}')
-            
-            info = f"{gender}, {activity}"
-            
-            # Используем col_1 как код пациента
-            patient_code = p['patient_code']
-            results.append(PatientInfo(code=patient_code, patient_info=info))
+# --- Роутеры ---
+def patient_info_item(patient_code, gender, fa_value) -> dict:
+    """Элемент списка пациентов: код и строка «Пол, Физ.активность»"""
+    gender = gender if gender is not None else 'Н/Д'
+    
+    # Обрабатываем fa - если None или пустое, то "Не определён"
+    if fa_value is None:
+        activity = 'Не определён'
+    else:
+        # Преобразуем числовое значение в текстовое описание уровня
+        activity = level_map.get(int(fa_value), f'Класс {fa_value}')
+    
+    return PatientInfo(code=patient_code, patient_info=f"{gender}, {activity}").model_dump()
+
+def load_patients_info(db: Session) -> List[dict]:
+    # Получаем данные пациентов из правильных столбцов
+    stmt = text(f'''
+        SELECT 
+            d.col_1 as patient_code,
+            d.col_2 as patient_gender, 
+            r.fa
+        FROM {BASE_TABLE} d
+        LEFT JOIN {RESULTS_TABLE} r ON r.code = d.col_1
+        ORDER BY d.col_1 ASC
+    ''')
+    patients_raw = db.execute(stmt).mappings().all()
+
+    if not patients_raw:
+        raise HTTPException(status_code=404, detail="Пациенты не найдены")
+
+    # Используем col_1 как код пациента
+    return [patient_info_item(p['patient_code'], p['patient_gender'], p['fa']) for p in patients_raw]
+
+@router.get("/patients", response_model=List[PatientInfo])
+def get_patients_info(request: Request, db: Session = Depends(get_db)):
+    """Получить список пациентов с основной информацией.
 
-        return results
+    Список кэшируется до смены версии данных; поддерживается If-None-Match."""
+    try:
+        version = db.execute(text(SELECT_VERSION_SQL)).scalar()
+        entry = roster_cache.lookup("doctor_patients", version)
+        if entry is None:
+            entry = roster_cache.store("doctor_patients", version, load_patients_info(db))
+        return roster_cache.respond(request, entry)
     
     except Exception as e:
         print(f"Ошибка при получении списка пациентов: {e}")
         raise HTTPException(status_code=500, detail=f"Ошибка получения данных: {str(e)}")
 
-@router.post("/predict-activity", response_model=PredictionResponse)
-def predict_and_update_activity(db: Session = Depends(get_db)):
-    """Предсказывает уровень ФА для всех пациентов и обновляет столбец 'fa'."""
+@router.get("/patients/page")
+def get_patients_page(
+    after: Optional[int] = Query(None, description="Код последнего пациента предыдущей страницы"),
+    limit: Optional[int] = Query(None),
+    gender: Optional[str] = Query(None),
+    fa: List[int] = Query([]),
+    lfk: List[int] = Query([]),
+    age_min: Optional[int] = Query(None),
+    age_max: Optional[int] = Query(None),
+    db: Session = Depends(get_db)
+):
+    """Страница списка пациентов (keyset по коду) с фильтрами по полу, fa, lfk и возрасту."""
+    limit = page_limit(limit)
+    roster_filter = RosterFilter(gender=gender, fa=fa, lfk=lfk, age_min=age_min, age_max=age_max,
+                                 gender_enum=gender_enum(gender))
     try:
-        # 1. Получаем все необходимые данные из БД
-        required_columns = ['col_1', 'col_14', 'col_58', 'col_59', 'col_85', 
-                          'col_232', 'col_249', 'col_252', 'col_245']
-        
-        columns_str = ", ".join([f'"{col}"' if col != 'col_1' else col for col in required_columns])
-        stmt = text(f'SELECT {columns_str} FROM {BASE_TABLE} ORDER BY col_1 ASC')
-        data_raw = db.execute(stmt).mappings().all()
+        version = db.execute(text(SELECT_VERSION_SQL)).scalar()
+        sql, params = page_query("d.col_1 AS patient_code, d.col_2 AS patient_gender, r.fa", roster_filter, after, limit)
+        rows = db.execute(text(sql), params).mappings().all()
+        items = [patient_info_item(p['patient_code'], p['patient_gender'], p['fa']) for p in rows]
 
-        if not data_raw:
-            raise HTTPException(status_code=404, detail="Нет данных для предсказания.")
+        # Общее число по фильтру считается один раз на версию данных
+        total = roster_cache.lookup_count(roster_filter.cache_key(), version)
+        if total is None:
+            sql, params = count_query(roster_filter)
+            total = db.execute(text(sql), params).scalar()
+            roster_cache.store_count(roster_filter.cache_key(), version, total)
 
-        updated_count = 0
-        failed_predictions = []
+        return page_response(items, limit, total)
 
-        # 2. Обрабатываем каждого пациента
-        for row in data_raw:
-            patient_id = row['col_1']  # Используем col_1 как идентификатор пациента
-            
-            # Подготавливаем признаки
-            features = validate_and_prepare_features(dict(row))
-            
-            if features is None:
-                failed_predictions.append({
-                    'patient_id': patient_id,
-                    'reason': 'Невалидные или отсутствующие данные'
-                })
-                continue
-            
-            # Вызываем модель
-            predicted_class = call_prediction_model(features)
-            
-            if predicted_class is None:
-                failed_predictions.append({
-                    'patient_id': patient_id,
-                    'reason': 'Ошибка предсказания модели'
-                })
-                continue
-            
-            # Обновляем запись в БД - записываем числовое значение класса
-            update_stmt = text(f'UPDATE {BASE_TABLE} SET fa = :fa_class WHERE col_1 = :patient_id')
-            result = db.execute(update_stmt, {
-                "fa_class": int(predicted_class),  # Записываем как число, а не строку
-                "patient_id": patient_id
+    except Exception as e:
+        print(f"Ошибка при получении страницы пациентов: {e}")
+        raise HTTPException(status_code=500, detail=f"Ошибка получения данных: {str(e)}")
+
+def score_patients(data_df: pd.DataFrame, incremental: bool, model_version: Optional[str],
+                   check_lease: Optional[Callable[[], None]] = None) -> dict:
+    """Вызывает модель по готовым векторам признаков и возвращает строки для update_fa_values.
+
+    В инкрементальном режиме модель вызывается только для строк, у которых
+    хэш признаков или версия модели отличаются от сохранённых вместе с fa.
+    Пропуск возможен только при известной версии модели: без неё выкладка
+    новой модели не отличима от старой, и оцениваются все строки.
+    check_lease вызывается после каждого пакета модели: фоновая задача
+    останавливается, если её перезапустили. Недоступность модели
+    (ModelUnavailable) пробрасывается."""
+    # Сохранённые при записи пациента векторы — без разбора сырых столбцов
+    batch = stored_feature_batch(data_df['features'].tolist())
+    all_ids = data_df['col_1'].tolist()
+
+    failed_predictions = []
+    for patient_id, failed in zip(all_ids, batch.failed_columns()):
+        if failed:
+            failed_predictions.append({
+                'patient_id': patient_id,
+                'reason': 'Невалидные или отсутствующие данные',
+                'columns': failed
             })
-            
-            if result.rowcount > 0:
-                updated_count += 1
 
-        # Фиксируем изменения
-        db.commit()
-        
-        response_message = f"Обработано пациентов: {len(data_raw)}. Успешно обновлено: {updated_count}."
-        if failed_predictions:
-            response_message += f" Неудачных предсказаний: {len(failed_predictions)}."
-
-        return PredictionResponse(
-            message=response_message,
-            updated_count=updated_count,
-            failed_predictions=failed_predictions
+    hashes = np.array(feature_hashes(batch.matrix), dtype=object)
+    to_score = batch.valid.copy()
+    if incremental and model_version is not None:
+        changed = (
+            (hashes != data_df['fa_features_hash'].to_numpy(dtype=object))
+            | (data_df['fa_model_version'].to_numpy(dtype=object) != model_version)
         )
+        to_score &= changed
+    skipped_count = int(batch.valid.sum() - to_score.sum())
+
+    patient_ids = [patient_id for patient_id, ok in zip(all_ids, to_score) if ok]
+    features_matrix = batch.matrix[to_score]
+    score_hashes = hashes[to_score].tolist()
+    if not batch.valid.all():
+        print(f"Невалидные признаки по столбцам: {batch.failure_counts()}")
+
+    # Вызываем модель пакетами
+    predictions = []
+    for start in range(0, len(features_matrix), PREDICTION_BATCH_SIZE):
+        predictions.extend(predict_classes(features_matrix[start:start + PREDICTION_BATCH_SIZE]))
+        if check_lease is not None:
+            check_lease()
+
+    fa_values = []
+    for patient_id, predicted_class, features_hash in zip(patient_ids, predictions, score_hashes):
+        if predicted_class is None:
+            failed_predictions.append({
+                'patient_id': patient_id,
+                'reason': 'Ошибка предсказания модели'
+            })
+            continue
+        fa_values.append((patient_id, predicted_class, features_hash, model_version))
 
-    except HTTPException as e:
+    return {'fa_values': fa_values, 'failed_predictions': failed_predictions, 'skipped_count': skipped_count}
+
+def parse_checkpoint(checkpoint: Optional[str], data_type: str):
+    """Контрольная точка (строка в fa_rgnkc_jobs) -> значение col_1 его типа.
+
+    Задачи прежних версий могли сохранить 'None' или 'nan' (последняя строка
+    порции без кода) — такие точки не разбираются, и оценка идёт с начала."""
+    if checkpoint is None:
+        return None
+    try:
+        if data_type in ('smallint', 'integer', 'bigint'):
+            return int(float(checkpoint)) if '.' in checkpoint else int(checkpoint)
+        if data_type in ('real', 'double precision', 'numeric'):
+            value = float(checkpoint)
+            return value if np.isfinite(value) else None
+    except ValueError:
+        return None
+    return checkpoint
+
+@jobs.register(PREDICT_JOB_KIND)
+def run_predict_activity_job(job: jobs.JobContext):
+    """Оценивает ФА порциями по col_1; после каждой порции — контрольная точка.
+
+    Результаты порции и контрольная точка фиксируются одной транзакцией,
+    поэтому перезапуск продолжает ровно с первой необработанной порции."""
+    incremental = bool(job.params.get("incremental"))
+    model_version = current_model_version()
+    if incremental and model_version is None:
+        # Например, задача возобновлена после снятия MODEL_VERSION
+        print(f"⚠️  Версия модели неизвестна, задача {job.id} выполняет полный пересчёт вместо инкрементального")
+    columns_str = ", ".join([f'd."{col}"' for col in PREDICT_COLUMNS] + [f'r.{col}' for col in PREDICT_RESULT_COLUMNS])
+
+    db = SessionLocal()
+    try:
+        if not job.total:
+            job.set_total(db, db.execute(text(f'SELECT COUNT(*) FROM {BASE_TABLE} WHERE col_1 IS NOT NULL')).scalar())
+            db.commit()
+
+        code_type = db.execute(text('''
+            SELECT data_type FROM information_schema.columns
+            WHERE table_name = :table AND column_name = 'col_1'
+        '''), {"table": BASE_TABLE}).scalar()
+        after = parse_checkpoint(job.checkpoint, code_type)
+        if job.checkpoint is not None and after is None:
+            print(f"⚠️  Контрольная точка задачи {job.id} ({job.checkpoint!r}) не разобрана, оценка идёт с начала")
+
+        while True:
+            # Строки без кода не оцениваются: по ним нельзя ни записать результат, ни продолжить
+            params = {"limit": PREDICT_JOB_CHUNK_SIZE}
+            where_sql = "WHERE d.col_1 IS NOT NULL"
+            if after is not None:
+                where_sql += " AND d.col_1 > :after"
+                params["after"] = after
+            result = db.execute(text(f'''
+                SELECT {columns_str}
+                FROM {BASE_TABLE} d LEFT JOIN {RESULTS_TABLE} r ON r.code = d.col_1
+                {where_sql} ORDER BY d.col_1 ASC LIMIT :limit
+            '''), params)
+            data_df = pd.DataFrame(result.fetchall(), columns=list(result.keys()))
+            # Строки из прежних версий без вектора — считаем и сохраняем один раз
+            missing = data_df['features_valid'].isna()
+            if missing.any():
+                computed = fill_missing_features(db, data_df.loc[missing, 'col_1'].tolist())
+                data_df['features'] = [
+                    computed[code][0] if code in computed else vector
+                    for code, vector in zip(data_df['col_1'], data_df['features'])
+                ]
+            # Закрываем читающую транзакцию, чтобы не держать её открытой на время вызовов модели
+            db.commit()
+            if data_df.empty:
+                break
+
+            try:
+                scored = score_patients(data_df, incremental, model_version, check_lease=job.check_lease)
+            except ModelUnavailable as e:
+                # Задача завершается ошибкой; порция не записана, контрольная точка не сдвинута
+                raise RuntimeError(
+                    f"Сервис модели недоступен: {e}. Продолжить с контрольной точки: POST /jobs/{job.id}/resume"
+                ) from e
+
+            # Записываем классы порции и контрольную точку одной транзакцией
+            updated_count = update_fa_values(db, scored['fa_values'])
+            if updated_count:
+                db.execute(text(BUMP_VERSION_SQL))
+            last_code = data_df['col_1'].iloc[-1]
+            job.save_progress(
+                db, last_code,
+                processed=len(data_df),
+                updated=updated_count,
+                skipped=scored['skipped_count'],
+                failures=scored['failed_predictions']
+            )
+            db.commit()
+            # Тем же разбором, что и при перезапуске (значения numpy не передаются драйверу)
+            after = parse_checkpoint(job.checkpoint, code_type)
+    except Exception:
         db.rollback()
-        raise e
+        raise
+    finally:
+        db.close()
+
+@router.post("/predict-activity", response_model=PredictionJobResponse, status_code=202)
+def predict_and_update_activity(
+    incremental: bool = Query(False, description="Пересчитать только пациентов с изменившимися признаками или версией модели")
+):
+    """Запускает фоновую оценку уровня ФА для всех пациентов и сразу возвращает id задачи.
+
+    Прогресс — GET /jobs/{id} или поток событий GET /jobs/{id}/events.
+    Если оценка уже идёт (с любыми параметрами), возвращается её задача."""
+    if incremental and current_model_version() is None:
+        raise HTTPException(
+            status_code=400,
+            detail="Инкрементальный пересчёт требует версии модели (MODEL_VERSION): без неё новая модель не отличима от старой"
+        )
+    try:
+        job = jobs.create_job(PREDICT_JOB_KIND, {"incremental": incremental})
     except Exception as e:
-        db.rollback()
-        print(f"Ошибка во время предсказания/обновления: {e}")
+        print(f"Ошибка при запуске задачи оценки ФА: {e}")
         raise HTTPException(status_code=500, detail=f"Внутренняя ошибка сервера: {str(e)}")
 
+    return PredictionJobResponse(
+        job_id=job["id"],
+        status=job["status"],
+        existing=job["existing"],
+        status_url=f"/jobs/{job['id']}",
+        events_url=f"/jobs/{job['id']}/events"
+    )
+
 @router.get("/test-model")
 def test_model_connection():
     """Тестирует подключение к модели предсказания."""
@@ -389,10 +545,16 @@ def test_model_connection():
     except Exception as e:
         return {"status": "error", "message": str(e)}
 
+@router.post("/prediction-cache/invalidate")
+def invalidate_prediction_cache():
+    """Сбрасывает кэш предсказаний: LRU этого воркера и общий уровень Redis (новое поколение ключей)."""
+    prediction_cache.invalidate()
+    return {"message": "Кэш предсказаний сброшен", "stats": prediction_cache.stats()}
+
 # --- Совместимость со старыми импортами ---
 # Эти переменные нужны для level_fa.py и других модулей
 prediction_model = None  # В новой версии мы не используем локальную модель
-model_expected_db_cols_ordered = ['col_14', 'col_58', 'col_59', 'col_85', 'col_232', 'col_249', 'col_252', 'col_245']
+model_expected_db_cols_ordered = list(FEATURE_COLUMNS)
 level_map = {
     1: "Низкий(1 ур.)",
     2: "Ниже среднего(2 ур.)",
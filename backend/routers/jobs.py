@@ -0,0 +1,64 @@
+# backend/routers/jobs.py
+
+import asyncio
+import json
+import os
+
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+
+from backend import jobs
+
+router = APIRouter(prefix="/jobs", tags=["jobs"])
+
+# Период опроса состояния задачи для потока событий (с)
+JOB_EVENTS_INTERVAL = float(os.getenv("JOB_EVENTS_INTERVAL", "1"))
+
+@router.get("")
+def get_jobs(limit: int = Query(20, ge=1, le=200)):
+    """Последние фоновые задачи (без списков неудачных предсказаний)."""
+    return jobs.list_jobs(limit)
+
+@router.get("/{job_id}")
+def get_job(job_id: str):
+    """Состояние задачи: статус, обработано/обновлено/ошибок, строк в секунду, контрольная точка."""
+    job = jobs.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Задача не найдена")
+    return job
+
+@router.post("/{job_id}/resume")
+def resume_job(job_id: str):
+    """Перезапускает упавшую или прерванную задачу с последней контрольной точки."""
+    return jobs.resume_job(job_id)
+
+async def iter_job_events(request: Request, job_id: str):
+    """Server-Sent Events: событие progress при каждом изменении, done — по завершении"""
+    last_payload = None
+    while True:
+        if await request.is_disconnected():
+            return
+        job = await run_in_threadpool(jobs.get_job, job_id)
+        if job is None:
+            yield f"event: error\ndata: {json.dumps({'detail': 'Задача не найдена'}, ensure_ascii=False)}\n\n"
+            return
+        # Список неудач в потоке не передаётся — только счётчики
+        job.pop("failures", None)
+        payload = json.dumps(job, ensure_ascii=False, default=str)
+        if job["status"] in jobs.FINAL_STATUSES:
+            yield f"event: done\ndata: {payload}\n\n"
+            return
+        if payload != last_payload:
+            yield f"event: progress\ndata: {payload}\n\n"
+            last_payload = payload
+        await asyncio.sleep(JOB_EVENTS_INTERVAL)
+
+@router.get("/{job_id}/events")
+async def stream_job_events(request: Request, job_id: str):
+    """Поток прогресса задачи (text/event-stream) до её завершения."""
+    return StreamingResponse(
+        iter_job_events(request, job_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
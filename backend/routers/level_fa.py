@@ -1,10 +1,17 @@
 # backend/routers/level_fa.py
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.sql import text
+from backend.database import get_async_db
+from backend.feature_store import RAW_FEATURES_SQL
+from backend.features import stored_feature_batch
+from backend.roster import RosterFilter, count_query, gender_enum, page_limit, page_query, page_response
+from backend.roster_cache import roster_cache
+from backend.schema import BUMP_VERSION_SQL, RESULTS_TABLE, SELECT_VERSION_SQL
 from backend.routers.doctor import (
-    get_db, level_map, extract_numeric_value, 
+    level_map, extract_numeric_value, 
     transform_col_58, transform_col_59, transform_col_232, 
     transform_col_249, transform_col_245, call_prediction_model,
     validate_and_prepare_features, BASE_TABLE
@@ -13,8 +20,7 @@ import pandas as pd
 import numpy as np
 from pydantic import BaseModel
 import logging
-import requests
-from typing import List
+from typing import List, Optional
 
 # Логгирование
 logging.basicConfig(level=logging.INFO)
@@ -74,30 +80,67 @@ def transform_col_245_for_display(value):
 
 # Теперь все модели определены, можно использовать их в роутерах
 @router.get("/patients")
-def get_all_patients(db: Session = Depends(get_db)):
-    """Returns a list of all patients with their codes and gender."""
+async def get_all_patients(request: Request, db: AsyncSession = Depends(get_async_db)):
+    """Returns a list of all patients with their codes and gender (cached per data version, ETag-aware)."""
     try:
-        logger.info("Fetching all patients")
-        stmt = text(f'SELECT col_1 AS code, col_2 AS gender FROM {BASE_TABLE} ORDER BY col_1 ASC')
-        result = db.execute(stmt).fetchall()
-        patients = [{"code": row.code, "gender": row.gender or "N/A"} for row in result]
-        logger.info(f"Retrieved {len(patients)} patients")
-        return patients
+        version = (await db.execute(text(SELECT_VERSION_SQL))).scalar()
+        entry = roster_cache.lookup("level_fa_patients", version)
+        if entry is None:
+            logger.info("Fetching all patients")
+            stmt = text(f'SELECT col_1 AS code, col_2 AS gender FROM {BASE_TABLE} ORDER BY col_1 ASC')
+            result = (await db.execute(stmt)).fetchall()
+            patients = [{"code": row.code, "gender": row.gender or "N/A"} for row in result]
+            logger.info(f"Retrieved {len(patients)} patients")
+            entry = roster_cache.store("level_fa_patients", version, patients)
+        return roster_cache.respond(request, entry)
     except Exception as e:
         logger.error(f"Error fetching patients: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Server error: {str(e)}")
 
+@router.get("/patients/page")
+async def get_patients_page(
+    after: Optional[int] = Query(None, description="Code of the last patient on the previous page"),
+    limit: Optional[int] = Query(None),
+    gender: Optional[str] = Query(None),
+    fa: List[int] = Query([]),
+    lfk: List[int] = Query([]),
+    age_min: Optional[int] = Query(None),
+    age_max: Optional[int] = Query(None),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Returns a keyset-paginated page of patients filtered by gender, fa, lfk and age."""
+    limit = page_limit(limit)
+    roster_filter = RosterFilter(gender=gender, fa=fa, lfk=lfk, age_min=age_min, age_max=age_max,
+                                 gender_enum=await run_in_threadpool(gender_enum, gender))
+    try:
+        version = (await db.execute(text(SELECT_VERSION_SQL))).scalar()
+        sql, params = page_query("col_1 AS code, col_2 AS gender", roster_filter, after, limit)
+        rows = (await db.execute(text(sql), params)).fetchall()
+        items = [{"code": row.code, "gender": row.gender or "N/A"} for row in rows]
+
+        total = roster_cache.lookup_count(roster_filter.cache_key(), version)
+        if total is None:
+            sql, params = count_query(roster_filter)
+            total = (await db.execute(text(sql), params)).scalar()
+            roster_cache.store_count(roster_filter.cache_key(), version, total)
+
+        return page_response(items, limit, total)
+    except Exception as e:
+        logger.error(f"Error fetching patients page: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Server error: {str(e)}")
+
 @router.get("/patients/{code}")
-def get_patient_by_code(code: int, db: Session = Depends(get_db)):
+async def get_patient_by_code(code: int, db: AsyncSession = Depends(get_async_db)):
     """Returns patient data by code with all needed columns."""
     try:
         logger.info(f"Fetching patient with code {code}")
         stmt = text(f'''
-            SELECT col_1 AS code, col_2 AS gender, col_14, col_58, col_59, col_85, 
-                   col_232, col_249, col_252, col_245, fa AS activity_level 
-            FROM {BASE_TABLE} WHERE col_1 = :code
+            SELECT d.col_1 AS code, d.col_2 AS gender, d.col_14, d.col_58, d.col_59, d.col_85, 
+                   d.col_232, d.col_249, d.col_252, d.col_245, r.fa AS activity_level 
+            FROM {BASE_TABLE} d LEFT JOIN {RESULTS_TABLE} r ON r.code = d.col_1
+            WHERE d.col_1 = :code
         ''')
-        result = db.execute(stmt, {"code": code}).mappings().first()
+        result = (await db.execute(stmt, {"code": code})).mappings().first()
         
         if not result:
             logger.warning(f"Patient with code {code} not found")
@@ -112,32 +155,37 @@ def get_patient_by_code(code: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail=f"Server error: {str(e)}")
 
 @router.post("/predict-activity-single", response_model=SinglePredictionResponse)
-def predict_activity_single(request: SinglePredictionRequest, db: Session = Depends(get_db)):
+async def predict_activity_single(request: SinglePredictionRequest, db: AsyncSession = Depends(get_async_db)):
     """Predicts physical activity level for a single patient using the new model."""
     try:
         logger.info(f"Predicting for patient with code {request.code}")
         
-        # Получаем данные пациента из БД
-        required_columns = ['col_1', 'col_14', 'col_58', 'col_59', 'col_85', 
-                          'col_232', 'col_249', 'col_252', 'col_245']
-        
-        columns_str = ", ".join([f'"{col}"' if col != 'col_1' else col for col in required_columns])
-        stmt = text(f'SELECT {columns_str} FROM {BASE_TABLE} WHERE col_1 = :code')
-        data_raw = db.execute(stmt, {"code": request.code}).mappings().fetchone()
+        # Готовый вектор признаков, посчитанный при записи пациента
+        stmt = text(f'SELECT features, features_valid FROM {BASE_TABLE} WHERE col_1 = :code')
+        stored = (await db.execute(stmt, {"code": request.code})).mappings().fetchone()
 
-        if not data_raw:
+        if not stored:
             logger.warning(f"Patient with code {request.code} not found")
             raise HTTPException(status_code=404, detail=f"Patient with code {request.code} not found.")
 
-        # Подготавливаем признаки для модели
-        features = validate_and_prepare_features(dict(data_raw))
+        if stored["features_valid"] is None:
+            # Строка из прежней версии без вектора — разбираем сырые столбцы
+            stmt = text(f'SELECT col_1, {RAW_FEATURES_SQL} FROM {BASE_TABLE} WHERE col_1 = :code')
+            data_raw = (await db.execute(stmt, {"code": request.code})).mappings().fetchone()
+            features = validate_and_prepare_features(dict(data_raw))
+        elif not stored["features_valid"]:
+            failed = ", ".join(stored_feature_batch([stored["features"]]).failed_columns()[0])
+            logger.error(f"Invalid features ({failed}) for patient {request.code}")
+            features = None
+        else:
+            features = list(stored["features"])
         
         if features is None:
             logger.error(f"Failed to prepare features for patient {request.code}")
             raise HTTPException(status_code=400, detail="Невалидные или отсутствующие данные для предсказания.")
 
-        # Вызываем модель предсказания
-        predicted_class = call_prediction_model(features)
+        # Вызываем модель предсказания вне event loop
+        predicted_class = await run_in_threadpool(call_prediction_model, features)
         
         if predicted_class is None:
             logger.error(f"Model prediction failed for patient {request.code}")
@@ -207,14 +255,21 @@ def predict_activity_manual(request: ManualPredictionRequest):
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 @router.post("/save-fa-result")
-def save_fa_result(request: SaveResultRequest, db: Session = Depends(get_db)):
+async def save_fa_result(request: SaveResultRequest, db: AsyncSession = Depends(get_async_db)):
     """Saves FA result to database."""
     try:
         logger.info(f"Saving FA result for patient {request.code}: {request.fa_level}")
         
-        update_stmt = text(f'UPDATE {BASE_TABLE} SET fa = :fa_level WHERE col_1 = :code')
-        result = db.execute(update_stmt, {"fa_level": request.fa_level, "code": request.code})
-        db.commit()
+        # Узкая таблица результатов; rowcount = 0, если пациента нет
+        update_stmt = text(f'''
+            INSERT INTO {RESULTS_TABLE} (code, fa, fa_scored_at, updated_at)
+            SELECT col_1, :fa_level, now(), now() FROM {BASE_TABLE} WHERE col_1 = :code
+            ON CONFLICT (code) DO UPDATE SET fa = EXCLUDED.fa, fa_scored_at = EXCLUDED.fa_scored_at, updated_at = EXCLUDED.updated_at
+        ''')
+        result = await db.execute(update_stmt, {"fa_level": request.fa_level, "code": request.code})
+        if result.rowcount:
+            await db.execute(text(BUMP_VERSION_SQL))
+        await db.commit()
 
         if result.rowcount == 0:
             logger.warning(f"Failed to update FA for patient {request.code}")
@@ -223,19 +278,25 @@ def save_fa_result(request: SaveResultRequest, db: Session = Depends(get_db)):
         return {"message": "Результат успешно сохранён"}
     
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         logger.error(f"Error saving FA result: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 @router.post("/save-lfk-result")
-def save_lfk_result(request: SaveLFKRequest, db: Session = Depends(get_db)):
+async def save_lfk_result(request: SaveLFKRequest, db: AsyncSession = Depends(get_async_db)):
     """Saves LFK result to database."""
     try:
         logger.info(f"Saving LFK result for patient {request.code}: {request.lfk_level}")
         
-        update_stmt = text(f'UPDATE {BASE_TABLE} SET lfk = :lfk_level WHERE col_1 = :code')
-        result = db.execute(update_stmt, {"lfk_level": request.lfk_level, "code": request.code})
-        db.commit()
+        update_stmt = text(f'''
+            INSERT INTO {RESULTS_TABLE} (code, lfk, lfk_saved_at, updated_at)
+            SELECT col_1, :lfk_level, now(), now() FROM {BASE_TABLE} WHERE col_1 = :code
+            ON CONFLICT (code) DO UPDATE SET lfk = EXCLUDED.lfk, lfk_saved_at = EXCLUDED.lfk_saved_at, updated_at = EXCLUDED.updated_at
+        ''')
+        result = await db.execute(update_stmt, {"lfk_level": request.lfk_level, "code": request.code})
+        if result.rowcount:
+            await db.execute(text(BUMP_VERSION_SQL))
+        await db.commit()
 
         if result.rowcount == 0:
             logger.warning(f"Failed to update LFK for patient {request.code}")
@@ -244,7 +305,7 @@ def save_lfk_result(request: SaveLFKRequest, db: Session = Depends(get_db)):
         return {"message": "Результат ЛФК успешно сохранён"}
     
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         logger.error(f"Error saving LFK result: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
@@ -263,6 +324,8 @@ def predict_model_direct(request: ModelPredictionRequest):
 
         return ModelPredictionResponse(predicted_class=predicted_class)
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error in direct model prediction: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
\ No newline at end of file
@@ -0,0 +1,59 @@
+# backend/routers/metrics.py
+
+from fastapi import APIRouter
+
+from backend.database import pool_status
+from backend.offload import offload_status
+from backend.prediction_cache import prediction_cache
+from backend.predictor import get_predictor
+from backend import synthetic
+from backend.roster_cache import roster_cache
+from backend.schema import schema_cache
+
+router = APIRouter(prefix="/metrics", tags=["metrics"])
+
+# Заполняется в backend/main.py при старте приложения
+startup_report = {}
+
+@router.get("/db-pool")
+def get_db_pool_metrics():
+    """Заполненность пула соединений и время ожидания соединения."""
+    return pool_status()
+
+@router.get("/schema-cache")
+def get_schema_cache_metrics():
+    """Попадания и промахи кэша метаданных схемы, возраст записей."""
+    return schema_cache.stats()
+
+@router.get("/startup")
+def get_startup_metrics():
+    """Время старта воркера по импортам роутеров и состояние модели CTGAN."""
+    return {**startup_report, "ctgan": synthetic.status()}
+
+@router.get("/synthetic")
+def get_synthetic_metrics():
+    """Резервуар синтетических строк: уровень, попадания/промахи, время пополнения."""
+    return synthetic.reservoir.stats()
+
+@router.get("/offload")
+def get_offload_metrics():
+    """Пул фоновых потоков для тяжёлой работы: размер, занятые и ожидающие задачи."""
+    return offload_status()
+
+@router.get("/roster-cache")
+def get_roster_cache_metrics():
+    """Кэш списков пациентов: попадания/промахи, ответы 304, версии записей."""
+    return roster_cache.stats()
+
+@router.get("/prediction-cache")
+def get_prediction_cache_metrics():
+    """Кэш предсказаний: размер, попадания в памяти и в Redis, доля попаданий, версия модели."""
+    return prediction_cache.stats()
+
+@router.get("/predictor")
+def get_predictor_metrics():
+    """Бэкенд модели: состояние размыкателя цепи, повторы, задержки и соединения HTTP-клиента."""
+    try:
+        return get_predictor().stats()
+    except Exception as e:
+        return {"error": str(e)}
@@ -1,7 +1,7 @@
 # backend/routers/patient_program.py
 
 from fastapi import APIRouter, HTTPException
-from sqlalchemy import create_engine, text
+from sqlalchemy import text
 from sqlalchemy.engine import ResultProxy
 from sqlalchemy.exc import SQLAlchemyError
 import logging
@@ -9,6 +9,8 @@ from typing import Dict, List, Any
 import os
 from dotenv import load_dotenv
 
+from backend.database import async_engine
+
 # Загружаем переменные окружения из файла .env
 load_dotenv()
 
@@ -16,12 +18,17 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Подключение к базе данных
-DATABASE_URL = os.getenv("DATABASE_URL")
-engine = create_engine(DATABASE_URL)
-
 router = APIRouter(prefix="/patient-program", tags=["patient-program"])
 
+# Столбцы общей информации о пациенте
+PATIENT_INFO_COLUMNS = ["col_1", "col_2", "col_3", "col_4", "col_5", "col_6"]
+
+# Столбцы, от которых зависят рекомендации generate_rehabilitation_program
+PROGRAM_COLUMNS = [
+    "col_3", "col_8", "col_10", "col_12", "col_21", "col_40", "col_52", "col_56",
+    "col_67", "col_82", "col_232", "col_249", "col_279", "col_365", "col_366"
+]
+
 def generate_rehabilitation_program(patient_data: Dict[str, Any]) -> Dict[str, List[str]]:
     """
     Генерация индивидуальной программы реабилитации на основе данных пациента
@@ -155,12 +162,14 @@ def generate_rehabilitation_program(patient_data: Dict[str, Any]) -> Dict[str, L
 
 @router.get("/{patient_code}")
 async def get_patient_program(patient_code: int):
-    # Запрос к базе данных для получения всех данных по коду карты пациента
-    query = text("SELECT * FROM fa_rgnkc_data WHERE col_1 = :patient_code")
+    # Запрос к базе данных только по столбцам, используемым в программе
+    query_columns = list(dict.fromkeys(PATIENT_INFO_COLUMNS + PROGRAM_COLUMNS))
+    columns_sql = ", ".join(f'"{col}"' for col in query_columns)
+    query = text(f"SELECT {columns_sql} FROM fa_rgnkc_data WHERE col_1 = :patient_code")
     
     try:
-        with engine.connect() as connection:
-            result: ResultProxy = connection.execute(query, {"patient_code": patient_code})
+        async with async_engine.connect() as connection:
+            result: ResultProxy = await connection.execute(query, {"patient_code": patient_code})
             row = result.fetchone()
             if row is None:
                 raise HTTPException(status_code=404, detail="Patient not found")
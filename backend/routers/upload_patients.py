@@ -1,20 +1,35 @@
 # # backend/routers/upload_patients.py
-from fastapi import APIRouter, File, UploadFile, HTTPException, Depends
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, File, UploadFile, HTTPException, Depends, Header, Query
+from fastapi.responses import JSONResponse, StreamingResponse
 import pandas as pd
 import psycopg2
-from psycopg2.extras import execute_values
 import io
 import datetime
-from typing import List, Dict, Any
+import shutil
+import tempfile
+import time
+import uuid
+from typing import List, Dict, Any, Optional
 import os
 from dotenv import load_dotenv
 import numpy as np
+import hashlib
 import json
-from ctgan import CTGAN
-import torch
 import re
 import warnings
+from openpyxl import load_workbook
+
+from backend.bulk_load import convert_frame, copy_records_async, frame_records
+from backend.column_types import add_enum_labels, invalid_values, missing_enum_labels
+from backend.feature_store import compute_feature_values
+from backend.features import FEATURE_COLUMNS
+from backend.database import asyncpg_connection, get_db_connection
+from backend.offload import run_offloaded
+from backend.schema import (
+    BUMP_VERSION_SQL, FEATURE_STORE_COLUMNS, UPLOADS_TABLE, column_mapping, index_report, schema_cache,
+    sql_type_for, table_columns
+)
+from backend.synthetic import reservoir
 
 warnings.filterwarnings('ignore')
 
@@ -23,34 +38,21 @@ load_dotenv()
 router = APIRouter()
 
 # Конфигурация БД
-DB_URI = os.getenv("DATABASE_URL")
 BASE_TABLE = 'fa_rgnkc_data'
-MAP_TABLE = 'fa_rgnkc_mapping'
-BATCH_SIZE = 200
 
-# Получаем путь к текущему файлу
-script_path = os.path.abspath(__file__)
+PATIENT_CODE_COLUMN = "Код_карты_пациента"
+# Что делать с пациентами, которые уже есть в базе (параметр on_conflict загрузки)
+CONFLICT_POLICIES = ("skip", "update", "fail")
+# Промежуточная таблица загрузки (временная, удаляется при COMMIT). Имя уникально
+# для каждой загрузки: asyncpg кэширует подготовленные запросы по тексту, а план
+# с OID удалённой временной таблицы внутри транзакции не перестраивается
+UPLOAD_STAGE_PREFIX = "fa_rgnkc_upload_stage"
+# Сколько строк Excel проверяется в БД за один запрос при потоковой обработке
+CHECK_CHUNK_ROWS = int(os.getenv("CHECK_CHUNK_ROWS", "1000"))
 
-# Определяем корневой каталог проекта
-# (в данном случае, поднимаемся на два уровня вверх от routers)
-project_root = os.path.dirname(os.path.dirname(os.path.dirname(script_path)))
-
-# Строим путь к модели от корневого каталога
-MODEL_PATH = os.path.join(project_root, 'models', 'ctgan', 'ctgan_optimal_model.pkl')
-
-# Для отладки можно распечатать путь
-print(f"Путь к модели: {MODEL_PATH}")
-
-# Загрузка модели CTGAN
-try:
-    loaded_ctgan = CTGAN.load(MODEL_PATH)
-    print("✅ Модель CTGAN успешно загружена!")
-except Exception as e:
-    raise RuntimeError(f"Ошибка загрузки модели CTGAN: {str(e)}")
-
-# Устанавливаем сиды для воспроизводимости
-np.random.seed(42)
-torch.manual_seed(42)
+# Модель CTGAN загружается лениво (backend/synthetic.py): при первом запросе
+# синтетики или фоновым прогревом после старта приложения. Готовые строки
+# берутся из резервуара synthetic.reservoir (настраивается ниже)
 
 # Словарь нужных столбцов (ключи - col_XX, значения - оригинальные имена с заменой _ на пробел)
 column_dict = {
@@ -211,6 +213,56 @@ def reverse_col_59(value):
     closest_key = min(col_59_reverse_mapping.keys(), key=lambda x: abs(x - rounded_value))
     return f"{col_59_reverse_mapping[closest_key]}"
 
+# --- Векторные аналоги функций выше для пакетного заполнения ---
+
+def _text_mask(series: pd.Series) -> pd.Series:
+    return series.map(type).eq(str)
+
+def _numeric_cells(series: pd.Series, is_text: pd.Series) -> pd.Series:
+    """Ячейки-числа как float, остальные — NaN"""
+    return pd.to_numeric(series.where(~is_text), errors='coerce').astype('float64')
+
+def preprocess_categorical_series(series: pd.Series, mapping: dict) -> pd.Series:
+    """Векторный preprocess_col_58 / preprocess_col_59"""
+    is_text = _text_mask(series)
+    result = _numeric_cells(series, is_text)
+    if is_text.any():
+        text = series[is_text].str.strip().str.replace('[', '', regex=False).str.replace(']', '', regex=False)
+        result[is_text] = text.map(mapping).astype('float64')
+    return result
+
+def extract_numeric_series(series: pd.Series) -> pd.Series:
+    """Векторный extract_numeric_value: те же шаблоны в том же порядке"""
+    is_text = _text_mask(series)
+    result = _numeric_cells(series, is_text)
+    if is_text.any():
+        text = series[is_text].str.strip()
+        value = text.str.extract(r'(\d+)\s*-\s*[<≤≥>]?\s*(\d+(?:[.,]\d+)?)', expand=True)[0]
+        value = value.fillna(text.str.extract(r'(\d+)\s*:\s*\d+(?:[.,]\d+)?', expand=False))
+        value = value.fillna(
+            text.str.replace(',', '.', regex=False).str.extract(r'(\d+(?:[.,]\d+)?)', expand=False)
+        )
+        result[is_text] = pd.to_numeric(value, errors='coerce')
+    return result
+
+def adjust_synthetic_frame(synth: pd.DataFrame) -> pd.DataFrame:
+    """Векторный adjust_synthetic_values для всех столбцов выборки CTGAN"""
+    adjusted = synth.copy()
+    for col in adjusted.columns:
+        if col not in column_stats:
+            continue
+        stats = column_stats[col]
+        values = pd.to_numeric(adjusted[col], errors='coerce').clip(lower=stats['min'], upper=stats['max'])
+        decimals = 0 if stats['type'] == 'integer' else stats['decimal_places']
+        adjusted[col] = values.round(decimals).astype('float64')
+    return adjusted
+
+def reverse_categorical_series(series: pd.Series, reverse_mapping: dict) -> pd.Series:
+    """Векторный reverse_col_58 / reverse_col_59: округление и ограничение диапазоном кодов"""
+    values = pd.to_numeric(series, errors='coerce')
+    codes = values.round().clip(lower=min(reverse_mapping), upper=max(reverse_mapping))
+    return codes.map(reverse_mapping)
+
 # Обратный словарь для переименования оригинала в col_n
 inverse_column_dict = {v: k for k, v in column_dict.items()}
 
@@ -227,23 +279,6 @@ main_missing_check_cols = [
     column_dict['col_254']
 ]
 
-def get_db_connection():
-    try:
-        conn = psycopg2.connect(DB_URI)
-        return conn
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Ошибка подключения к БД: {str(e)}")
-
-def get_sql_type(series: pd.Series) -> str:
-    if pd.api.types.is_integer_dtype(series):
-        return 'INTEGER'
-    elif pd.api.types.is_float_dtype(series):
-        return 'FLOAT'
-    elif pd.api.types.is_datetime64_any_dtype(series):
-        return 'DATE'
-    else:
-        return 'TEXT'
-
 def clean_json_value(value):
     if pd.isna(value):
         return None
@@ -251,7 +286,7 @@ def clean_json_value(value):
         if np.isnan(value) or np.isinf(value):
             return None
         return float(value)
-    if isinstance(value, (np.integer, np.int64, np.int32)):
+    if isinstance(value, (np.integer, np.int64, np.int32)) or (isinstance(value, int) and not isinstance(value, bool)):
         return int(value)
     if isinstance(value, (pd.Timestamp, datetime.datetime)):
         return value.strftime('%Y-%m-%d %H:%M:%S')
@@ -259,47 +294,24 @@ def clean_json_value(value):
         return value.strftime('%Y-%m-%d')
     return str(value)
 
-def prepare_cell(value, sql_type):
-    if pd.isna(value):
-        return None
-    if sql_type == 'DATE':
-        if isinstance(value, pd.Timestamp):
-            return value.date()
-        if isinstance(value, datetime.datetime):
-            return value.date()
-        if isinstance(value, datetime.date):
-            return value
-        try:
-            return pd.to_datetime(value, errors='coerce').date()
-        except Exception:
-            return None
-    if sql_type == 'INTEGER':
-        try:
-            if isinstance(value, float):
-                if np.isnan(value) or np.isinf(value):
-                    return None
-                if value.is_integer():
-                    return int(value)
-            return int(value)
-        except Exception:
-            return None
-    if sql_type == 'FLOAT':
-        try:
-            float_val = float(value)
-            if np.isnan(float_val) or np.isinf(float_val):
-                return None
-            return float_val
-        except Exception:
-            return None
-    return str(value)
+# Уникальный индекс по col_1 проверяется один раз на процесс, при первой загрузке;
+# создаёт его миграция python -m backend.schema, а не запрос загрузки
+_index_report = None
 
-def get_existing_patient_codes():
+def ensure_patient_indexes():
+    """Отчёт index_report (первичный ключ, уникальный индекс по col_1)"""
+    global _index_report
+    if _index_report is not None:
+        return _index_report
     conn = get_db_connection()
     try:
         cur = conn.cursor()
-        cur.execute(f'SELECT DISTINCT "col_1" FROM {BASE_TABLE} WHERE "col_1" IS NOT NULL')
-        existing_codes = {row[0] for row in cur.fetchall()}
-        return existing_codes
+        report = index_report(cur, BASE_TABLE)
+        print(f"Индексы {BASE_TABLE}: {report}")
+        # Отсутствие индекса не запоминается: после миграции загрузка заработает без перезапуска
+        if report['unique_index']:
+            _index_report = report
+        return report
     finally:
         cur.close()
         conn.close()
@@ -308,9 +320,7 @@ def get_column_mapping():
     conn = get_db_connection()
     try:
         cur = conn.cursor()
-        cur.execute(f'SELECT name_base_table, full_name FROM {MAP_TABLE}')
-        mapping = {row[1]: row[0] for row in cur.fetchall()}
-        return mapping
+        return column_mapping(cur)
     finally:
         cur.close()
         conn.close()
@@ -322,6 +332,187 @@ def clean_dataframe_for_json(df):
             cleaned_df[col] = cleaned_df[col].replace([np.inf, -np.inf], np.nan)
     return cleaned_df
 
+def normalize_patient_code(value):
+    """Код пациента в виде строки; целые float из Excel (123.0) -> '123'"""
+    if value is None:
+        return None
+    if isinstance(value, float):
+        if np.isnan(value):
+            return None
+        if value.is_integer():
+            return str(int(value))
+    code = str(value).strip()
+    return code or None
+
+def get_code_column_type(cur):
+    return table_columns(cur, BASE_TABLE).get('col_1', 'text')
+
+def code_key(code, code_type):
+    """Код из файла в типе col_1; None, если в этом типе такого кода быть не может"""
+    if code_type in ('integer', 'bigint', 'smallint'):
+        # Только ASCII-цифры: str.isdigit() пропускает '²' и '٣', на которых int() падает
+        if not re.fullmatch(r'-?[0-9]+', code):
+            return None
+        value = int(code)
+        # Сравнение идёт в bigint — код за его пределами в базе быть не может
+        return value if -2 ** 63 <= value < 2 ** 63 else None
+    if code_type in ('real', 'double precision', 'numeric'):
+        try:
+            return float(code)
+        except ValueError:
+            return None
+    return code
+
+# Тип массива для сравнения кодов с col_1 по индексу (по data_type столбца)
+CODE_ARRAY_TYPES = {
+    'integer': 'bigint', 'bigint': 'bigint', 'smallint': 'bigint',
+    'real': 'float8', 'double precision': 'float8', 'numeric': 'float8'
+}
+
+def find_new_codes(cur, codes, code_type):
+    """Коды из списка, которых ещё нет в БД.
+
+    Разница считается в БД: коды файла передаются одним массивом, а каждый
+    проверяется по индексу col_1 — стоимость зависит от размера файла,
+    а не от числа пациентов в базе."""
+    codes = list(codes)
+    if not codes:
+        return set()
+    array_type = CODE_ARRAY_TYPES.get(code_type, 'text')
+    keys = [code_key(code, code_type) for code in codes]
+    cur.execute(f'''
+        SELECT c.code FROM unnest(%s::text[], %s::{array_type}[]) AS c(code, key)
+        WHERE c.key IS NULL OR NOT EXISTS (SELECT 1 FROM {BASE_TABLE} d WHERE d."col_1" = c.key)
+    ''', (codes, keys))
+    return {row[0] for row in cur.fetchall()}
+
+def excel_header(values):
+    """Имена столбцов как у pd.read_excel: пустые -> 'Unnamed: i', повторы -> 'имя.1'"""
+    values = list(values)
+    while values and values[-1] is None:
+        values.pop()
+    header, seen = [], {}
+    for i, value in enumerate(values):
+        name = str(value) if value is not None else f"Unnamed: {i}"
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        header.append(name)
+    return header
+
+def save_upload_to_temp(upload, suffix):
+    """Копирует загруженный файл на диск порциями, не читая его в память целиком"""
+    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
+        upload.seek(0)
+        shutil.copyfileobj(upload, tmp)
+        return tmp.name
+
+def read_excel_header(path):
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        first_row = next(workbook.active.iter_rows(max_row=1, values_only=True), None)
+        return excel_header(first_row) if first_row else []
+    finally:
+        workbook.close()
+
+def iter_new_patients_ndjson(path, header):
+    """Построчно читает файл и отдаёт новых пациентов в формате NDJSON.
+
+    Коды проверяются в БД порциями по CHECK_CHUNK_ROWS строк, поэтому
+    память не зависит от размера файла. Последняя строка — итог."""
+    def line(payload):
+        return json.dumps(payload, ensure_ascii=False) + "\n"
+
+    code_index = header.index(PATIENT_CODE_COLUMN)
+    width = len(header)
+    new_codes = set()
+    rows_scanned = 0
+
+    conn = get_db_connection()
+    cur = conn.cursor()
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        code_type = get_code_column_type(cur)
+        rows = workbook.active.iter_rows(min_row=2, values_only=True)
+
+        def process(chunk):
+            codes = {code for code, _ in chunk if code is not None}
+            new = find_new_codes(cur, codes, code_type)
+            # Не держим транзакцию открытой между порциями
+            conn.rollback()
+            for code, values in chunk:
+                if code is None or code not in new:
+                    continue
+                new_codes.add(code)
+                data = {header[i]: clean_json_value(values[i]) for i in range(width)}
+                yield line({
+                    "type": "patient",
+                    "code": code,
+                    "data": data,
+                    "missing_columns": [col for col in main_missing_check_cols if data.get(col) is None]
+                })
+
+        chunk = []
+        for row in rows:
+            values = list(row[:width]) + [None] * (width - len(row))
+            if all(value is None for value in values):
+                continue
+            rows_scanned += 1
+            chunk.append((normalize_patient_code(values[code_index]), values))
+            if len(chunk) >= CHECK_CHUNK_ROWS:
+                yield from process(chunk)
+                chunk = []
+        if chunk:
+            yield from process(chunk)
+
+        if new_codes:
+            yield line({
+                "type": "summary",
+                "status": "new_patients_found",
+                "message": f"Обнаружено {len(new_codes)} новых пациентов",
+                "rows_scanned": rows_scanned,
+                "new_codes": sorted(new_codes)
+            })
+        else:
+            yield line({
+                "type": "summary",
+                "status": "no_new_patients",
+                "message": "Новых пациентов не найдено",
+                "rows_scanned": rows_scanned,
+                "new_codes": []
+            })
+    except Exception as e:
+        # Заголовки ответа уже отправлены, поэтому ошибка передаётся строкой потока
+        yield line({"type": "error", "detail": f"Ошибка при обработке файла: {str(e)}"})
+    finally:
+        workbook.close()
+        cur.close()
+        conn.close()
+        os.remove(path)
+
+async def stream_new_patients(file: UploadFile):
+    if not file.filename.endswith('.xlsx'):
+        raise HTTPException(status_code=400, detail="Потоковая проверка поддерживается только для .xlsx")
+
+    # UploadFile закрывается до отправки тела ответа, поэтому файл копируется во временный
+    path = await run_offloaded(save_upload_to_temp, file.file, '.xlsx')
+    try:
+        header = await run_offloaded(read_excel_header, path)
+        if not header:
+            raise HTTPException(status_code=400, detail="Файл пуст")
+        if PATIENT_CODE_COLUMN not in header:
+            raise HTTPException(status_code=400, detail=f"В файле отсутствует колонка '{PATIENT_CODE_COLUMN}'")
+    except HTTPException:
+        os.remove(path)
+        raise
+    except Exception as e:
+        os.remove(path)
+        raise HTTPException(status_code=400, detail=f"Не удалось прочитать файл: {str(e)}")
+
+    return StreamingResponse(iter_new_patients_ndjson(path, header), media_type="application/x-ndjson")
+
 def fill_missing_with_sums_and_synthetic(df_row: pd.DataFrame):
     if 'col_58' in df_row.columns:
         df_row['col_58'] = df_row['col_58'].apply(preprocess_col_58)
@@ -351,10 +542,8 @@ def fill_missing_with_sums_and_synthetic(df_row: pd.DataFrame):
     # Если в desired_cols все еще отсутствует, используем синтетитику
     missing_in_desired = df_row[desired_cols].isnull().any(axis=1).any()
     if missing_in_desired:
-        synth_data = loaded_ctgan.sample(1)
-        for col in synth_data.columns:
-            synth_data[col] = synth_data[col].apply(lambda x: adjust_synthetic_values(x, col))
-        synth_row = synth_data.iloc[0]
+        # Строка уже скорректирована adjust_synthetic_frame
+        synth_row = reservoir.take(1).iloc[0]
         for col in desired_cols:
             if pd.isna(df_row.loc[0, col]):
                 df_row.loc[0, col] = synth_row[col]
@@ -367,56 +556,279 @@ def fill_missing_with_sums_and_synthetic(df_row: pd.DataFrame):
 
     return df_row
 
+reservoir.configure(columns=desired_cols, adjust=adjust_synthetic_frame)
+
+def fill_missing_batch(df: pd.DataFrame):
+    """Пакетный вариант fill_missing_with_sums_and_synthetic для всех строк df.
+
+    Синтетические строки берутся из резервуара одним take(n); недостающие
+    генерируются одним вызовом CTGAN sample.
+    Возвращает заполненный DataFrame, число синтетических строк и время этапов (мс)."""
+    timings = {}
+    started = time.perf_counter()
+
+    def mark(stage):
+        nonlocal started
+        now = time.perf_counter()
+        timings[stage] = round((now - started) * 1000, 2)
+        started = now
+
+    df = df.reset_index(drop=True)
+    for col in desired_cols:
+        if col not in df.columns:
+            df[col] = np.nan
+
+    df['col_58'] = preprocess_categorical_series(df['col_58'], col_58_mapping)
+    df['col_59'] = preprocess_categorical_series(df['col_59'], col_59_mapping)
+    for col in desired_cols:
+        if col not in ['col_58', 'col_59']:
+            df[col] = extract_numeric_series(df[col])
+    mark('preprocess')
+
+    # Сумма баллов, если пропущена, а все слагаемые заполнены
+    for sum_col, components in sum_components.items():
+        present = [comp for comp in components if comp in df.columns]
+        if not present:
+            continue
+        parts = df[present].apply(pd.to_numeric, errors='coerce')
+        fillable = df[sum_col].isna() & parts.notna().all(axis=1)
+        df.loc[fillable, sum_col] = parts.loc[fillable].sum(axis=1)
+    mark('sums')
+
+    missing = df[desired_cols].isnull().any(axis=1)
+    synthetic_rows = int(missing.sum())
+    if synthetic_rows:
+        synth = reservoir.take(synthetic_rows)
+        mark('synthetic')
+        synth.index = df.index[missing]
+        for col in desired_cols:
+            df.loc[missing, col] = df.loc[missing, col].fillna(synth[col])
+        mark('fill')
+
+    df['col_58'] = reverse_categorical_series(df['col_58'], col_58_reverse_mapping)
+    df['col_59'] = reverse_categorical_series(df['col_59'], col_59_reverse_mapping)
+    mark('reverse')
+
+    return df, synthetic_rows, timings
+
+def find_new_patients(contents: bytes) -> dict:
+    """Синхронная часть check-new-patients: чтение Excel и поиск новых кодов"""
+    df = pd.read_excel(io.BytesIO(contents))
+
+    if df.empty:
+        raise HTTPException(status_code=400, detail="Файл пуст")
+
+    df = clean_dataframe_for_json(df)
+
+    patient_code_column = PATIENT_CODE_COLUMN
+
+    if patient_code_column not in df.columns:
+        raise HTTPException(status_code=400, detail=f"В файле отсутствует колонка '{patient_code_column}'")
+
+    # Коды файла сверяются в БД — в Python приходят только новые
+    row_codes = df[patient_code_column].map(normalize_patient_code)
+    conn = get_db_connection()
+    try:
+        cur = conn.cursor()
+        new_codes = find_new_codes(cur, set(row_codes.dropna()), get_code_column_type(cur))
+        cur.close()
+    finally:
+        conn.close()
+
+    if not new_codes:
+        return {
+            "status": "no_new_patients",
+            "message": "Новых пациентов не найдено"
+        }
+
+    is_new = row_codes.isin(new_codes)
+    new_patients_df = df[is_new]
+    new_patients_list = []
+
+    for patient_code, (_, row) in zip(row_codes[is_new], new_patients_df.iterrows()):
+        cleaned_row_data = {key: clean_json_value(value) for key, value in row.to_dict().items()}
+        missing_cols = [col for col in main_missing_check_cols if pd.isna(row.get(col))]
+        new_patients_list.append({
+            "code": patient_code,
+            "data": cleaned_row_data,
+            "missing_columns": missing_cols
+        })
+
+    return {
+        "status": "new_patients_found",
+        "message": f"Обнаружено {len(new_codes)} новых пациентов",
+        "new_patients": new_patients_list,
+        "new_codes": list(new_codes)
+    }
+
+def fill_single_patient(data: Dict[str, Any]) -> dict:
+    df_row = pd.DataFrame([data])
+    df_row.rename(columns=inverse_column_dict, inplace=True)
+
+    df_row = fill_missing_with_sums_and_synthetic(df_row)
+
+    df_row.rename(columns=column_dict, inplace=True)
+
+    return {key: clean_json_value(value) for key, value in df_row.iloc[0].to_dict().items()}
+
+def fill_patients_batch(patients: List[Dict[str, Any]]) -> dict:
+    started = time.perf_counter()
+    df = pd.DataFrame([p.get("data") or {} for p in patients])
+    df.rename(columns=inverse_column_dict, inplace=True)
+    timings = {'parse': round((time.perf_counter() - started) * 1000, 2)}
+
+    df, synthetic_rows, fill_timings = fill_missing_batch(df)
+    timings.update(fill_timings)
+
+    started = time.perf_counter()
+    df.rename(columns=column_dict, inplace=True)
+    columns = list(df.columns)
+    filled_patients = []
+    for patient, values in zip(patients, df.itertuples(index=False, name=None)):
+        filled_patients.append({
+            "code": patient.get("code"),
+            "data": {col: clean_json_value(value) for col, value in zip(columns, values)},
+            "missing_columns": []
+        })
+    timings['serialize'] = round((time.perf_counter() - started) * 1000, 2)
+
+    return {
+        "new_patients": filled_patients,
+        "filled_count": len(filled_patients),
+        "synthetic_rows": synthetic_rows,
+        "timings_ms": timings
+    }
+
+def upload_request_hash(body: List[Dict[str, Any]], policy: str) -> str:
+    """Хэш данных загрузки: повтор с тем же ключом идемпотентности должен нести те же данные"""
+    payload = json.dumps([p.get("data") for p in body], sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(f"{policy}\n{payload}".encode("utf-8")).hexdigest()
+
+def dedupe_by_code(insert_columns: List[str], records: List[tuple]):
+    """Одна строка на код пациента (последняя в файле); строки без кода отбрасываются"""
+    code_index = insert_columns.index("col_1")
+    by_code = {}
+    missing_code = 0
+    for record in records:
+        if record[code_index] is None:
+            missing_code += 1
+            continue
+        by_code[record[code_index]] = record
+    duplicates = len(records) - missing_code - len(by_code)
+    return list(by_code.values()), {"duplicates_in_file": duplicates, "missing_code": missing_code}
+
+def prepare_upload(body: List[Dict[str, Any]]):
+    """Синхронная часть загрузки: маппинг, индексы, типы столбцов, приведение значений
+    и вектор признаков модели.
+
+    Возвращает столбцы для вставки, готовые кортежи для COPY (по строке на код),
+    счётчики отброшенных строк, новые метки ENUM и тип col_1."""
+    df = pd.DataFrame([p["data"] for p in body])
+
+    column_mapping = get_column_mapping()
+    indexes = ensure_patient_indexes()
+    if indexes["duplicates"]:
+        raise HTTPException(
+            status_code=409,
+            detail=f"В {BASE_TABLE}.col_1 есть дубликаты (первые: {indexes['duplicates']}), "
+                   "загрузка с ON CONFLICT невозможна до их устранения"
+        )
+    if not indexes["unique_index"]:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Нет уникального индекса по {BASE_TABLE}.col_1, загрузка с ON CONFLICT невозможна. "
+                   "Выполните миграцию: python -m backend.schema"
+        )
+
+    rename_mapping = {}
+    for original_col in df.columns:
+        if original_col in column_mapping:
+            rename_mapping[original_col] = column_mapping[original_col]
+
+    if rename_mapping:
+        df = df.rename(columns=rename_mapping)
+
+    conn = get_db_connection()
+    try:
+        cur = conn.cursor()
+        existing_columns = table_columns(cur, BASE_TABLE)
+        insert_columns = [col for col in df.columns if col in existing_columns and col not in FEATURE_STORE_COLUMNS]
+        # Значения, не помещающиеся в типы столбцов, не пишутся молча как NULL
+        # или с потерей точности: загрузка отклоняется с указанием столбца
+        original_names = {col: original for original, col in rename_mapping.items()}
+        type_errors = []
+        for col in insert_columns:
+            bad_values = invalid_values(df[col], existing_columns[col])
+            if bad_values:
+                type_errors.append(f"{original_names.get(col, col)} ({col}, {existing_columns[col]}): {bad_values}")
+        if type_errors:
+            raise HTTPException(
+                status_code=400,
+                detail="Значения не помещаются в тип столбца: " + "; ".join(type_errors)
+            )
+        # Новые ответы в столбцах-ENUM только находятся: в тип их добавляет
+        # apply_enum_labels после проверок конфликтов и идемпотентности
+        new_labels = missing_enum_labels(cur, {col: df[col] for col in insert_columns})
+        cur.close()
+    finally:
+        conn.close()
+
+    if not insert_columns:
+        raise HTTPException(status_code=400, detail="Не найдено совпадающих колонок для вставки")
+    if "col_1" not in insert_columns:
+        raise HTTPException(status_code=400, detail="В данных нет кода пациента (col_1)")
+
+    col_sql_types = [sql_type_for(existing_columns[col]) for col in insert_columns]
+    frame = convert_frame(df, insert_columns, col_sql_types)
+    records = frame_records(frame)
+    has_feature_store = all(col in existing_columns for col in FEATURE_STORE_COLUMNS)
+    if has_feature_store and all(col in insert_columns for col in FEATURE_COLUMNS):
+        # Вектор признаков считается один раз здесь, по значениям в типах БД.
+        # Если в файле есть не все признаки, вектор по нему не считается: при
+        # обновлении upsert_sql сбрасывает сохранённый, и он досчитывается
+        # по строке из БД при следующем чтении
+        feature_values = compute_feature_values(frame)
+        records = [record + values for record, values in zip(records, feature_values)]
+        insert_columns = insert_columns + list(FEATURE_STORE_COLUMNS)
+    records, dropped = dedupe_by_code(insert_columns, records)
+    return insert_columns, records, dropped, new_labels, existing_columns["col_1"]
+
+def apply_enum_labels(new_labels: Dict[str, List[str]]):
+    """Добавляет новые метки ENUM отдельной транзакцией: COPY увидит их только после COMMIT"""
+    if not new_labels:
+        return
+    conn = get_db_connection()
+    try:
+        cur = conn.cursor()
+        added = add_enum_labels(cur, new_labels)
+        conn.commit()
+        cur.close()
+        print(f"Добавлены метки ENUM: {added}")
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
 @router.post("/check-new-patients")
-async def check_new_patients(file: UploadFile = File(...)):
+async def check_new_patients(
+    file: UploadFile = File(...),
+    response_format: str = Query("json", alias="format", description="json — один ответ, ndjson — построчный поток")
+):
     if not file.filename.endswith(('.xlsx', '.xls')):
         raise HTTPException(status_code=400, detail="Файл должен быть в формате Excel (.xlsx или .xls)")
+    if response_format not in ("json", "ndjson"):
+        raise HTTPException(status_code=400, detail="Параметр format должен быть json или ndjson")
+    if response_format == "ndjson":
+        return await stream_new_patients(file)
     
     try:
         contents = await file.read()
-        df = pd.read_excel(io.BytesIO(contents))
-        
-        if df.empty:
-            raise HTTPException(status_code=400, detail="Файл пуст")
-        
-        df = clean_dataframe_for_json(df)
-        
-        patient_code_column = "Код_карты_пациента"  # Исправлено на пробелы, предполагая оригинал
-        
-        if patient_code_column not in df.columns:
-            raise HTTPException(status_code=400, detail=f"В файле отсутствует колонка '{patient_code_column}'")
-        
-        existing_codes = get_existing_patient_codes()
-        
-        file_codes = set(df[patient_code_column].dropna().astype(str))
-        new_codes = file_codes - {str(code) for code in existing_codes}
-        
-        if not new_codes:
-            return JSONResponse(content={
-                "status": "no_new_patients",
-                "message": "Новых пациентов не найдено"
-            })
-        
-        new_patients_df = df[df[patient_code_column].astype(str).isin(new_codes)]
-        new_patients_list = []
-        
-        for _, row in new_patients_df.iterrows():
-            patient_code = str(row[patient_code_column])
-            cleaned_row_data = {key: clean_json_value(value) for key, value in row.to_dict().items()}
-            missing_cols = [col for col in main_missing_check_cols if pd.isna(row.get(col))]
-            new_patients_list.append({
-                "code": patient_code,
-                "data": cleaned_row_data,
-                "missing_columns": missing_cols
-            })
-        
-        return JSONResponse(content={
-            "status": "new_patients_found",
-            "message": f"Обнаружено {len(new_codes)} новых пациентов",
-            "new_patients": new_patients_list,
-            "new_codes": list(new_codes)
-        })
-        
+        # Разбор Excel и сверка кодов — в пуле offload, event loop остаётся свободным
+        content = await run_offloaded(find_new_patients, contents)
+        return JSONResponse(content=content)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Ошибка при обработке файла: {str(e)}")
 
@@ -427,94 +839,176 @@ async def fill_synthetic_patient(body: Dict[str, Any]):
         raise HTTPException(status_code=400, detail="Данные пациента не предоставлены")
     
     try:
-        df_row = pd.DataFrame([data])
-        df_row.rename(columns=inverse_column_dict, inplace=True)
-        
-        df_row = fill_missing_with_sums_and_synthetic(df_row)
-        
-        df_row.rename(columns=column_dict, inplace=True)
-        
-        filled_data = {key: clean_json_value(value) for key, value in df_row.iloc[0].to_dict().items()}
-        
+        filled_data = await run_offloaded(fill_single_patient, data)
         return JSONResponse(content={"data": filled_data})
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Ошибка при заполнении синтетикой: {str(e)}")
 
+@router.post("/fill-synthetic-patients")
+async def fill_synthetic_patients(body: Dict[str, Any]):
+    """Заполняет пропуски у всех новых пациентов из ответа check-new-patients за один вызов."""
+    patients = body.get("new_patients")
+    if not patients:
+        raise HTTPException(status_code=400, detail="Данные пациентов не предоставлены")
+
+    try:
+        return JSONResponse(content=await run_offloaded(fill_patients_batch, patients))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Ошибка при заполнении синтетикой: {str(e)}")
+
+def upsert_sql(columns: List[str], policy: str, stage_table: str) -> str:
+    """INSERT из промежуточной таблицы с ON CONFLICT (col_1) по политике загрузки.
+
+    RETURNING inserted отличает новые строки от обновлённых; строки, которые
+    не изменились или пропущены, не возвращаются. Если файл меняет часть
+    признаков, но не все (готового вектора в загрузке нет), у обновлённой
+    строки вектор сбрасывается в NULL и досчитывается по строке из БД при чтении."""
+    cols_sql = ", ".join(f'"{col}"' for col in columns)
+    insert_sql = f'INSERT INTO {BASE_TABLE} AS d ({cols_sql}) SELECT {cols_sql} FROM {stage_table}'
+    data_cols = [col for col in columns if col != "col_1"]
+    if policy == "update" and data_cols:
+        set_sql = ", ".join(f'"{col}" = EXCLUDED."{col}"' for col in data_cols)
+        feature_changed = any(col in columns for col in FEATURE_COLUMNS)
+        if feature_changed and not all(col in columns for col in FEATURE_STORE_COLUMNS):
+            set_sql += ", " + ", ".join(f'"{col}" = NULL' for col in FEATURE_STORE_COLUMNS)
+        current_sql = ", ".join(f'd."{col}"' for col in data_cols)
+        excluded_sql = ", ".join(f'EXCLUDED."{col}"' for col in data_cols)
+        # Строка переписывается, только если в загрузке что-то изменилось
+        return (f'{insert_sql} ON CONFLICT (col_1) DO UPDATE SET {set_sql} '
+                f'WHERE ROW({current_sql}) IS DISTINCT FROM ROW({excluded_sql}) '
+                f'RETURNING (xmax = 0) AS inserted')
+    return f'{insert_sql} ON CONFLICT (col_1) DO NOTHING RETURNING true AS inserted'
+
+async def stored_upload(connection, idempotency_key: Optional[str], request_hash: str) -> Optional[JSONResponse]:
+    """Сохранённый результат загрузки с этим ключом; тот же ключ с другими данными — 422"""
+    if not idempotency_key:
+        return None
+    stored = await connection.fetchrow(
+        f'SELECT request_hash, result FROM {UPLOADS_TABLE} WHERE idempotency_key = $1', idempotency_key
+    )
+    if stored is None:
+        return None
+    if stored["request_hash"] != request_hash:
+        raise HTTPException(status_code=422, detail="Ключ идемпотентности уже использован с другими данными")
+    return JSONResponse(content={**json.loads(stored["result"]), "replayed": True})
+
+async def check_code_conflicts(connection, insert_columns: List[str], records: List[tuple], code_type: str):
+    """409 для политики fail, если коды загрузки уже есть в базе (до COPY)"""
+    code_index = insert_columns.index("col_1")
+    array_type = CODE_ARRAY_TYPES.get(code_type, 'text')
+    codes = [record[code_index] if array_type != 'text' else str(record[code_index]) for record in records]
+    conflicts = await connection.fetch(
+        f'SELECT col_1 FROM {BASE_TABLE} WHERE col_1 = ANY($1::{array_type}[]) ORDER BY col_1 LIMIT 20', codes
+    )
+    if conflicts:
+        codes = [clean_json_value(row["col_1"]) for row in conflicts]
+        raise HTTPException(status_code=409, detail=f"Пациенты уже есть в базе, загрузка отменена (первые коды: {codes})")
+
+async def upsert_patients(connection, insert_columns: List[str], records: List[tuple], policy: str) -> dict:
+    """COPY во временную таблицу и перенос в таблицу пациентов одним INSERT ... ON CONFLICT.
+
+    Выполняется в транзакции вызывающего кода; временная таблица удаляется при COMMIT."""
+    stage_table = f"{UPLOAD_STAGE_PREFIX}_{uuid.uuid4().hex[:12]}"
+    await connection.execute(
+        f'CREATE TEMP TABLE {stage_table} (LIKE {BASE_TABLE} INCLUDING DEFAULTS) ON COMMIT DROP'
+    )
+    load_stats = await copy_records_async(connection, stage_table, insert_columns, records)
+
+    if policy == "fail":
+        conflicts = await connection.fetch(f'''
+            SELECT s.col_1 FROM {stage_table} s JOIN {BASE_TABLE} d ON d.col_1 = s.col_1
+            ORDER BY s.col_1 LIMIT 20
+        ''')
+        if conflicts:
+            codes = [clean_json_value(row["col_1"]) for row in conflicts]
+            raise HTTPException(status_code=409, detail=f"Пациенты уже есть в базе, загрузка отменена (первые коды: {codes})")
+
+    rows = await connection.fetch(upsert_sql(insert_columns, policy, stage_table))
+    inserted = sum(1 for row in rows if row["inserted"])
+    not_written = len(records) - len(rows)
+    outcome = {
+        "inserted": inserted,
+        "updated": len(rows) - inserted,
+        "unchanged": not_written if policy == "update" else 0,
+        "skipped": not_written if policy != "update" else 0
+    }
+    return {"outcome": outcome, "load_stats": load_stats}
+
 @router.post("/upload-new-patients-data")
-async def upload_new_patients_data(body: List[Dict[str, Any]]):
+async def upload_new_patients_data(
+    body: List[Dict[str, Any]],
+    on_conflict: str = Query("skip", description="Пациенты, уже имеющиеся в базе: skip — пропустить, update — обновить изменившихся, fail — отменить загрузку"),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=200)
+):
+    """Загружает пациентов через INSERT ... ON CONFLICT (col_1).
+
+    Повтор запроса с тем же заголовком Idempotency-Key возвращает сохранённый
+    результат и ничего не пишет; тот же ключ с другими данными — 422."""
+    if not body:
+        raise HTTPException(status_code=400, detail="Данные пациентов не предоставлены")
+    if on_conflict not in CONFLICT_POLICIES:
+        raise HTTPException(status_code=400, detail=f"on_conflict должен быть одним из: {', '.join(CONFLICT_POLICIES)}")
+
     try:
-        if not body:
-            raise HTTPException(status_code=400, detail="Данные пациентов не предоставлены")
-        
-        df = pd.DataFrame([p["data"] for p in body])
-        
-        column_mapping = get_column_mapping()
-        
-        rename_mapping = {}
-        for original_col in df.columns:
-            if original_col in column_mapping:
-                rename_mapping[original_col] = column_mapping[original_col]
-        
-        if rename_mapping:
-            df = df.rename(columns=rename_mapping)
-        
-        conn = get_db_connection()
-        cur = conn.cursor()
-        
-        try:
-            cur.execute(f"""
-                SELECT column_name, data_type 
-                FROM information_schema.columns 
-                WHERE table_name = '{BASE_TABLE}'
-                ORDER BY ordinal_position
-            """)
-            
-            table_columns = cur.fetchall()
-            existing_columns = {col[0]: col[1] for col in table_columns}
-            
-            insert_columns = [col for col in df.columns if col in existing_columns]
-            
-            if not insert_columns:
-                raise HTTPException(status_code=400, detail="Не найдено совпадающих колонок для вставки")
-            
-            col_sql_types = []
-            for col in insert_columns:
-                db_type = existing_columns[col]
-                if db_type in ['integer', 'bigint']:
-                    col_sql_types.append('INTEGER')
-                elif db_type in ['real', 'double precision', 'numeric']:
-                    col_sql_types.append('FLOAT')
-                elif db_type == 'date':
-                    col_sql_types.append('DATE')
-                else:
-                    col_sql_types.append('TEXT')
-            
-            columns_list_sql = ','.join([f'"{c}"' for c in insert_columns])
-            insert_sql = f'INSERT INTO {BASE_TABLE} ({columns_list_sql}) VALUES %s'
-            
-            insert_data = []
-            for _, row in df.iterrows():
-                row_data = [prepare_cell(row.get(col), col_sql_types[i]) for i, col in enumerate(insert_columns)]
-                insert_data.append(tuple(row_data))
-            
-            if insert_data:
-                execute_values(cur, insert_sql, insert_data, page_size=BATCH_SIZE)
-                conn.commit()
-            
-            uploaded_count = len(insert_data)
-            
-            return JSONResponse(content={
-                "status": "success",
-                "message": f"Успешно загружено {uploaded_count} новых пациентов",
-                "uploaded_count": uploaded_count
-            })
-            
-        except Exception as e:
-            conn.rollback()
-            raise HTTPException(status_code=500, detail=f"Ошибка при загрузке в БД: {str(e)}")
-            
-    finally:
-        if 'cur' in locals():
-            cur.close()
-        if 'conn' in locals():
-            conn.close()
\ No newline at end of file
+        # Подготовка в пуле offload, вставка — бинарный COPY через asyncpg
+        insert_columns, records, dropped, new_labels, code_type = await run_offloaded(prepare_upload, body)
+        request_hash = await run_offloaded(upload_request_hash, body, on_conflict)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Ошибка при загрузке в БД: {str(e)}")
+
+    try:
+        async with asyncpg_connection() as connection:
+            if new_labels:
+                # Метки ENUM — DDL, который нельзя откатить вместе с загрузкой: добавляем их,
+                # только если загрузка не повтор по ключу и не отклоняется политикой fail
+                replayed = await stored_upload(connection, idempotency_key, request_hash)
+                if replayed is not None:
+                    return replayed
+                if on_conflict == "fail":
+                    await check_code_conflicts(connection, insert_columns, records, code_type)
+                await run_offloaded(apply_enum_labels, new_labels)
+
+            async with connection.transaction():
+                if idempotency_key:
+                    # Одновременные запросы с одним ключом выполняются по очереди
+                    await connection.execute('SELECT pg_advisory_xact_lock(hashtext($1))', idempotency_key)
+                    replayed = await stored_upload(connection, idempotency_key, request_hash)
+                    if replayed is not None:
+                        return replayed
+
+                upserted = await upsert_patients(connection, insert_columns, records, on_conflict)
+                outcome = {"received": len(body), **dropped, **upserted["outcome"]}
+                uploaded_count = outcome["inserted"] + outcome["updated"]
+                if uploaded_count:
+                    await connection.execute(BUMP_VERSION_SQL)
+
+                result = {
+                    "status": "success",
+                    "message": (f"Успешно загружено {outcome['inserted']} новых пациентов, "
+                                f"обновлено {outcome['updated']}, "
+                                f"пропущено или без изменений {outcome['skipped'] + outcome['unchanged']}"),
+                    "uploaded_count": uploaded_count,
+                    "policy": on_conflict,
+                    "outcome": outcome,
+                    "idempotency_key": idempotency_key,
+                    "load_stats": upserted["load_stats"]
+                }
+                if idempotency_key:
+                    await connection.execute(f'''
+                        INSERT INTO {UPLOADS_TABLE} (idempotency_key, policy, request_hash, result)
+                        VALUES ($1, $2, $3, $4::jsonb)
+                    ''', idempotency_key, on_conflict, request_hash, json.dumps(result, ensure_ascii=False))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Ошибка при загрузке в БД: {str(e)}")
+
+    return JSONResponse(content={**result, "replayed": False})
+
+@router.post("/schema-cache/invalidate")
+def invalidate_schema_cache():
+    """Сбрасывает кэш маппинга и типов столбцов (например, после ручного DDL)."""
+    schema_cache.invalidate()
+    return {"message": "Кэш схемы сброшен", "stats": schema_cache.stats()}
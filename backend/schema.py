@@ -0,0 +1,538 @@
+# backend/schema.py
+#
+# Первичный ключ и индексы таблицы пациентов, определение SQL-типов,
+# кэш метаданных схемы (маппинг col_N <-> полное имя, типы столбцов),
+# столбцы готового вектора признаков, узкая таблица результатов оценки,
+# счётчик версии данных таблицы пациентов, таблицы фоновых задач и
+# результатов загрузок по ключу идемпотентности.
+# Для существующей базы миграция запускается из корня проекта отдельным шагом
+# перед стартом бэкенда (сам бэкенд при старте только проверяет схему):
+#   python -m backend.schema
+
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+import pandas as pd
+from dotenv import load_dotenv
+
+load_dotenv()
+
+BASE_TABLE = 'fa_rgnkc_data'
+MAP_TABLE = 'fa_rgnkc_mapping'
+VERSION_TABLE = 'fa_rgnkc_version'
+JOBS_TABLE = 'fa_rgnkc_jobs'
+# Результаты загрузок по ключу идемпотентности (повтор запроса не пишет данные второй раз)
+UPLOADS_TABLE = 'fa_rgnkc_uploads'
+
+# Время жизни кэша метаданных (с) — страховка, если DDL прошёл мимо проверки
+SCHEMA_CACHE_TTL = float(os.getenv("SCHEMA_CACHE_TTL", "600"))
+
+# Результаты оценки (fa, lfk) хранятся в узкой таблице по коду пациента,
+# а не в строке fa_rgnkc_data из сотен столбцов: обновление одного числа не
+# переписывает широкий кортеж. fa_features_hash и fa_model_version — хэш
+# признаков и версия модели, с которыми рассчитан fa (инкрементальный пересчёт).
+RESULTS_TABLE = 'fa_rgnkc_results'
+RESULT_COLUMNS = {
+    'fa': 'INTEGER',
+    'fa_features_hash': 'TEXT',
+    'fa_model_version': 'TEXT',
+    'fa_scored_at': 'TIMESTAMPTZ',
+    'lfk': 'INTEGER',
+    'lfk_saved_at': 'TIMESTAMPTZ'
+}
+# Столбцы результатов в fa_rgnkc_data из прежних версий — переносятся в RESULTS_TABLE
+LEGACY_RESULT_COLUMNS = ['fa', 'lfk', 'fa_features_hash', 'fa_model_version']
+# Свободное место на странице для HOT-обновлений результатов
+RESULTS_FILLFACTOR = 80
+
+# Индексы фильтров списков: (столбец, ключ) — фильтр и keyset-порядок
+# постраничных списков обслуживаются одним проходом по индексу
+FILTER_INDEX_COLUMNS = ['col_2', 'col_3']
+RESULT_INDEX_COLUMNS = ['fa', 'lfk']
+
+# Подготовленный вектор признаков модели в строке пациента (backend/feature_store.py):
+# features — REAL[] в порядке FEATURE_COLUMNS, NULL в невалидных ячейках;
+# features_valid — все признаки валидны, NULL — вектор ещё не посчитан
+FEATURE_STORE_COLUMNS = {
+    'features': 'REAL[]',
+    'features_valid': 'BOOLEAN'
+}
+
+# Типы information_schema -> SQL-типы загрузчика (остальные — TEXT)
+DB_TYPE_TO_SQL = {
+    'integer': 'INTEGER',
+    'bigint': 'INTEGER',
+    'smallint': 'INTEGER',
+    'real': 'FLOAT',
+    'double precision': 'FLOAT',
+    'numeric': 'FLOAT',
+    'date': 'DATE',
+    'boolean': 'BOOLEAN',
+    # Перечисления из create_db.py (backend/column_types.py)
+    'USER-DEFINED': 'ENUM'
+}
+
+
+# Увеличивается в той же транзакции, что и запись в таблицу пациентов
+BUMP_VERSION_SQL = f"""
+    INSERT INTO {VERSION_TABLE} (table_name, version) VALUES ('{BASE_TABLE}', 1)
+    ON CONFLICT (table_name) DO UPDATE SET version = {VERSION_TABLE}.version + 1
+"""
+SELECT_VERSION_SQL = f"SELECT version FROM {VERSION_TABLE} WHERE table_name = '{BASE_TABLE}'"
+
+
+def get_sql_type(series: pd.Series) -> str:
+    """SQL-тип столбца по данным DataFrame"""
+    if pd.api.types.is_integer_dtype(series):
+        return 'INTEGER'
+    elif pd.api.types.is_float_dtype(series):
+        return 'FLOAT'
+    elif pd.api.types.is_datetime64_any_dtype(series):
+        return 'DATE'  # если есть время — заменить на TIMESTAMP
+    else:
+        return 'TEXT'
+
+
+def sql_type_for(db_type: str) -> str:
+    return DB_TYPE_TO_SQL.get(db_type, 'TEXT')
+
+
+def load_column_mapping(cur) -> Dict[str, str]:
+    """col_N -> полное имя столбца из файла"""
+    cur.execute(f'SELECT name_base_table, full_name FROM {MAP_TABLE}')
+    return {row[0]: row[1] for row in cur.fetchall()}
+
+
+def load_table_columns(cur, table: str = BASE_TABLE) -> Dict[str, str]:
+    """Имя столбца -> data_type из information_schema (в порядке столбцов)"""
+    cur.execute("""
+        SELECT column_name, data_type
+        FROM information_schema.columns
+        WHERE table_name = %s
+        ORDER BY ordinal_position
+    """, (table,))
+    return {row[0]: row[1] for row in cur.fetchall()}
+
+
+def schema_fingerprint(cur) -> tuple:
+    """Отпечаток DDL таблиц пациентов и маппинга.
+
+    oid меняется при пересоздании таблицы (create_db.py), relnatts — при
+    добавлении столбцов, relfilenode — при перезаписи (ALTER TYPE, TRUNCATE).
+    Запрос к pg_class дешевле чтения information_schema и всего маппинга."""
+    cur.execute("""
+        SELECT relname, oid, relnatts, relfilenode FROM pg_class
+        WHERE oid IN (to_regclass(%s), to_regclass(%s))
+        ORDER BY relname
+    """, (BASE_TABLE, MAP_TABLE))
+    return tuple(tuple(row) for row in cur.fetchall())
+
+
+class SchemaCache:
+    """Кэш метаданных схемы в памяти процесса.
+
+    Запись сбрасывается при смене отпечатка схемы, по TTL или явно
+    через invalidate() (после DDL и из админского эндпоинта)."""
+
+    def __init__(self, ttl: float = SCHEMA_CACHE_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = {}
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, cur, key: str, loader: Callable, ttl: Optional[float] = None):
+        """Значение key; при промахе вызывается loader(cur)"""
+        ttl = self.ttl if ttl is None else ttl
+        fingerprint = schema_fingerprint(cur)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry['fingerprint'] == fingerprint and now - entry['loaded_at'] < ttl:
+                self.hits += 1
+                return entry['value']
+            self.misses += 1
+
+        value = loader(cur)
+        with self._lock:
+            self._entries[key] = {'value': value, 'fingerprint': fingerprint, 'loaded_at': now}
+        return value
+
+    def invalidate(self, key: Optional[str] = None):
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+            self.invalidations += 1
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        with self._lock:
+            return {
+                'ttl_s': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'invalidations': self.invalidations,
+                'entries': {key: round(now - entry['loaded_at'], 1) for key, entry in self._entries.items()}
+            }
+
+
+schema_cache = SchemaCache()
+
+
+def column_names(cur) -> Dict[str, str]:
+    """col_N -> полное имя (через кэш)"""
+    return schema_cache.get(cur, 'column_names', load_column_mapping)
+
+
+def column_mapping(cur) -> Dict[str, str]:
+    """Полное имя -> col_N (через кэш)"""
+    return schema_cache.get(
+        cur, 'column_mapping',
+        lambda c: {full: col for col, full in load_column_mapping(c).items()}
+    )
+
+
+def table_columns(cur, table: str = BASE_TABLE) -> Dict[str, str]:
+    """Столбец -> data_type таблицы (через кэш)"""
+    return schema_cache.get(cur, f'columns:{table}', lambda c: load_table_columns(c, table))
+
+
+def _constraint_exists(cur, name: str) -> bool:
+    cur.execute('SELECT 1 FROM pg_constraint WHERE conname = %s', (name,))
+    return cur.fetchone() is not None
+
+
+def _column_exists(cur, table: str, column: str) -> bool:
+    cur.execute('''
+        SELECT 1 FROM information_schema.columns
+        WHERE table_name = %s AND column_name = %s
+    ''', (table, column))
+    return cur.fetchone() is not None
+
+
+def ensure_version_table(cur):
+    """Таблица счётчиков версий данных (по строке на таблицу)"""
+    cur.execute(f'''
+        CREATE TABLE IF NOT EXISTS {VERSION_TABLE} (
+            table_name TEXT PRIMARY KEY,
+            version BIGINT NOT NULL
+        )
+    ''')
+    cur.execute(f'''
+        INSERT INTO {VERSION_TABLE} (table_name, version) VALUES (%s, 1)
+        ON CONFLICT (table_name) DO NOTHING
+    ''', (BASE_TABLE,))
+
+
+def ensure_jobs_table(cur):
+    """Фоновые задачи (пакетная оценка ФА): состояние, прогресс и контрольная точка"""
+    cur.execute(f'''
+        CREATE TABLE IF NOT EXISTS {JOBS_TABLE} (
+            id TEXT PRIMARY KEY,
+            kind TEXT NOT NULL,
+            status TEXT NOT NULL,
+            params JSONB NOT NULL DEFAULT '{{}}',
+            total INTEGER NOT NULL DEFAULT 0,
+            processed INTEGER NOT NULL DEFAULT 0,
+            updated INTEGER NOT NULL DEFAULT 0,
+            skipped INTEGER NOT NULL DEFAULT 0,
+            failed INTEGER NOT NULL DEFAULT 0,
+            failures JSONB NOT NULL DEFAULT '[]',
+            checkpoint TEXT,
+            elapsed_seconds DOUBLE PRECISION NOT NULL DEFAULT 0,
+            error TEXT,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+            started_at TIMESTAMPTZ,
+            heartbeat_at TIMESTAMPTZ,
+            finished_at TIMESTAMPTZ
+        )
+    ''')
+    cur.execute(f'CREATE INDEX IF NOT EXISTS {JOBS_TABLE}_kind_status_idx ON {JOBS_TABLE} (kind, status)')
+    # Не больше одной активной задачи каждого вида (jobs.create_job вставляет через ON CONFLICT).
+    # Лишние активные задачи прежних версий, кроме самой свежей, помечаются упавшими.
+    cur.execute(f'''
+        UPDATE {JOBS_TABLE} j SET status = 'failed', finished_at = now(), error = 'Задача вытеснена более новой'
+        WHERE status IN ('queued', 'running') AND EXISTS (
+            SELECT 1 FROM {JOBS_TABLE} n
+            WHERE n.kind = j.kind AND n.status IN ('queued', 'running') AND n.created_at > j.created_at
+        )
+    ''')
+    cur.execute(f'''
+        CREATE UNIQUE INDEX IF NOT EXISTS {JOBS_TABLE}_active_kind_idx
+        ON {JOBS_TABLE} (kind) WHERE status IN ('queued', 'running')
+    ''')
+
+
+def _column_type(cur, table: str, column: str) -> Optional[str]:
+    """Полный SQL-тип столбца (format_type: integer, text, double precision, ...); None, если столбца нет"""
+    cur.execute('''
+        SELECT format_type(atttypid, atttypmod) FROM pg_attribute
+        WHERE attrelid = to_regclass(%s) AND attname = %s AND attnum > 0 AND NOT attisdropped
+    ''', (table, column))
+    row = cur.fetchone()
+    return row[0] if row else None
+
+
+def ensure_results_table(cur, table: str = BASE_TABLE):
+    """Узкая таблица результатов; значения из столбцов прежних версий переносятся в неё.
+
+    code имеет тот же тип, что и col_1 таблицы пациентов (целый, дробный или
+    текстовый код), иначе соединение r.code = d.col_1 не сработает. Если
+    таблица пациентов ещё не создана, используется BIGINT, а тип code
+    приводится к col_1 при следующей миграции."""
+    code_type = _column_type(cur, table, 'col_1')
+    columns_sql = ",\n            ".join(f'"{col}" {sql_type}' for col, sql_type in RESULT_COLUMNS.items())
+    cur.execute(f'''
+        CREATE TABLE IF NOT EXISTS {RESULTS_TABLE} (
+            code {code_type or 'BIGINT'} PRIMARY KEY,
+            {columns_sql},
+            updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        ) WITH (fillfactor = {RESULTS_FILLFACTOR})
+    ''')
+    results_code_type = _column_type(cur, RESULTS_TABLE, 'code')
+    if code_type is not None and results_code_type != code_type:
+        print(f"Тип {RESULTS_TABLE}.code: {results_code_type} -> {code_type} (как у {table}.col_1)")
+        cur.execute(f'ALTER TABLE {RESULTS_TABLE} ALTER COLUMN code TYPE {code_type} USING code::text::{code_type}')
+    for col in RESULT_INDEX_COLUMNS:
+        cur.execute(f'CREATE INDEX IF NOT EXISTS {RESULTS_TABLE}_{col}_code_idx ON {RESULTS_TABLE} ("{col}", code)')
+
+    legacy = [col for col in LEGACY_RESULT_COLUMNS if _column_exists(cur, table, col)]
+    if not legacy:
+        return
+    cols_sql = ", ".join(f'"{col}"' for col in legacy)
+    cur.execute(f'''
+        INSERT INTO {RESULTS_TABLE} (code, {cols_sql})
+        SELECT col_1, {cols_sql} FROM {table}
+        WHERE col_1 IS NOT NULL AND ({" OR ".join(f'"{col}" IS NOT NULL' for col in legacy)})
+        ON CONFLICT (code) DO NOTHING
+    ''')
+    print(f"Результаты из {table} ({', '.join(legacy)}) перенесены в {RESULTS_TABLE}: {cur.rowcount} строк")
+    for col in legacy:
+        cur.execute(f'ALTER TABLE {table} DROP COLUMN IF EXISTS "{col}"')
+
+
+def ensure_uploads_table(cur):
+    """Результаты загрузок пациентов по ключу идемпотентности"""
+    cur.execute(f'''
+        CREATE TABLE IF NOT EXISTS {UPLOADS_TABLE} (
+            idempotency_key TEXT PRIMARY KEY,
+            policy TEXT NOT NULL,
+            request_hash TEXT NOT NULL,
+            result JSONB NOT NULL,
+            created_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        )
+    ''')
+
+
+# Типы, которые прежние версии create_db.py выбирали по наблюдённым значениям,
+# и их расширение: BOOLEAN (флаги 0/1) -> INTEGER, SMALLINT -> INTEGER, REAL -> DOUBLE PRECISION
+NARROW_COLUMN_TYPES = {
+    'boolean': ('INTEGER', 'int'),
+    'smallint': ('INTEGER', 'int'),
+    'real': ('DOUBLE PRECISION', 'double precision')
+}
+
+
+def narrow_columns(cur, table: str = BASE_TABLE) -> Dict[str, str]:
+    """Столбцы данных таблицы пациентов с суженным типом (без столбцов вектора признаков)"""
+    return {
+        col: data_type for col, data_type in load_table_columns(cur, table).items()
+        if data_type in NARROW_COLUMN_TYPES and col not in FEATURE_STORE_COLUMNS
+    }
+
+
+def widen_narrow_columns(cur, table: str = BASE_TABLE) -> Dict[str, str]:
+    """Расширяет суженные столбцы одним ALTER TABLE (таблица переписывается один раз).
+
+    Значения сохраняются точно: REAL выбирался, только если float32 хранил их без потерь."""
+    narrow = narrow_columns(cur, table)
+    if not narrow:
+        return {}
+    alters = []
+    for col, data_type in narrow.items():
+        wide_type, cast = NARROW_COLUMN_TYPES[data_type]
+        alters.append(f'ALTER COLUMN "{col}" TYPE {wide_type} USING "{col}"::{cast}')
+    cur.execute(f'ALTER TABLE {table} ' + ', '.join(alters))
+    print(f"Расширены типы столбцов {table}: {len(narrow)} ({', '.join(sorted(set(narrow.values())))})")
+    return narrow
+
+
+def ensure_feature_columns(cur, table: str = BASE_TABLE):
+    """Столбцы готового вектора признаков (без значения по умолчанию — только метаданные)"""
+    cur.execute('SELECT to_regclass(%s)', (table,))
+    if cur.fetchone()[0] is None:
+        return
+    for col, sql_type in FEATURE_STORE_COLUMNS.items():
+        cur.execute(f'ALTER TABLE {table} ADD COLUMN IF NOT EXISTS "{col}" {sql_type}')
+
+
+def _relation_exists(cur, name: str) -> bool:
+    cur.execute('SELECT to_regclass(%s)', (name,))
+    return cur.fetchone()[0] is not None
+
+
+def check_schema(cur, table: str = BASE_TABLE) -> List[str]:
+    """Расхождения схемы с текущей версией кода — только чтение, без блокировок DDL.
+
+    Пустой список — схема в порядке; иначе нужна миграция python -m backend.schema."""
+    if not _relation_exists(cur, table):
+        return [f"нет таблицы {table} (создайте базу: python create_db.py)"]
+    problems = []
+    columns = load_table_columns(cur, table)
+    missing = [col for col in FEATURE_STORE_COLUMNS if col not in columns]
+    if missing:
+        problems.append(f"в {table} нет столбцов {', '.join(missing)}")
+    legacy = [col for col in LEGACY_RESULT_COLUMNS if col in columns]
+    if legacy:
+        problems.append(f"в {table} остались столбцы результатов прежних версий: {', '.join(legacy)}")
+    narrow = narrow_columns(cur, table)
+    if narrow:
+        problems.append(f"в {table} {len(narrow)} столбцов с суженным типом (BOOLEAN/SMALLINT/REAL)")
+    for name in (RESULTS_TABLE, VERSION_TABLE, JOBS_TABLE, UPLOADS_TABLE, f'{JOBS_TABLE}_active_kind_idx'):
+        if not _relation_exists(cur, name):
+            problems.append(f"нет {name}")
+    code_type, results_code_type = _column_type(cur, table, 'col_1'), _column_type(cur, RESULTS_TABLE, 'code')
+    if results_code_type is not None and results_code_type != code_type:
+        problems.append(f"тип {RESULTS_TABLE}.code ({results_code_type}) не совпадает с {table}.col_1 ({code_type})")
+    return problems
+
+
+def verify_runtime_schema():
+    """Проверка схемы при старте бэкенда.
+
+    Миграции (перенос результатов, ALTER TABLE) берут ACCESS EXCLUSIVE и не
+    должны выполняться каждым воркером при старте — они запускаются отдельным
+    шагом python -m backend.schema. Если схема устарела, старт прерывается.
+    На новой базе без таблицы пациентов (create_db.py ещё не запускался)
+    бэкенд стартует с предупреждением: данных, которые можно испортить, нет."""
+    from backend.database import get_db_connection
+
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cur:
+            base_exists = _relation_exists(cur, BASE_TABLE)
+            problems = check_schema(cur)
+    finally:
+        conn.close()
+    if problems and not base_exists:
+        print(f"⚠️  {'; '.join(problems)}. Списки пациентов и оценка ФА недоступны до создания базы")
+        return
+    if problems:
+        raise RuntimeError(
+            "Схема базы не соответствует версии бэкенда: " + "; ".join(problems)
+            + ". Выполните миграцию: python -m backend.schema"
+        )
+
+
+def index_report(cur, table: str = BASE_TABLE) -> dict:
+    """Первичный ключ и уникальный индекс по col_1 без изменения схемы.
+
+    Если уникального индекса нет, в отчёт попадают первые дубликаты col_1."""
+    report = {'primary_key': _constraint_exists(cur, f'{table}_pkey'), 'unique_index': False, 'duplicates': []}
+    cur.execute('''
+        SELECT 1 FROM pg_index i
+        JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = i.indkey[0]
+        WHERE i.indrelid = to_regclass(%s) AND i.indisunique AND i.indnkeyatts = 1
+          AND i.indpred IS NULL AND a.attname = 'col_1'
+    ''', (table,))
+    report['unique_index'] = cur.fetchone() is not None
+    if not report['unique_index']:
+        cur.execute(f'''
+            SELECT col_1 FROM {table}
+            WHERE col_1 IS NOT NULL
+            GROUP BY col_1 HAVING COUNT(*) > 1
+            LIMIT 20
+        ''')
+        report['duplicates'] = [row[0] for row in cur.fetchall()]
+    return report
+
+
+def ensure_indexes(cur, table: str = BASE_TABLE) -> dict:
+    """Идемпотентно создаёт первичный ключ по col_1 и индексы фильтров списков.
+
+    Если в col_1 есть дубликаты, создаётся обычный индекс, а дубликаты
+    возвращаются в отчёте. Если есть NULL, уникальный индекс создаётся,
+    но не превращается в первичный ключ. Затрагивает только table — служебные
+    таблицы и столбцы создаёт migrate_schema."""
+    report = {'primary_key': False, 'unique_index': False, 'duplicates': [], 'null_codes': 0}
+    pkey = f'{table}_pkey'
+    unique_index = f'{table}_col_1_key'
+
+    if _constraint_exists(cur, pkey):
+        report['primary_key'] = report['unique_index'] = True
+    else:
+        cur.execute(f'''
+            SELECT col_1 FROM {table}
+            WHERE col_1 IS NOT NULL
+            GROUP BY col_1 HAVING COUNT(*) > 1
+            LIMIT 20
+        ''')
+        report['duplicates'] = [row[0] for row in cur.fetchall()]
+
+        if report['duplicates']:
+            print(f"⚠️  В {table}.col_1 есть дубликаты (первые: {report['duplicates']}), создаётся неуникальный индекс")
+            cur.execute(f'CREATE INDEX IF NOT EXISTS {table}_col_1_idx ON {table} (col_1)')
+        else:
+            cur.execute(f'CREATE UNIQUE INDEX IF NOT EXISTS {unique_index} ON {table} (col_1)')
+            report['unique_index'] = True
+
+            cur.execute(f'SELECT COUNT(*) FROM {table} WHERE col_1 IS NULL')
+            report['null_codes'] = cur.fetchone()[0]
+            if report['null_codes'] == 0:
+                cur.execute(f'ALTER TABLE {table} ADD CONSTRAINT {pkey} PRIMARY KEY USING INDEX {unique_index}')
+                report['primary_key'] = True
+            else:
+                print(f"⚠️  В {table}.col_1 есть NULL ({report['null_codes']} строк), первичный ключ не создан")
+
+    for col in FILTER_INDEX_COLUMNS:
+        if not _column_exists(cur, table, col):
+            continue
+        cur.execute(f'CREATE INDEX IF NOT EXISTS {table}_{col}_col_1_idx ON {table} ("{col}", col_1)')
+
+    return report
+
+
+def migrate_schema(cur, table: str = BASE_TABLE) -> dict:
+    """Полная миграция рабочей базы: столбцы вектора признаков, перенос результатов
+    в узкую таблицу, индексы таблицы пациентов и служебные таблицы.
+
+    Возвращает отчёт ensure_indexes."""
+    ensure_feature_columns(cur, table)
+    widen_narrow_columns(cur, table)
+    ensure_results_table(cur, table)
+    report = ensure_indexes(cur, table)
+    ensure_version_table(cur)
+    ensure_jobs_table(cur)
+    ensure_uploads_table(cur)
+    return report
+
+
+if __name__ == '__main__':
+    import psycopg2
+
+    conn = psycopg2.connect(os.getenv('DATABASE_URL'))
+    try:
+        with conn.cursor() as cur:
+            if not _relation_exists(cur, BASE_TABLE):
+                # Новая база: таблицу пациентов со всеми столбцами и индексами создаёт create_db.py
+                ensure_results_table(cur)
+                ensure_version_table(cur)
+                ensure_jobs_table(cur)
+                ensure_uploads_table(cur)
+                result = f"нет {BASE_TABLE}, созданы только служебные таблицы"
+            else:
+                result = migrate_schema(cur)
+        conn.commit()
+        print(f"✅ Схема {BASE_TABLE} мигрирована: {result}")
+    except Exception as e:
+        conn.rollback()
+        print(f"❌ Ошибка миграции индексов: {e}")
+        raise SystemExit(1)
+    finally:
+        conn.close()
@@ -0,0 +1,237 @@
+# backend/synthetic.py
+#
+# Ленивая загрузка модели CTGAN. torch и ctgan импортируются только при
+# первом запросе синтетики или в фоновом прогреве при старте приложения,
+# поэтому воркер начинает обслуживать запросы без загрузки модели.
+#
+# Резервуар заранее сгенерированных и скорректированных строк: запросы
+# синтетики берут строки из памяти, а фоновый поток пополняет резервуар,
+# когда он опускается ниже нижней границы.
+
+import logging
+import os
+import sys
+import threading
+import time
+from collections import deque
+from typing import Callable, List, Optional
+
+import numpy as np
+import pandas as pd
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CTGAN_MODEL_PATH = os.getenv('CTGAN_MODEL_PATH', os.path.join(project_root, 'models', 'ctgan', 'ctgan_optimal_model.pkl'))
+
+# Загружать модель в фоне сразу после старта (иначе — при первом запросе)
+CTGAN_WARMUP = os.getenv('CTGAN_WARMUP', 'true').lower() in ('1', 'true', 'yes')
+CTGAN_SEED = int(os.getenv('CTGAN_SEED', '42'))
+
+# Размер резервуара строк на воркер (0 — выключен) и граница фонового пополнения
+SYNTHETIC_RESERVOIR_SIZE = int(os.getenv('SYNTHETIC_RESERVOIR_SIZE', '1000'))
+SYNTHETIC_RESERVOIR_LOW_WATER = int(os.getenv('SYNTHETIC_RESERVOIR_LOW_WATER', '250'))
+
+_model = None
+_model_lock = threading.Lock()
+# CTGAN.sample не потокобезопасен (общие состояния генератора и torch):
+# запросы и фоновое пополнение резервуара сэмплируют по очереди
+_sample_lock = threading.Lock()
+_load_seconds = None
+_load_error = None
+
+
+def _load_model():
+    global _load_seconds, _load_error
+    started = time.perf_counter()
+    try:
+        import torch
+        from ctgan import CTGAN
+
+        model = CTGAN.load(CTGAN_MODEL_PATH)
+        # Сиды для воспроизводимости синтетики
+        np.random.seed(CTGAN_SEED)
+        torch.manual_seed(CTGAN_SEED)
+    except Exception as e:
+        _load_error = str(e)
+        raise RuntimeError(f"Ошибка загрузки модели CTGAN: {str(e)}")
+
+    _load_seconds = time.perf_counter() - started
+    _load_error = None
+    logger.info(f"Модель CTGAN загружена за {_load_seconds:.2f} с: {CTGAN_MODEL_PATH}")
+    return model
+
+
+def get_ctgan():
+    """Возвращает модель CTGAN процесса, загружая её при первом обращении"""
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                _model = _load_model()
+    return _model
+
+
+def sample_ctgan(n: int) -> pd.DataFrame:
+    """n строк из модели CTGAN процесса; одновременные вызовы выполняются по очереди"""
+    model = get_ctgan()
+    with _sample_lock:
+        return model.sample(n)
+
+
+def start_warmup():
+    """Загружает модель в фоновом потоке, не задерживая готовность приложения"""
+    if not CTGAN_WARMUP or _model is not None:
+        return None
+
+    def warmup():
+        try:
+            get_ctgan()
+            reservoir.fill()
+        except Exception as e:
+            logger.error(f"Фоновая загрузка CTGAN не удалась: {e}")
+
+    thread = threading.Thread(target=warmup, name='ctgan-warmup', daemon=True)
+    thread.start()
+    return thread
+
+
+def status() -> dict:
+    return {
+        'loaded': _model is not None,
+        'load_seconds': round(_load_seconds, 3) if _load_seconds is not None else None,
+        'error': _load_error,
+        'torch_imported': 'torch' in sys.modules,
+        'warmup': CTGAN_WARMUP,
+        'model_path': CTGAN_MODEL_PATH
+    }
+
+
+class SyntheticReservoir:
+    """Очередь готовых синтетических строк (столбцы columns, уже после adjust).
+
+    take(n) отдаёт строки из памяти в порядке генерации; недостающие строки
+    генерируются сразу (промах). После выдачи, если строк осталось меньше
+    low_water, запускается фоновое пополнение до size."""
+
+    def __init__(self, size: int = SYNTHETIC_RESERVOIR_SIZE, low_water: int = SYNTHETIC_RESERVOIR_LOW_WATER):
+        self.size = size
+        self.low_water = min(low_water, size)
+        self.columns: List[str] = []
+        self.adjust: Callable[[pd.DataFrame], pd.DataFrame] = lambda frame: frame
+        self._rows = deque()
+        self._lock = threading.Lock()
+        self._refilling = False
+        self.hits = 0
+        self.misses = 0
+        self.live_samples = 0
+        self.refills = 0
+        self.refill_seconds_total = 0.0
+        self.last_refill_seconds = None
+        self.last_error = None
+
+    def configure(self, columns: List[str], adjust: Callable[[pd.DataFrame], pd.DataFrame]):
+        """Столбцы строк и функция корректировки выборки CTGAN"""
+        self.columns = list(columns)
+        self.adjust = adjust
+
+    def _sample(self, n: int) -> np.ndarray:
+        frame = self.adjust(sample_ctgan(n))
+        return frame[self.columns].to_numpy(dtype='float64')
+
+    def take(self, n: int) -> pd.DataFrame:
+        rows = []
+        with self._lock:
+            while self._rows and len(rows) < n:
+                rows.append(self._rows.popleft())
+            self.hits += len(rows)
+            self.misses += n - len(rows)
+            if len(rows) < n:
+                self.live_samples += 1
+
+        if len(rows) < n:
+            rows.extend(self._sample(n - len(rows)))
+
+        self.maybe_refill()
+        return pd.DataFrame(np.array(rows, dtype='float64').reshape(n, len(self.columns)), columns=self.columns)
+
+    def level(self) -> int:
+        with self._lock:
+            return len(self._rows)
+
+    def refill(self):
+        """Пополняет резервуар до size в текущем потоке"""
+        if self.size <= 0:
+            return
+        started = time.perf_counter()
+        try:
+            missing = self.size - self.level()
+            if missing > 0:
+                sampled = self._sample(missing)
+                with self._lock:
+                    self._rows.extend(sampled)
+            self.last_error = None
+        except Exception as e:
+            self.last_error = str(e)
+            logger.error(f"Пополнение резервуара синтетики не удалось: {e}")
+            return
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self.refills += 1
+            self.refill_seconds_total += elapsed
+            self.last_refill_seconds = elapsed
+
+    def fill(self) -> bool:
+        """Пополняет резервуар в текущем потоке, если фоновое пополнение ещё не идёт"""
+        with self._lock:
+            if self.size <= 0 or self._refilling:
+                return False
+            self._refilling = True
+        try:
+            self.refill()
+        finally:
+            with self._lock:
+                self._refilling = False
+        return True
+
+    def maybe_refill(self) -> Optional[threading.Thread]:
+        """Запускает фоновое пополнение, если строк меньше low_water и оно ещё не идёт"""
+        with self._lock:
+            if self.size <= 0 or self._refilling or len(self._rows) >= self.low_water:
+                return None
+            self._refilling = True
+
+        def run():
+            try:
+                self.refill()
+            finally:
+                with self._lock:
+                    self._refilling = False
+
+        thread = threading.Thread(target=run, name='synthetic-refill', daemon=True)
+        thread.start()
+        return thread
+
+    def stats(self) -> dict:
+        with self._lock:
+            served = self.hits + self.misses
+            return {
+                'size': self.size,
+                'low_water': self.low_water,
+                'level': len(self._rows),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / served, 3) if served else None,
+                'live_samples': self.live_samples,
+                'refilling': self._refilling,
+                'refills': self.refills,
+                'last_refill_seconds': round(self.last_refill_seconds, 3) if self.last_refill_seconds is not None else None,
+                'avg_refill_seconds': round(self.refill_seconds_total / self.refills, 3) if self.refills else None,
+                'last_error': self.last_error
+            }
+
+
+reservoir = SyntheticReservoir()
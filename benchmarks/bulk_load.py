@@ -0,0 +1,67 @@
+# benchmarks/bulk_load.py
+#
+# Скорость загрузки DataFrame: COPY против execute_values
+# на 10 000 и 100 000 строк смешанных типов.
+#
+# Запуск из корня проекта (DATABASE_URL в .env):
+#   python -m benchmarks.bulk_load
+
+import os
+
+import numpy as np
+import pandas as pd
+import psycopg2
+from dotenv import load_dotenv
+
+from backend.bulk_load import load_frame
+
+# === Конфигурация ===
+BENCH_TABLE = 'bench_bulk_load'
+ROW_COUNTS = [10_000, 100_000]
+INT_COLUMNS = 120
+FLOAT_COLUMNS = 120
+TEXT_COLUMNS = 120
+SEED = 42
+
+
+def make_frame(rows: int, rng: np.random.Generator) -> pd.DataFrame:
+    data = {'col_1': np.arange(1, rows + 1)}
+    n = 2
+    for _ in range(INT_COLUMNS):
+        values = rng.integers(0, 5, rows).astype(float)
+        values[rng.random(rows) < 0.1] = np.nan
+        data[f'col_{n}'] = values
+        n += 1
+    for _ in range(FLOAT_COLUMNS):
+        data[f'col_{n}'] = rng.normal(25.0, 5.0, rows).round(2)
+        n += 1
+    categories = np.array(['Да', 'Нет', 'Ежедневно', '1 раз в неделю', None], dtype=object)
+    for _ in range(TEXT_COLUMNS):
+        data[f'col_{n}'] = categories[rng.integers(0, len(categories), rows)]
+        n += 1
+    return pd.DataFrame(data)
+
+
+if __name__ == '__main__':
+    load_dotenv()
+    rng = np.random.default_rng(SEED)
+    conn = psycopg2.connect(os.getenv('DATABASE_URL'))
+    cur = conn.cursor()
+    try:
+        for rows in ROW_COUNTS:
+            df = make_frame(rows, rng)
+            columns = list(df.columns)
+            sql_types = ['INTEGER'] * (1 + INT_COLUMNS) + ['FLOAT'] * FLOAT_COLUMNS + ['TEXT'] * TEXT_COLUMNS
+            columns_sql = ", ".join(f'"{c}" {t}' for c, t in zip(columns, sql_types))
+
+            for method in ['insert', 'copy']:
+                cur.execute(f'DROP TABLE IF EXISTS {BENCH_TABLE}')
+                cur.execute(f'CREATE TABLE {BENCH_TABLE} ({columns_sql})')
+                stats = load_frame(cur, BENCH_TABLE, df, columns, sql_types, method=method)
+                conn.commit()
+                print(f"{rows:>7} строк, {method:>6}: {stats['seconds']:7.2f} с, {stats['rows_per_second']:>10} строк/с")
+    finally:
+        cur.execute(f'DROP TABLE IF EXISTS {BENCH_TABLE}')
+        conn.commit()
+        cur.close()
+        conn.close()
@@ -0,0 +1,55 @@
+# benchmarks/card_concurrency.py
+#
+# Нагрузочный тест карты пациента: один воркер uvicorn, растущее число
+# одновременных запросов GET /patient-card/{code}. При асинхронном доступе к БД
+# пропускная способность должна расти вместе с параллелизмом.
+#
+# Запуск (бэкенд поднят с --workers 1):
+#   python -m benchmarks.card_concurrency
+
+import asyncio
+import time
+
+import httpx
+import numpy as np
+
+# === Конфигурация ===
+API_URL = 'http://127.0.0.1:8000'
+CONCURRENCY_LEVELS = [1, 4, 16, 64]
+REQUESTS_PER_LEVEL = 256
+
+
+async def run_level(client: httpx.AsyncClient, codes: list, concurrency: int):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def load_card(code):
+        async with semaphore:
+            started = time.perf_counter()
+            response = await client.get(f'{API_URL}/patient-card/{code}')
+            response.raise_for_status()
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(load_card(codes[i % len(codes)]) for i in range(REQUESTS_PER_LEVEL)))
+    elapsed = time.perf_counter() - started
+
+    print(f"параллелизм {concurrency:>3}: {REQUESTS_PER_LEVEL / elapsed:7.1f} запросов/с, "
+          f"p50={np.percentile(latencies, 50):.1f} мс, p99={np.percentile(latencies, 99):.1f} мс")
+
+
+async def main():
+    limits = httpx.Limits(max_connections=max(CONCURRENCY_LEVELS))
+    async with httpx.AsyncClient(timeout=60, limits=limits) as client:
+        response = await client.get(f'{API_URL}/level-fa/patients')
+        response.raise_for_status()
+        codes = [patient['code'] for patient in response.json()]
+        if not codes:
+            raise SystemExit("В базе нет пациентов")
+
+        for concurrency in CONCURRENCY_LEVELS:
+            await run_level(client, codes, concurrency)
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,69 @@
+# benchmarks/card_lookup.py
+#
+# Задержка поиска карты по col_1 до и после создания индексов
+# на широкой синтетической таблице (по умолчанию 100 000 строк).
+# ensure_indexes создаёт индексы только в таблице бенчмарка — рабочие
+# служебные таблицы (результаты, версия, задачи, загрузки) не затрагиваются.
+#
+# Запуск из корня проекта (DATABASE_URL в .env):
+#   python -m benchmarks.card_lookup
+
+import os
+import random
+import time
+
+import numpy as np
+import psycopg2
+from dotenv import load_dotenv
+
+from backend.schema import ensure_indexes
+
+# === Конфигурация ===
+BENCH_TABLE = 'bench_fa_rgnkc_data'
+ROWS = 100_000
+WIDTH = 370
+LOOKUPS = 200
+SEED = 42
+
+
+def measure(cur, codes) -> list:
+    latencies = []
+    for code in codes:
+        started = time.perf_counter()
+        cur.execute(f'SELECT * FROM {BENCH_TABLE} WHERE col_1 = %s', (code,))
+        cur.fetchall()
+        latencies.append((time.perf_counter() - started) * 1000)
+    return latencies
+
+
+def report(label: str, latencies: list):
+    print(f"{label:>16}: p50={np.percentile(latencies, 50):8.2f} мс, p99={np.percentile(latencies, 99):8.2f} мс")
+
+
+if __name__ == '__main__':
+    load_dotenv()
+    random.seed(SEED)
+    conn = psycopg2.connect(os.getenv('DATABASE_URL'))
+    conn.autocommit = True
+    cur = conn.cursor()
+    try:
+        value_columns = [f'"col_{i}" FLOAT' for i in range(2, WIDTH + 1)]
+        cur.execute(f'DROP TABLE IF EXISTS {BENCH_TABLE}')
+        cur.execute(f'CREATE TABLE {BENCH_TABLE} ("col_1" INTEGER, {", ".join(value_columns)})')
+        generated = ", ".join(["random()"] * (WIDTH - 1))
+        cur.execute(f'INSERT INTO {BENCH_TABLE} SELECT g, {generated} FROM generate_series(1, {ROWS}) AS g')
+        cur.execute(f'ANALYZE {BENCH_TABLE}')
+        print(f"Таблица {BENCH_TABLE}: {ROWS} строк × {WIDTH} столбцов")
+
+        codes = [random.randint(1, ROWS) for _ in range(LOOKUPS)]
+        report('без индексов', measure(cur, codes))
+
+        started = time.perf_counter()
+        ensure_indexes(cur, BENCH_TABLE)
+        cur.execute(f'ANALYZE {BENCH_TABLE}')
+        print(f"Создание индексов: {time.perf_counter() - started:.2f} с")
+        report('с индексами', measure(cur, codes))
+    finally:
+        cur.execute(f'DROP TABLE IF EXISTS {BENCH_TABLE}')
+        cur.close()
+        conn.close()
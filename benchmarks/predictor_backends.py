@@ -0,0 +1,65 @@
+# benchmarks/predictor_backends.py
+#
+# Сравнение бэкендов предсказания (http и local): задержка одиночного
+# запроса (p50/p99) и пропускная способность пакетного предсказания.
+#
+# Запуск из корня проекта:
+#   python -m benchmarks.predictor_backends
+# Для local нужен LOCAL_MODEL_PATH, для http — доступный ML_MODEL_URL.
+
+import time
+
+import numpy as np
+
+from backend.predictor import create_predictor
+
+# === Конфигурация ===
+BACKENDS = ['http', 'local']
+SINGLE_CALLS = 200
+BATCH_ROWS = 5000
+SEED = 42
+
+
+def random_features(n: int, rng: np.random.Generator) -> np.ndarray:
+    """Случайные векторы признаков в допустимых диапазонах модели"""
+    return np.column_stack([
+        rng.integers(0, 8, n),             # col_14
+        rng.integers(0, 5, n),             # col_58
+        rng.integers(0, 4, n),             # col_59
+        rng.uniform(16.0, 40.0, n),        # col_85
+        rng.integers(0, 21, n) * 5.0,      # col_232
+        rng.integers(0, 13, n),            # col_249
+        rng.uniform(5.0, 30.0, n),         # col_252
+        rng.integers(0, 5, n),             # col_245
+    ]).astype(np.float32)
+
+
+def bench(backend: str):
+    rng = np.random.default_rng(SEED)
+    try:
+        predictor = create_predictor(backend)
+    except Exception as e:
+        print(f"⚠️  {backend}: бэкенд недоступен ({e})")
+        return
+
+    single = random_features(SINGLE_CALLS, rng)
+    latencies = []
+    for row in single:
+        started = time.perf_counter()
+        predictor.predict(row.reshape(1, -1))
+        latencies.append((time.perf_counter() - started) * 1000)
+
+    batch = random_features(BATCH_ROWS, rng)
+    started = time.perf_counter()
+    predictions = predictor.predict(batch)
+    elapsed = time.perf_counter() - started
+    failed = sum(p is None for p in predictions)
+
+    print(f"{backend:>6}: p50={np.percentile(latencies, 50):.2f} мс, "
+          f"p99={np.percentile(latencies, 99):.2f} мс, "
+          f"пакет {BATCH_ROWS} строк: {BATCH_ROWS / elapsed:.0f} строк/с (ошибок: {failed})")
+
+
+if __name__ == '__main__':
+    for backend in BACKENDS:
+        bench(backend)
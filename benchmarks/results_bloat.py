@@ -0,0 +1,120 @@
+# benchmarks/results_bloat.py
+#
+# Объём записи и разрастание таблиц при повторной пакетной оценке ФА:
+# UPDATE столбца fa в широкой строке пациента (как раньше) против upsert
+# в узкую таблицу результатов fa_rgnkc_results. Измеряются объём WAL,
+# прирост размера таблицы (с индексами) и время прогона. Автоочистка
+# на тестовых таблицах выключена, чтобы было видно накопление мёртвых строк.
+#
+# Запуск из корня проекта (DATABASE_URL в .env):
+#   python -m benchmarks.results_bloat
+
+import os
+import time
+
+import numpy as np
+import psycopg2
+from dotenv import load_dotenv
+from psycopg2.extras import execute_values
+
+from backend.bulk_load import load_frame
+from backend.schema import RESULT_COLUMNS, RESULTS_FILLFACTOR
+from benchmarks.bulk_load import FLOAT_COLUMNS, INT_COLUMNS, TEXT_COLUMNS, make_frame
+
+# === Конфигурация ===
+WIDE_TABLE = 'bench_results_wide'
+NARROW_TABLE = 'bench_results_narrow'
+ROWS = 20_000
+RESCORES = 3
+BATCH_SIZE = 1000
+SEED = 42
+
+WIDE_UPDATE_SQL = f'''
+    UPDATE {WIDE_TABLE} AS t SET fa = v.fa
+    FROM (VALUES %s) AS v(code, fa)
+    WHERE t.col_1 = v.code
+'''
+NARROW_UPSERT_SQL = f'''
+    INSERT INTO {NARROW_TABLE} (code, fa, fa_scored_at, updated_at)
+    SELECT v.code, v.fa, now(), now() FROM (VALUES %s) AS v(code, fa)
+    ON CONFLICT (code) DO UPDATE SET
+        fa = EXCLUDED.fa, fa_scored_at = EXCLUDED.fa_scored_at, updated_at = EXCLUDED.updated_at
+'''
+
+
+def wal_lsn(cur) -> str:
+    cur.execute('SELECT pg_current_wal_lsn()')
+    return cur.fetchone()[0]
+
+
+def wal_bytes_since(cur, lsn: str) -> int:
+    cur.execute('SELECT pg_wal_lsn_diff(pg_current_wal_lsn(), %s)', (lsn,))
+    return int(cur.fetchone()[0])
+
+
+def relation_size(cur, table: str) -> int:
+    cur.execute('SELECT pg_total_relation_size(%s)', (table,))
+    return cur.fetchone()[0]
+
+
+def rescore(conn, cur, sql: str, codes: np.ndarray, rng: np.random.Generator, table: str) -> dict:
+    size_before = relation_size(cur, table)
+    lsn = wal_lsn(cur)
+    started = time.perf_counter()
+    for _ in range(RESCORES):
+        values = list(zip(codes.tolist(), rng.integers(1, 6, len(codes)).tolist()))
+        for start in range(0, len(values), BATCH_SIZE):
+            execute_values(cur, sql, values[start:start + BATCH_SIZE], page_size=BATCH_SIZE)
+        conn.commit()
+    elapsed = time.perf_counter() - started
+    return {
+        'wal_mb': wal_bytes_since(cur, lsn) / 2 ** 20,
+        'growth_mb': (relation_size(cur, table) - size_before) / 2 ** 20,
+        'size_mb': relation_size(cur, table) / 2 ** 20,
+        'seconds': elapsed
+    }
+
+
+def report(name: str, stats: dict):
+    print(f"{name:<28} WAL {stats['wal_mb']:9.1f} МБ, прирост таблицы {stats['growth_mb']:8.1f} МБ "
+          f"(итого {stats['size_mb']:8.1f} МБ), {stats['seconds']:6.2f} с")
+
+
+if __name__ == '__main__':
+    load_dotenv()
+    rng = np.random.default_rng(SEED)
+    conn = psycopg2.connect(os.getenv('DATABASE_URL'))
+    cur = conn.cursor()
+    try:
+        df = make_frame(ROWS, rng)
+        columns = list(df.columns)
+        sql_types = ['INTEGER'] * (1 + INT_COLUMNS) + ['FLOAT'] * FLOAT_COLUMNS + ['TEXT'] * TEXT_COLUMNS
+        columns_sql = ", ".join(f'"{c}" {t}' for c, t in zip(columns, sql_types))
+        codes = df['col_1'].to_numpy()
+
+        # Прежняя схема: fa в строке пациента
+        cur.execute(f'DROP TABLE IF EXISTS {WIDE_TABLE}')
+        cur.execute(f'CREATE TABLE {WIDE_TABLE} ({columns_sql}, fa INTEGER, PRIMARY KEY (col_1)) WITH (autovacuum_enabled = false)')
+        load_frame(cur, WIDE_TABLE, df, columns, sql_types)
+        conn.commit()
+
+        # Новая схема: узкая таблица результатов
+        result_columns_sql = ", ".join(f'"{col}" {sql_type}' for col, sql_type in RESULT_COLUMNS.items())
+        cur.execute(f'DROP TABLE IF EXISTS {NARROW_TABLE}')
+        cur.execute(f'''
+            CREATE TABLE {NARROW_TABLE} (
+                code BIGINT PRIMARY KEY, {result_columns_sql}, updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+            ) WITH (fillfactor = {RESULTS_FILLFACTOR}, autovacuum_enabled = false)
+        ''')
+        conn.commit()
+
+        print(f"{ROWS} пациентов, {len(columns)} столбцов, {RESCORES} полных пересчёта fa")
+        report('UPDATE широкой строки', rescore(conn, cur, WIDE_UPDATE_SQL, codes, rng, WIDE_TABLE))
+        report('upsert в узкую таблицу', rescore(conn, cur, NARROW_UPSERT_SQL, codes, rng, NARROW_TABLE))
+    finally:
+        conn.rollback()
+        cur.execute(f'DROP TABLE IF EXISTS {WIDE_TABLE}')
+        cur.execute(f'DROP TABLE IF EXISTS {NARROW_TABLE}')
+        conn.commit()
+        cur.close()
+        conn.close()
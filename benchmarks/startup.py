@@ -0,0 +1,57 @@
+# benchmarks/startup.py
+#
+# Время готовности приложения в новом процессе (импорт роутеров + lifespan)
+# и проверка, что до первого запроса синтетики torch не импортируется.
+# Завершается с кодом 1, если torch оказался загружен при старте.
+#
+# Запуск из корня проекта (DATABASE_URL в .env):
+#   python -m benchmarks.startup
+
+import json
+import os
+import subprocess
+import sys
+
+import numpy as np
+
+# === Конфигурация ===
+RUNS = 5
+
+# Выполняется в отдельном процессе: холодный импорт и запуск lifespan
+CHILD = '''
+import asyncio, json, sys, time
+started = time.perf_counter()
+from backend.main import app, startup_report
+
+async def run():
+    async with app.router.lifespan_context(app):
+        pass
+
+asyncio.run(run())
+print(json.dumps({
+    "ready_seconds": time.perf_counter() - started,
+    "router_import_seconds": startup_report["router_import_seconds"],
+    "torch_imported": "torch" in sys.modules,
+}))
+'''
+
+
+def run_once() -> dict:
+    # Без фонового прогрева — проверяется именно путь до первого запроса
+    env = {**os.environ, 'CTGAN_WARMUP': 'false'}
+    result = subprocess.run([sys.executable, '-c', CHILD], capture_output=True, text=True, env=env, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+if __name__ == '__main__':
+    runs = [run_once() for _ in range(RUNS)]
+    ready = [r['ready_seconds'] * 1000 for r in runs]
+    print(f"Готовность: p50={np.percentile(ready, 50):.0f} мс, max={max(ready):.0f} мс ({RUNS} запусков)")
+    for name in runs[0]['router_import_seconds']:
+        avg = np.mean([r['router_import_seconds'][name] for r in runs]) * 1000
+        print(f"  импорт {name:<16} {avg:8.1f} мс")
+
+    if any(r['torch_imported'] for r in runs):
+        print("❌ torch импортирован при старте приложения")
+        raise SystemExit(1)
+    print("✅ torch при старте не импортируется")
@@ -0,0 +1,93 @@
+# benchmarks/upload_concurrency.py
+#
+# Задержка GET /patient-card/{code} в покое и во время обработки большой
+# книги Excel в POST /api/check-new-patients на том же воркере. Если тяжёлая
+# работа вынесена из event loop, задержка карты почти не меняется.
+#
+# Запуск (бэкенд поднят с --workers 1):
+#   python -m benchmarks.upload_concurrency
+
+import asyncio
+import io
+import time
+
+import httpx
+import numpy as np
+import pandas as pd
+
+# === Конфигурация ===
+API_URL = 'http://127.0.0.1:8000'
+WORKBOOK_ROWS = 5000
+WORKBOOK_COLUMNS = 200
+UPLOADS = 3
+BASELINE_REQUESTS = 200
+SEED = 42
+
+
+def build_workbook() -> bytes:
+    rng = np.random.default_rng(SEED)
+    df = pd.DataFrame(rng.random((WORKBOOK_ROWS, WORKBOOK_COLUMNS)), columns=[f'Признак_{i}' for i in range(WORKBOOK_COLUMNS)])
+    # Коды заведомо вне базы — все пациенты новые
+    df.insert(0, 'Код_карты_пациента', np.arange(10_000_000, 10_000_000 + WORKBOOK_ROWS))
+    buffer = io.BytesIO()
+    df.to_excel(buffer, index=False)
+    return buffer.getvalue()
+
+
+async def card_latencies(client: httpx.AsyncClient, codes: list, stop: asyncio.Event = None, limit: int = None) -> list:
+    latencies = []
+    i = 0
+    while (stop is None or not stop.is_set()) and (limit is None or i < limit):
+        started = time.perf_counter()
+        response = await client.get(f'{API_URL}/patient-card/{codes[i % len(codes)]}')
+        response.raise_for_status()
+        latencies.append((time.perf_counter() - started) * 1000)
+        i += 1
+    return latencies
+
+
+async def upload_loop(client: httpx.AsyncClient, workbook: bytes, stop: asyncio.Event) -> list:
+    durations = []
+    try:
+        for _ in range(UPLOADS):
+            started = time.perf_counter()
+            files = {'file': ('bench.xlsx', workbook, 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')}
+            response = await client.post(f'{API_URL}/api/check-new-patients', files=files)
+            response.raise_for_status()
+            durations.append(time.perf_counter() - started)
+    finally:
+        stop.set()
+    return durations
+
+
+def report(name: str, latencies: list):
+    print(f"{name:<22} запросов {len(latencies):>5}, p50={np.percentile(latencies, 50):7.1f} мс, "
+          f"p99={np.percentile(latencies, 99):7.1f} мс, max={max(latencies):7.1f} мс")
+
+
+async def main():
+    print(f"Генерация книги {WORKBOOK_ROWS}x{WORKBOOK_COLUMNS}...")
+    workbook = build_workbook()
+
+    async with httpx.AsyncClient(timeout=600) as client:
+        response = await client.get(f'{API_URL}/level-fa/patients')
+        response.raise_for_status()
+        codes = [patient['code'] for patient in response.json()]
+        if not codes:
+            raise SystemExit("В базе нет пациентов")
+
+        baseline = await card_latencies(client, codes, limit=BASELINE_REQUESTS)
+        report('карта в покое', baseline)
+
+        stop = asyncio.Event()
+        loaded, durations = await asyncio.gather(
+            card_latencies(client, codes, stop=stop),
+            upload_loop(client, workbook, stop)
+        )
+        report('карта во время загрузки', loaded)
+        print(f"check-new-patients: {np.mean(durations):.1f} с на книгу ({UPLOADS} загрузок)")
+        print(f"Рост p99: x{np.percentile(loaded, 99) / np.percentile(baseline, 99):.1f}")
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
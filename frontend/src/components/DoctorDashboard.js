@@ -131,6 +131,23 @@ function DoctorDashboard() {
     }
   }, [patients]);
 
+  const followJob = (eventsUrl) => new Promise((resolve, reject) => {
+    const source = new EventSource(`http://127.0.0.1:8000${eventsUrl}`);
+    source.addEventListener('progress', (event) => {
+      const job = JSON.parse(event.data);
+      const percent = job.progress !== null ? ` (${Math.round(job.progress * 100)}%)` : '';
+      setPredictMessage(`Оценка: обработано ${job.processed} из ${job.total}${percent}, ${job.rows_per_second} пациентов/с.`);
+    });
+    source.addEventListener('done', (event) => {
+      source.close();
+      resolve(JSON.parse(event.data));
+    });
+    source.addEventListener('error', (event) => {
+      source.close();
+      reject(new Error(event.data ? JSON.parse(event.data).detail : 'Потеряна связь с задачей оценки'));
+    });
+  });
+
   const handlePredictActivity = async () => {
     setIsPredicting(true);
     setPredictMessage(null);
@@ -144,7 +161,16 @@ function DoctorDashboard() {
       if (!response.ok) {
         throw new Error(result.detail || `Ошибка сервера: ${response.status}`);
       }
-      setPredictMessage(`${result.message} Обновлено записей: ${result.updated_count}.`);
+      // Оценка идёт фоновой задачей; прогресс приходит потоком событий
+      const job = await followJob(result.events_url);
+      if (job.status === 'failed') {
+        throw new Error(job.error || 'Задача оценки завершилась с ошибкой');
+      }
+      setPredictMessage(
+        `Обработано пациентов: ${job.processed}. Обновлено записей: ${job.updated}.` +
+        (job.failed ? ` Неудачных предсказаний: ${job.failed}.` : '') +
+        ` Скорость: ${job.rows_per_second} пациентов/с.`
+      );
       await fetchPatients();
     } catch (e) {
       console.error("Ошибка при вызове предсказания:", e);
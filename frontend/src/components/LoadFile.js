@@ -1,6 +1,6 @@
 // frontend/src/components/LoadFile.js
 
-import React, { useState } from 'react';
+import React, { useEffect, useRef, useState } from 'react';
 import styles from './LoadFile.module.css';
 
 const validationMap = {
@@ -28,6 +28,12 @@ const LoadFile = () => {
   const [isTableOpen, setIsTableOpen] = useState(false);
   const [editingPatientIndex, setEditingPatientIndex] = useState(-1);
   const [manualInputs, setManualInputs] = useState({});
+  // Ключ идемпотентности: повтор той же загрузки не запишет пациентов второй раз
+  const uploadKeyRef = useRef(null);
+
+  useEffect(() => {
+    uploadKeyRef.current = null;
+  }, [newPatients]);
 
   const handleDrag = (e) => {
     e.preventDefault();
@@ -154,13 +160,35 @@ const LoadFile = () => {
   const fillAllSynthetic = async () => {
     setLoading(true);
     try {
-      const promises = newPatients.map((patient, index) => {
-        if (patient.missing_columns.length > 0) {
-          return fillSynthetic(index);
-        }
-        return Promise.resolve();
+      // Все пациенты с пропусками заполняются одним запросом
+      const indexes = newPatients
+        .map((patient, index) => (patient.missing_columns.length > 0 ? index : -1))
+        .filter(index => index >= 0);
+      if (indexes.length === 0) {
+        return;
+      }
+
+      const response = await fetch('http://localhost:8000/api/fill-synthetic-patients', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ new_patients: indexes.map(index => newPatients[index]) }),
       });
-      await Promise.all(promises);
+
+      if (!response.ok) {
+        const data = await response.json();
+        throw new Error(data.detail || 'Ошибка при заполнении синтетикой');
+      }
+
+      const data = await response.json();
+      const updatedPatients = [...newPatients];
+      indexes.forEach((patientIndex, i) => {
+        updatedPatients[patientIndex] = {
+          ...updatedPatients[patientIndex],
+          data: data.new_patients[i].data,
+          missing_columns: [],
+        };
+      });
+      setNewPatients(updatedPatients);
     } catch (error) {
       alert(`Ошибка при заполнении всех: ${error.message}`);
     } finally {
@@ -233,11 +261,14 @@ const LoadFile = () => {
 
   const uploadPatients = async () => {
     setLoading(true);
+    if (!uploadKeyRef.current) {
+      uploadKeyRef.current = `${Date.now()}-${Math.random().toString(36).slice(2)}`;
+    }
 
     try {
-      const response = await fetch('http://localhost:8000/api/upload-new-patients-data', {
+      const response = await fetch('http://localhost:8000/api/upload-new-patients-data?on_conflict=skip', {
         method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
+        headers: { 'Content-Type': 'application/json', 'Idempotency-Key': uploadKeyRef.current },
         body: JSON.stringify(newPatients),
       });
 